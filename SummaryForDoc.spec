@@ -5,7 +5,7 @@ a = Analysis(
     ['main.py'],
     pathex=[],
     binaries=[],
-    datas=[('icon.ico', '.')],
+    datas=[('icon.ico', '.'), ('src/data/japanese_names.txt', 'src/data')],
     hiddenimports=[],
     hookspath=[],
     hooksconfig={},
@@ -8,15 +8,27 @@ from pathlib import Path
 from typing import List
 import sys
 import os
+import re
 
 # ドラッグ&ドロップはビルド環境で問題が多いため、無効化
 DROPZONE_AVAILABLE = False
 
 from src.config import config
-from src.file_reader import FileReader
+from src.file_reader import FileReader, FileLimitError
+from src.deduplicator import Deduplicator
 from src.pii_remover import PIIRemover
+from src.incremental_masker import IncrementalMasker
+from src.parallel_masker import ParallelMasker
+from src.pseudonym_vault import PseudonymVault
+from src.text_normalizer import normalize_text
+from src.ocr_cleaner import OCRCleaner
+from src.text_search import TextSearchIndex, SearchResults, remove_spans
+from src.paged_document import PagedDocument
 from src.summarizer import MedicalSummarizer
+from src.job_queue import JobQueue, JobRunner, STAGE_READ, STAGE_MASK, STAGE_SUMMARIZE, STAGE_SAVE
 from src.prompts import PromptManager
+from src.metrics import metrics
+from src.profiler import profiled
 
 
 def get_resource_path(relative_path):
@@ -33,6 +45,10 @@ def get_resource_path(relative_path):
 class MedicalSummarizerApp:
     """医療文書要約ツール GUIアプリ"""
 
+    # 確認画面で一度に描画するページ数（スクロール時の最大数）
+    MASKED_WINDOW_PAGES = 3
+    MASKED_WINDOW_MAX_PAGES = 5
+
     def __init__(self, page: ft.Page):
         self.page = page
         self.page.title = "医療文書要約ツール"
@@ -51,6 +67,9 @@ class MedicalSummarizerApp:
         self.cleaned_text = ""
         self.summary_result = None
         self.pii_log = []
+        self.incremental_masker = None  # 確認画面の編集内容を差分で再チェック
+        self.pseudonym_vault = None     # 仮名化の対応表（仮名化する設定の場合）
+        self.job_queue = None           # 中断した処理を再開するためのジョブキュー
         self.confirmation_mode = True   # 確認モード（デフォルトON）
         self.main_view = None           # メインビュー
         self.settings_view = None       # 設定ビュー
@@ -61,12 +80,17 @@ class MedicalSummarizerApp:
         self.process_button = None
         self.result_container = None
         self.status_text = None
-        self.masked_text_field = None  # 編集可能なテキストフィールド
+        self.masked_document = None     # マスク済みテキスト（ページ単位で保持）
+        self.masked_page_list = None    # 表示中のページの一覧（編集可能）
+        self.masked_page_info = None    # 表示中のページ番号
+        self.masked_window_first = 0    # 表示中の先頭ページ
         self.confirm_button = None      # 確認完了ボタン
         self.search_field = None        # 検索フィールド
-        self.search_results = []        # 検索結果のリスト
+        self.search_results = []        # 検索結果（SearchResults）
         self.current_search_index = 0   # 現在の検索結果インデックス
         self.search_result_text = None  # 検索結果表示テキスト
+        self.search_index = None        # マスク済みテキストの検索索引
+        self.regex_checkbox = None      # 正規表現で検索するか
         self.confirmation_toggle = None # 確認モードトグル
         self.create_summary_button = None # 要約作成ボタン（確認モード用）
 
@@ -98,6 +122,16 @@ class MedicalSummarizerApp:
         self.page.snack_bar.open = True
         self.page.update()
 
+    def _export_metrics(self):
+        """計測結果をコンソールに表示し、設定されていればファイルに出力"""
+        print(metrics.get_summary_report())
+
+        if config.METRICS_EXPORT_FORMAT:
+            try:
+                metrics.export(config.get_metrics_export_path(), config.METRICS_EXPORT_FORMAT)
+            except Exception as ex:
+                print(f"計測結果の出力に失敗しました: {ex}")
+
     def _build_ui(self):
         """UIを構築"""
 
@@ -284,6 +318,64 @@ class MedicalSummarizerApp:
             self.result_container
         )
 
+        # 前回中断した処理があれば再開を提案
+        self._check_unfinished_jobs()
+
+    def _get_job_queue(self) -> JobQueue:
+        """ジョブキューを取得（初回のみ作成）"""
+        if self.job_queue is None:
+            self.job_queue = JobQueue()
+            self.job_queue.purge_expired()
+        return self.job_queue
+
+    def _check_unfinished_jobs(self):
+        """中断・失敗したジョブがあれば再開・破棄のボタンを表示"""
+        try:
+            # 監視フォルダ・APIのジョブ（出力先のフォルダを指定して登録）は別のプロセスが実行・再開するため対象外
+            jobs = [job for job in self._get_job_queue().unfinished_jobs() if not job.output_dir]
+        except Exception as ex:
+            print(f"ジョブキューを開けませんでした: {ex}")
+            return
+        if not jobs:
+            return
+
+        def resume(e):
+            self.result_container.controls.clear()
+            self.page.update()
+            for job in jobs:
+                self._execute_summary_generation(job.id)
+
+        def discard(e):
+            for job in jobs:
+                self.job_queue.delete_job(job.id)
+            self.result_container.controls.clear()
+            self.page.update()
+
+        self.result_container.controls.append(
+            ft.Container(
+                content=ft.Column([
+                    ft.Text(
+                        f"⚠️ 前回完了しなかった処理が{len(jobs)}件あります",
+                        size=16,
+                        weight=ft.FontWeight.BOLD
+                    ),
+                    ft.Text(
+                        "再開すると、完了済みの読み込み・要約生成は繰り返さずに続きから処理します。",
+                        size=13,
+                        color="#616161"  # GREY_700
+                    ),
+                    ft.Row([
+                        ft.ElevatedButton("続きから再開", icon="play_arrow", on_click=resume),
+                        ft.TextButton("破棄", on_click=discard),
+                    ]),
+                ]),
+                padding=15,
+                bgcolor="#fff3e0",  # ORANGE_50
+                border_radius=10,
+            )
+        )
+        self.page.update()
+
     def _on_file_picker_result(self, e: ft.FilePickerResultEvent):
         """ファイルピッカーの結果を処理"""
         if e.files:
@@ -291,8 +383,7 @@ class MedicalSummarizerApp:
             for file in e.files:
                 file_path = Path(file.path)
                 if file_path.exists() and file_path not in self.selected_files:
-                    self.selected_files.append(file_path)
-                    print(f"ファイルを追加: {file_path.name}")
+                    self._add_selected_file(file_path)
 
             self._update_file_list()
             self.process_button.disabled = len(self.selected_files) == 0
@@ -326,8 +417,7 @@ class MedicalSummarizerApp:
                 if file_path.exists() and file_path not in self.selected_files:
                     # サポートされているファイル形式かチェック
                     if file_path.suffix.lower() in ['.txt', '.pdf', '.jpg', '.jpeg', '.png']:
-                        self.selected_files.append(file_path)
-                        print(f"ファイルを追加: {file_path.name}")
+                        self._add_selected_file(file_path)
                     else:
                         print(f"サポートされていないファイル形式: {file_path.suffix}")
                 else:
@@ -339,6 +429,30 @@ class MedicalSummarizerApp:
         self.process_button.disabled = len(self.selected_files) == 0
         self.page.update()
 
+    def _add_selected_file(self, file_path: Path) -> bool:
+        """
+        上限を確認してから選択中のファイルに追加
+
+        上限を超えるファイルは追加せず、スナックバーで理由を表示します
+
+        Args:
+            file_path: ファイルパス
+
+        Returns:
+            bool: 追加した場合True
+        """
+        try:
+            FileReader.check_file_limits(file_path)
+            FileReader.check_batch_limits(self.selected_files + [file_path])
+        except FileLimitError as ex:
+            print(f"ファイルを追加できません: {file_path.name} - {ex}")
+            self._show_snack_bar(f"{file_path.name} は追加できません: {ex}")
+            return False
+
+        self.selected_files.append(file_path)
+        print(f"ファイルを追加: {file_path.name}")
+        return True
+
     def _update_file_list(self):
         """ファイルリストを更新"""
         self.file_list.controls.clear()
@@ -389,6 +503,7 @@ class MedicalSummarizerApp:
 
         self.page.update()
 
+    @profiled('process')
     def _on_process(self, e):
         """要約作成ボタンが押されたときの処理"""
         self.process_button.disabled = True
@@ -397,6 +512,12 @@ class MedicalSummarizerApp:
         self.page.update()
 
         try:
+            if not self.confirmation_mode:
+                # 確認モードOFF：ジョブとして登録し、読み込みから保存まで自動で実行
+                job_id = self._get_job_queue().enqueue(self.selected_files, self.preset_dropdown.value)
+                self._execute_summary_generation(job_id)
+                return
+
             # 1. ファイル読み込み
             self.status_text.value = "📖 ファイルを読み込み中..."
             self.page.update()
@@ -404,25 +525,39 @@ class MedicalSummarizerApp:
             reader = FileReader()
             all_text = reader.read_multiple_files(self.selected_files)
 
-            # 2. 個人情報削除
+            # 2. 文字の正規化（全角英数字・半角カタカナなど）、OCRノイズと重複した段落の除去
+            if config.NORMALIZE_TEXT:
+                all_text = normalize_text(all_text).text
+            cleanup_result = None
+            if config.OCR_CLEANUP:
+                cleanup_result = OCRCleaner().clean(all_text)
+                all_text = cleanup_result.text
+            dedupe_result = Deduplicator().deduplicate(all_text)
+
+            # 3. 個人情報削除
             self.status_text.value = "🔒 個人情報を削除中..."
             self.page.update()
 
-            remover = PIIRemover()
-            self.cleaned_text, self.pii_log = remover.clean_text(all_text)
+            self.pseudonym_vault = PseudonymVault() if config.PSEUDONYMIZE else None
+            remover = PIIRemover.for_preset(self.preset_dropdown.value, vault=self.pseudonym_vault)
+            self.cleaned_text, self.pii_log = ParallelMasker(remover).clean_text(dedupe_result.text)
 
-            # 確認モードの分岐
-            if self.confirmation_mode:
-                # 確認モードON：確認画面を表示
-                self.status_text.value = "✅ 個人情報の削除が完了しました（確認してください）"
-                self.status_text.color = "#1976d2"  # BLUE_700
-                self.page.update()
+            # 編集後の再チェック用に、マスク済みのセグメントを登録
+            self.incremental_masker = IncrementalMasker(remover)
+            self.incremental_masker.prime(self.cleaned_text)
 
-                # マスクされたテキストと削除サマリーを表示
-                self._show_masked_text_with_summary(self.cleaned_text, remover.get_summary_report())
-            else:
-                # 確認モードOFF：自動で要約生成
-                self._execute_summary_generation()
+            # 確認モードON：確認画面を表示
+            self.status_text.value = "✅ 個人情報の削除が完了しました（確認してください）"
+            self.status_text.color = "#1976d2"  # BLUE_700
+            self.page.update()
+
+            # マスクされたテキストと削除サマリーを表示
+            summary_report = remover.get_summary_report()
+            if cleanup_result is not None and cleanup_result.chars_saved:
+                summary_report += "\n\n=== OCRノイズの除去 ===\n" + cleanup_result.get_summary_report()
+            if dedupe_result.duplicates:
+                summary_report += "\n\n=== 重複を除いた段落 ===\n" + dedupe_result.get_summary_report()
+            self._show_masked_text_with_summary(self.cleaned_text, summary_report)
 
         except Exception as ex:
             self.status_text.value = f"❌ エラー: {str(ex)}"
@@ -431,36 +566,39 @@ class MedicalSummarizerApp:
         finally:
             self.process_button.disabled = False
             self.page.update()
+            self._export_metrics()
+
+    @profiled('summary')
+    def _execute_summary_generation(self, job_id: int):
+        """
+        ジョブを実行して要約を生成（確認モードOFF・確認完了後・中断したジョブの再開）
 
-    def _execute_summary_generation(self):
-        """要約生成を実行（確認モードOFFまたは確認完了後）"""
+        Args:
+            job_id: ジョブキューに登録したジョブのID
+        """
         try:
-            # 3. 要約生成
-            preset_key = self.preset_dropdown.value
             from src.presets import PresetManager
-            preset = PresetManager.get_preset(preset_key)
-
-            if preset.is_format_only:
-                self.status_text.value = "📝 テキストを整形中..."
-            else:
-                self.status_text.value = "🤖 AI要約を生成中..."
-            self.page.update()
-
-            summarizer = MedicalSummarizer()
-            self.summary_result = summarizer.generate_summary(
-                self.cleaned_text,
-                preset_key=preset_key
-            )
+            job = self._get_job_queue().get_job(job_id)
+            preset = PresetManager.get_preset(job.preset_key)
+
+            stage_messages = {
+                STAGE_READ: "📖 ファイルを読み込み中...",
+                STAGE_MASK: "🔒 個人情報を削除中...",
+                STAGE_SUMMARIZE: "📝 テキストを整形中..." if preset.is_format_only else "🤖 AI要約を生成中...",
+                STAGE_SAVE: "💾 ファイルを保存中...",
+            }
+
+            def on_progress(stage: str):
+                self.status_text.value = stage_messages[stage]
+                self.page.update()
 
-            if self.summary_result.error:
-                raise Exception(self.summary_result.error)
+            # 完了済みの段階はチェックポイントから再利用される
+            runner = JobRunner(self.job_queue, summarizer_factory=MedicalSummarizer)
+            self.summary_result, saved_files, self.cleaned_text = runner.run(job_id, progress=on_progress)
 
-            # 4. 結果表示
+            # 結果表示
             self._show_results()
 
-            # 5. ファイル保存
-            saved_files = summarizer.save_results(self.summary_result)
-
             self.status_text.value = f"✅ 完了しました！ ({len(saved_files)}件のファイルを保存)"
             self.status_text.color = "#388e3c"  # GREEN_700
             self.page.update()
@@ -470,6 +608,11 @@ class MedicalSummarizerApp:
             self.status_text.color = "#d32f2f"  # RED_700
             self.page.update()
 
+        finally:
+            # 確認モードOFFの場合は_on_processの最後に出力される
+            if self.confirmation_mode:
+                self._export_metrics()
+
     def _show_masked_text_with_summary(self, masked_text: str, summary_report: str):
         """マスクされたテキストと削除サマリーを表示（デバッグ用）"""
         self.result_container.controls.clear()
@@ -496,10 +639,14 @@ class MedicalSummarizerApp:
         # 検索フィールド
         self.search_field = ft.TextField(
             label="検索ワード（氏名、住所など）",
+            hint_text="複数の場合は「,」区切り",
             width=300,
             border_color="#1976d2",
         )
 
+        # 正規表現チェックボックス
+        self.regex_checkbox = ft.Checkbox(label="正規表現", value=False)
+
         # 検索結果表示テキスト
         self.search_result_text = ft.Text("", size=12, color="#616161")
 
@@ -537,25 +684,50 @@ class MedicalSummarizerApp:
             ),
         )
 
+        # すべて削除ボタン
+        delete_all_button = ft.ElevatedButton(
+            "❌ すべて削除",
+            on_click=self._on_delete_all_matches,
+            style=ft.ButtonStyle(
+                bgcolor="#d32f2f",
+                color="#ffffff",
+            ),
+        )
+
         # 検索バー
         search_bar = ft.Row([
             self.search_field,
+            self.regex_checkbox,
             search_button,
             prev_button,
             next_button,
             delete_button,
+            delete_all_button,
             self.search_result_text,
-        ], spacing=10)
-
-        # 編集可能なマスク済みテキストフィールド
-        self.masked_text_field = ft.TextField(
-            value=masked_text,
-            multiline=True,
-            min_lines=10,
-            max_lines=20,
-            border_color="#1976d2",  # BLUE_700
-            bgcolor="#ffffff",
+        ], spacing=10, wrap=True)
+
+        # 編集可能なマスク済みテキスト（表示範囲のページのみ描画）
+        self.masked_document = PagedDocument(masked_text)
+        self.masked_page_list = ft.ListView(
+            spacing=5,
+            height=500,
+            on_scroll=self._on_masked_text_scroll,
         )
+        self.masked_page_info = ft.Text("", size=12, color="#616161")
+        page_nav = ft.Row([
+            ft.IconButton(
+                icon="keyboard_arrow_up",
+                tooltip="前のページ",
+                on_click=lambda e: self._render_masked_pages(self.masked_window_first - 1),
+            ),
+            ft.IconButton(
+                icon="keyboard_arrow_down",
+                tooltip="次のページ",
+                on_click=lambda e: self._render_masked_pages(self.masked_window_first + 1),
+            ),
+            self.masked_page_info,
+        ], spacing=5)
+        self._render_masked_pages(0, update_page=False)
 
         # 確認完了して要約作成ボタン
         self.create_summary_button = ft.ElevatedButton(
@@ -577,7 +749,8 @@ class MedicalSummarizerApp:
                 instruction_text,
                 search_bar,
                 ft.Divider(),
-                self.masked_text_field,
+                page_nav,
+                self.masked_page_list,
                 self.create_summary_button,
             ]),
             padding=15,
@@ -588,6 +761,101 @@ class MedicalSummarizerApp:
         self.result_container.controls.append(masked_text_container)
         self.page.update()
 
+    def _create_masked_page_field(self, index: int) -> ft.TextField:
+        """マスク済みテキストの1ページ分の編集フィールドを作成"""
+        def on_change(e):
+            # 編集内容を文書全体に反映
+            self.masked_document.set_page(index, e.control.value or "")
+
+        return ft.TextField(
+            value=self.masked_document.get_page(index),
+            multiline=True,
+            min_lines=5,
+            border_color="#1976d2",  # BLUE_700
+            bgcolor="#ffffff",
+            label=f"{index + 1}/{self.masked_document.page_count}ページ",
+            on_change=on_change,
+            data=index,
+        )
+
+    def _render_masked_pages(self, first: int, update_page: bool = True):
+        """
+        指定ページから表示範囲のページだけを描画
+
+        Args:
+            first: 先頭に表示するページ番号
+            update_page: 画面を更新するか
+        """
+        page_count = self.masked_document.page_count
+        first = max(0, min(first, page_count - self.MASKED_WINDOW_PAGES))
+        last = min(page_count, first + self.MASKED_WINDOW_PAGES)
+        self.masked_window_first = first
+        self.masked_page_list.controls = [
+            self._create_masked_page_field(i) for i in range(first, last)
+        ]
+        self._update_masked_page_info(update_page)
+
+    def _update_masked_page_info(self, update_page: bool = True):
+        """表示中のページ番号を更新"""
+        controls = self.masked_page_list.controls
+        if controls:
+            self.masked_page_info.value = (
+                f"{controls[0].data + 1}〜{controls[-1].data + 1} / "
+                f"{self.masked_document.page_count}ページを表示中"
+            )
+        if update_page:
+            self.page.update()
+
+    def _on_masked_text_scroll(self, e):
+        """スクロール位置に応じて前後のページを読み込む"""
+        controls = self.masked_page_list.controls
+        if not controls:
+            return
+
+        pixels = getattr(e, 'pixels', 0) or 0
+        max_extent = getattr(e, 'max_scroll_extent', 0) or 0
+        first_index = controls[0].data
+        last_index = controls[-1].data
+
+        if pixels >= max_extent - 50 and last_index + 1 < self.masked_document.page_count:
+            # 末尾付近：次のページを追加し、先頭の古いページを外す
+            controls.append(self._create_masked_page_field(last_index + 1))
+            if len(controls) > self.MASKED_WINDOW_MAX_PAGES:
+                controls.pop(0)
+        elif pixels <= 0 and first_index > 0:
+            # 先頭付近：前のページを追加し、末尾のページを外す
+            controls.insert(0, self._create_masked_page_field(first_index - 1))
+            if len(controls) > self.MASKED_WINDOW_MAX_PAGES:
+                controls.pop()
+        else:
+            return
+
+        self.masked_window_first = controls[0].data
+        self._update_masked_page_info()
+
+    def _get_masked_text(self) -> str:
+        """確認画面のマスク済みテキスト全体を取得（編集内容を反映）"""
+        return self.masked_document.text if self.masked_document else ""
+
+    def _set_masked_text(self, text: str):
+        """確認画面のマスク済みテキスト全体を置き換える"""
+        self.masked_document.set_text(text)
+        self._render_masked_pages(self.masked_window_first, update_page=False)
+
+    def _reveal_masked_position(self, position: int):
+        """指定位置を含むページが表示範囲になければ表示する"""
+        page_index, _ = self.masked_document.locate(position)
+        controls = self.masked_page_list.controls
+        if not controls or not controls[0].data <= page_index <= controls[-1].data:
+            self._render_masked_pages(page_index, update_page=False)
+
+    def _get_search_index(self) -> TextSearchIndex:
+        """現在のテキストの検索索引を取得（テキストが変わっていれば作り直す）"""
+        text = self._get_masked_text()
+        if self.search_index is None or self.search_index.text != text:
+            self.search_index = TextSearchIndex(text)
+        return self.search_index
+
     def _on_search(self, e):
         """検索ボタンが押されたときの処理"""
         search_word = self.search_field.value
@@ -597,18 +865,16 @@ class MedicalSummarizerApp:
             self.page.update()
             return
 
-        # テキスト内を検索
-        text = self.masked_text_field.value
-        self.search_results = []
+        # 索引を使ってすべてのマッチ箇所を見つける
+        try:
+            spans = self._get_search_index().search(search_word, regex=self.regex_checkbox.value)
+        except re.error as ex:
+            self.search_result_text.value = f"正規表現が正しくありません: {ex}"
+            self.search_result_text.color = "#d32f2f"
+            self.page.update()
+            return
 
-        # すべてのマッチ箇所を見つける
-        start = 0
-        while True:
-            pos = text.find(search_word, start)
-            if pos == -1:
-                break
-            self.search_results.append(pos)
-            start = pos + 1
+        self.search_results = SearchResults(spans)
 
         if not self.search_results:
             self.search_result_text.value = f"「{search_word}」は見つかりませんでした"
@@ -641,13 +907,13 @@ class MedicalSummarizerApp:
         if not self.search_results:
             return
 
-        text = self.masked_text_field.value
-        pos = self.search_results[self.current_search_index]
-        search_word = self.search_field.value
+        text = self._get_masked_text()
+        pos, match_end = self.search_results.span(self.current_search_index)
+        self._reveal_masked_position(pos)
 
         # 周辺テキストを取得（前後50文字）
         start = max(0, pos - 50)
-        end = min(len(text), pos + len(search_word) + 50)
+        end = min(len(text), match_end + 50)
         context = text[start:end]
 
         # 検索結果情報を表示
@@ -659,6 +925,12 @@ class MedicalSummarizerApp:
         self.search_result_text.color = "#1976d2"
         self.page.update()
 
+    def _is_search_result_valid(self, text: str, position: int) -> bool:
+        """検索後にテキストが手動で編集されていないか確認"""
+        start, end = self.search_results.span(position)
+        original_start, original_end = self.search_results.original_span(position)
+        return text[start:end] == self.search_index.text[original_start:original_end]
+
     def _on_delete_current_match(self, e):
         """現在の検索結果を削除"""
         if not self.search_results:
@@ -667,20 +939,19 @@ class MedicalSummarizerApp:
             self.page.update()
             return
 
-        text = self.masked_text_field.value
-        pos = self.search_results[self.current_search_index]
-        search_word = self.search_field.value
+        text = self._get_masked_text()
+        if not self._is_search_result_valid(text, self.current_search_index):
+            self.search_results = []
+            self.search_result_text.value = "テキストが編集されたため、もう一度検索してください"
+            self.search_result_text.color = "#d32f2f"
+            self.page.update()
+            return
 
         # マッチ箇所を削除（空文字に置換）
-        new_text = text[:pos] + text[pos + len(search_word):]
-        self.masked_text_field.value = new_text
-
-        # 検索結果リストを更新（削除後の位置を再計算）
-        self.search_results.pop(self.current_search_index)
-
-        # 後続の検索結果の位置を調整
-        for i in range(self.current_search_index, len(self.search_results)):
-            self.search_results[i] -= len(search_word)
+        # 後続の検索結果の位置はSearchResultsが削除した長さから計算する
+        pos, end = self.search_results.delete(self.current_search_index)
+        self.masked_document.replace_range(pos, end, "")
+        self._render_masked_pages(self.masked_window_first, update_page=False)
 
         if self.search_results:
             # 次の結果を表示（範囲外なら最後の結果）
@@ -689,22 +960,68 @@ class MedicalSummarizerApp:
             self._show_search_result()
             self.search_result_text.value += "\n✅ 削除しました"
         else:
-            self.search_result_text.value = f"✅「{search_word}」はすべて削除されました"
+            self.search_result_text.value = f"✅「{self.search_field.value}」はすべて削除されました"
             self.search_result_text.color = "#388e3c"
 
         self.page.update()
 
+    def _on_delete_all_matches(self, e):
+        """すべての検索結果を一括削除"""
+        if not self.search_results:
+            self.search_result_text.value = "検索結果がありません"
+            self.search_result_text.color = "#d32f2f"
+            self.page.update()
+            return
+
+        text = self._get_masked_text()
+        if not all(self._is_search_result_valid(text, i) for i in range(len(self.search_results))):
+            self.search_results = []
+            self.search_result_text.value = "テキストが編集されたため、もう一度検索してください"
+            self.search_result_text.color = "#d32f2f"
+            self.page.update()
+            return
+
+        # 1回の走査でまとめて削除
+        count = len(self.search_results)
+        self._set_masked_text(remove_spans(text, self.search_results.spans()))
+        self.search_results = []
+
+        self.search_result_text.value = f"✅「{self.search_field.value}」を{count}件すべて削除しました"
+        self.search_result_text.color = "#388e3c"
+        self.page.update()
+
     def _on_create_summary_after_confirmation(self, e):
         """確認完了して要約作成ボタンが押されたときの処理"""
         # ユーザーが編集したテキストを取得
-        self.cleaned_text = self.masked_text_field.value
+        edited_text = self._get_masked_text()
+
+        # 編集されたセグメントのみ個人情報を再チェック
+        if self.incremental_masker:
+            remasked_text, new_log = self.incremental_masker.update(edited_text)
+            if new_log:
+                # 新たに検出された場合は確認画面に反映して、再度確認してもらう
+                self.pii_log.extend(new_log)
+                self._set_masked_text(remasked_text)
+                self.search_results = []
+                self._show_snack_bar(
+                    f"編集箇所から新たに{len(new_log)}件の個人情報を削除しました。"
+                    f"確認してから再度ボタンを押してください"
+                )
+                return
+            edited_text = remasked_text
+
+        self.cleaned_text = edited_text
 
         # 確認画面を非表示にする
         self.result_container.controls.clear()
         self.page.update()
 
-        # 要約生成を実行
-        self._execute_summary_generation()
+        # 確認済みのテキストをジョブとして登録し、要約生成を実行
+        job_id = self._get_job_queue().enqueue(
+            self.selected_files, self.preset_dropdown.value, masked_text=self.cleaned_text,
+            vault=self.pseudonym_vault
+        )
+        self._execute_summary_generation(job_id)
 
     def _show_results(self):
         """結果を表示"""
@@ -1319,7 +1636,7 @@ class MedicalSummarizerApp:
             min_lines=10,
             max_lines=20,
             border_color="#1976d2",
-            hint_text="「{text}」を含めることで、文書の内容が挿入されます",
+            hint_text="「{text}」の位置に文書の内容が、「{target_chars}」に目標文字数、「{date}」に作成日が挿入されます",
             autofocus=False,
         )
 
@@ -1420,4 +1737,7 @@ def main(page: ft.Page):
 
 
 if __name__ == "__main__":
+    # 実行ファイル化した場合に、並列処理用のプロセスがアプリを再起動しないようにする
+    import multiprocessing
+    multiprocessing.freeze_support()
     ft.app(target=main)
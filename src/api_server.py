@@ -0,0 +1,524 @@
+"""
+HTTP APIサーバーモジュール
+院内の他のシステムから要約を依頼できるよう、ファイル読み込み→個人情報削除→要約生成を
+ローカルのHTTP APIとして提供します（1つのサーバーを複数の端末で共有できます）
+
+エンドポイント:
+    GET  /health            動作確認
+    GET  /presets           使用できるプリセットの一覧
+    POST /uploads           ファイルのアップロード（本文がファイルの内容、X-Filename にファイル名）
+    POST /jobs              要約の依頼 {"uploads": [アップロードID, ...], "preset": "summary"}
+    GET  /jobs/{id}         ジョブの状態（完了していれば要約を含む）
+
+個人情報を含むファイル名はURLに入れず、ヘッダーで受け取ります（アクセスログに残さないため）
+"""
+
+import hmac
+import json
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple, Union
+from urllib.parse import unquote
+
+from src.file_reader import FileReader, FileLimitError
+from src.job_queue import JobQueue, JobRunner, STAGE_SAVE, STATUS_DONE
+
+
+# 対象のファイル形式
+SUPPORTED_SUFFIXES = ('.txt', '.pdf', '.jpg', '.jpeg', '.png')
+
+# アップロードを読み込む単位（ファイル全体をメモリに保持しない）
+UPLOAD_CHUNK_BYTES = 1024 * 1024
+
+# JSONの依頼本文の上限
+MAX_JSON_BYTES = 64 * 1024
+
+# 期限を過ぎたアップロード・ジョブのフォルダを削除する間隔（秒）
+CLEANUP_INTERVAL_SEC = 600
+
+_UPLOAD_ID_PATTERN = re.compile(r'^[0-9a-f]{32}$')
+_JOB_PATH_PATTERN = re.compile(r'^/jobs/(\d+)$')
+
+
+class ApiError(Exception):
+    """HTTPのエラー応答にする例外"""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+class ApiService:
+    """アップロードの保存とジョブの実行を行うクラス（HTTPの処理とは分離）"""
+
+    def __init__(
+        self,
+        data_dir: Optional[Union[str, Path]] = None,
+        workers: Optional[int] = None,
+        queue: Optional[JobQueue] = None,
+        summarizer_factory: Optional[Callable] = None
+    ):
+        """
+        初期化
+
+        Args:
+            data_dir: アップロードと結果の保存先（Noneの場合は設定ディレクトリの api/）
+            workers: 同時に実行するジョブ数（Noneの場合は設定に従う）
+            queue: ジョブキュー（Noneの場合は設定ディレクトリのもの）
+            summarizer_factory: MedicalSummarizerを作成する関数（Noneの場合は既定）
+        """
+        from src.config import config
+
+        self.data_dir = Path(data_dir or config.get_config_manager().config_dir / 'api').resolve()
+        self.uploads_dir = self.data_dir / 'uploads'
+        self.jobs_dir = self.data_dir / 'jobs'
+        for directory in (self.data_dir, self.uploads_dir, self.jobs_dir):
+            directory.mkdir(parents=True, exist_ok=True)
+        try:
+            os.chmod(self.data_dir, 0o700)  # 所有者のみアクセス可能
+        except OSError:
+            pass
+
+        self.workers = max(1, workers or config.API_WORKERS)
+        self.queue = queue or JobQueue()
+        self.summarizer_factory = summarizer_factory
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='api')
+        self._lock = threading.Lock()
+
+        # 個人情報を含むファイルを残し続けないよう、起動時と一定間隔で期限切れのものを削除
+        self._stop = threading.Event()
+        self.cleanup()
+        self._cleanup_thread = threading.Thread(target=self._cleanup_loop, name='api-cleanup', daemon=True)
+        self._cleanup_thread.start()
+
+    # ========== アップロード ==========
+
+    def save_upload(self, file_name: str, stream, length: int) -> str:
+        """
+        アップロードされたファイルを少しずつ保存
+
+        Args:
+            file_name: ファイル名
+            stream: 本文を読み込むストリーム
+            length: 本文のバイト数
+
+        Returns:
+            str: アップロードID
+
+        Raises:
+            ApiError: 対応していない形式・上限超過・本文の途中切断
+        """
+        from src.config import config
+
+        file_name = Path(file_name.replace('\\', '/')).name
+        if not file_name or Path(file_name).suffix.lower() not in SUPPORTED_SUFFIXES:
+            raise ApiError(400, f"対応していないファイル形式です（対応形式: {', '.join(SUPPORTED_SUFFIXES)}）")
+        if length > config.MAX_FILE_SIZE_MB * 1024 * 1024:
+            raise ApiError(413, f"ファイルサイズが上限（{config.MAX_FILE_SIZE_MB:g}MB）を超えています")
+
+        upload_id = uuid.uuid4().hex
+        upload_dir = self.uploads_dir / upload_id
+        upload_dir.mkdir()
+        path = upload_dir / file_name
+        try:
+            remaining = length
+            with open(path, 'wb') as f:
+                while remaining > 0:
+                    chunk = stream.read(min(remaining, UPLOAD_CHUNK_BYTES))
+                    if not chunk:
+                        raise ApiError(400, "アップロードが途中で切断されました")
+                    f.write(chunk)
+                    remaining -= len(chunk)
+            FileReader.check_file_limits(path)
+        except FileLimitError as e:
+            shutil.rmtree(upload_dir, ignore_errors=True)
+            raise ApiError(413, str(e))
+        except Exception:
+            shutil.rmtree(upload_dir, ignore_errors=True)
+            raise
+        return upload_id
+
+    def _upload_path(self, upload_id: str) -> Path:
+        """アップロードIDから保存したファイルのパスを取得"""
+        if not _UPLOAD_ID_PATTERN.match(upload_id or ''):
+            raise ApiError(400, f"アップロードIDが不正です: {upload_id}")
+        upload_dir = self.uploads_dir / upload_id
+        files = list(upload_dir.iterdir()) if upload_dir.exists() else []
+        if not files:
+            raise ApiError(404, f"アップロードが見つかりません: {upload_id}")
+        return files[0]
+
+    # ========== ジョブ ==========
+
+    def create_job(self, upload_ids: List[str], preset_key: str) -> int:
+        """
+        アップロード済みのファイルから要約ジョブを作成して実行
+
+        Args:
+            upload_ids: 同じ患者のファイルのアップロードID
+            preset_key: 使用するプリセット
+
+        Returns:
+            int: ジョブID
+
+        Raises:
+            ApiError: 不正な依頼
+        """
+        from src.presets import PresetManager
+
+        if not upload_ids:
+            raise ApiError(400, "uploads を指定してください")
+        if preset_key not in PresetManager.get_all_presets():  # カスタムプリセットを含む
+            raise ApiError(400, f"プリセットが見つかりません: {preset_key}")
+
+        with self._lock:
+            paths = [self._upload_path(upload_id) for upload_id in dict.fromkeys(upload_ids)]
+            try:
+                FileReader.check_batch_limits(paths)
+            except FileLimitError as e:
+                raise ApiError(413, str(e))
+
+            # ジョブごとのフォルダに移動（同じアップロードを別のジョブで使えないようにする）
+            job_dir = Path(tempfile.mkdtemp(
+                prefix=datetime.now().strftime('%Y%m%d_%H%M%S_'), dir=self.jobs_dir
+            ))
+            files = []
+            for index, path in enumerate(paths):
+                target = job_dir / f"{index:03d}_{path.name}"
+                shutil.move(str(path), str(target))
+                shutil.rmtree(path.parent, ignore_errors=True)
+                files.append(target)
+
+        job_id = self.queue.enqueue(files, preset_key, output_dir=str(job_dir))
+        self._start(job_id)
+        return job_id
+
+    def _start(self, job_id: int):
+        self._executor.submit(self._run_job, job_id)
+
+    def _run_job(self, job_id: int):
+        """ジョブを実行し、完了したらアップロードされた元のファイルを削除"""
+        runner = JobRunner(self.queue, summarizer_factory=self.summarizer_factory)
+        try:
+            runner.run(job_id)
+        except Exception as e:
+            print(f"❌ ジョブ{job_id}でエラーが発生しました: {e}")
+            return
+
+        # 元のファイル（個人情報を含む）は要約の完了後に削除
+        job = self.queue.get_job(job_id)
+        for file_path in job.files:
+            Path(file_path).unlink(missing_ok=True)
+        print(f"✅ ジョブ{job_id}が完了しました")
+
+    def get_job(self, job_id: int) -> Dict:
+        """
+        ジョブの状態を取得
+
+        Args:
+            job_id: ジョブID
+
+        Returns:
+            Dict: 状態（完了していれば要約を含む）
+
+        Raises:
+            ApiError: このサーバーのジョブでない
+        """
+        job = self.queue.get_job(job_id)
+        if job is None or not self._is_api_job(job.output_dir):
+            raise ApiError(404, f"ジョブが見つかりません: {job_id}")
+
+        response = {
+            'id': job.id,
+            'status': job.status,
+            'preset': job.preset_key,
+            'error': job.error,
+            'created_at': job.created_at,
+            'updated_at': job.updated_at,
+        }
+        if job.status == STATUS_DONE:
+            content = self._read_summary(job.id)
+            response['summary'] = content
+            response['char_count'] = len(content)
+        return response
+
+    def _read_summary(self, job_id: int) -> str:
+        """
+        保存した要約ファイルを読み込む
+
+        仮名化した場合、ジョブキューの要約は記号のままで保管庫も完了時に削除されるため、
+        元の値に戻して保存したファイルから返します
+
+        Args:
+            job_id: ジョブID
+
+        Returns:
+            str: 要約（要約が空の場合は空文字列）
+
+        Raises:
+            ApiError: 要約ファイルが削除されている
+        """
+        saved = self.queue.get_checkpoint(job_id, STAGE_SAVE) or {}
+        if not saved.get('summary'):
+            return ''
+        try:
+            return Path(saved['summary']).read_text(encoding='utf-8')
+        except OSError:
+            raise ApiError(410, f"要約ファイルが見つかりません（保存期間を過ぎた可能性があります）: {job_id}")
+
+    def _is_api_job(self, output_dir: Optional[str]) -> bool:
+        return bool(output_dir) and Path(output_dir).parent == self.jobs_dir
+
+    def resume_unfinished(self) -> List[int]:
+        """
+        前回中断した（またはエラーになった）APIのジョブを再実行
+
+        Returns:
+            List[int]: 再実行したジョブID
+        """
+        resumed = []
+        for job in self.queue.unfinished_jobs():
+            if self._is_api_job(job.output_dir) and Path(job.output_dir).exists():
+                self.queue.retry(job.id)
+                self._start(job.id)
+                resumed.append(job.id)
+        return resumed
+
+    # ========== 期限切れのファイルの削除 ==========
+
+    def cleanup(self) -> Tuple[int, int]:
+        """
+        期限を過ぎたアップロードとジョブのフォルダを削除
+
+        ジョブに使われないまま api_upload_expiry_hours を過ぎたアップロードと、
+        保存期間（job_retention_hours）を過ぎてジョブキューから削除されたジョブのフォルダ
+        （元に戻した要約・生成の記録）を削除します
+
+        Returns:
+            Tuple[int, int]: (削除したアップロードの数, 削除したジョブのフォルダの数)
+        """
+        from src.config import config
+
+        self.queue.purge_expired()
+        now = time.time()
+        upload_cutoff = now - config.API_UPLOAD_EXPIRY_HOURS * 3600
+        job_cutoff = now - config.JOB_RETENTION_HOURS * 3600
+
+        with self._lock:
+            uploads = [
+                directory for directory in self.uploads_dir.iterdir()
+                if directory.is_dir() and self._last_modified(directory) < upload_cutoff
+            ]
+            for directory in uploads:
+                shutil.rmtree(directory, ignore_errors=True)
+
+            # ジョブキューに残っているジョブのフォルダは残す（作成直後で登録前のものも残す）
+            active = {
+                Path(job.output_dir) for job in self.queue.list_jobs() if self._is_api_job(job.output_dir)
+            }
+            job_dirs = [
+                directory for directory in self.jobs_dir.iterdir()
+                if directory.is_dir() and directory not in active
+                and self._last_modified(directory) < min(job_cutoff, upload_cutoff)
+            ]
+            for directory in job_dirs:
+                shutil.rmtree(directory, ignore_errors=True)
+
+        if uploads or job_dirs:
+            print(f"🗑  期限切れのアップロード {len(uploads)}件・ジョブのフォルダ {len(job_dirs)}件を削除しました")
+        return len(uploads), len(job_dirs)
+
+    @staticmethod
+    def _last_modified(directory: Path) -> float:
+        """フォルダとその中のファイルの最終更新時刻（アップロード中のファイルを削除しないため）"""
+        latest = directory.stat().st_mtime
+        for path in directory.iterdir():
+            try:
+                latest = max(latest, path.stat().st_mtime)
+            except OSError:
+                pass
+        return latest
+
+    def _cleanup_loop(self):
+        while not self._stop.wait(CLEANUP_INTERVAL_SEC):
+            try:
+                self.cleanup()
+            except Exception as e:
+                print(f"⚠️  期限切れのファイルを削除できませんでした: {e}")
+
+    def close(self):
+        """実行中のジョブの完了を待ってから終了"""
+        self._stop.set()
+        self._executor.shutdown(wait=True)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """HTTPリクエストの処理（サーバーの service 属性の ApiService を使用）"""
+
+    server_version = "SummaryForDoc"
+
+    @property
+    def service(self) -> ApiService:
+        return self.server.service
+
+    def log_message(self, format, *args):
+        # 既定のログはクエリ文字列を含むため、メソッドとパスのみ表示
+        print(f"{self.address_string()} {self.command} {self.path.split('?')[0]} {args[1] if len(args) > 1 else ''}")
+
+    def _send_json(self, status: int, data: Dict):
+        body = json.dumps(data, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _check_token(self):
+        from src.config import config
+        if not config.API_TOKEN:
+            return
+        expected = f"Bearer {config.API_TOKEN}"
+        if not hmac.compare_digest(self.headers.get('Authorization', ''), expected):
+            raise ApiError(401, "認証に失敗しました")
+
+    def _content_length(self) -> int:
+        length = self.headers.get('Content-Length')
+        if length is None:
+            raise ApiError(411, "Content-Length を指定してください")
+        try:
+            return int(length)
+        except ValueError:
+            raise ApiError(400, "Content-Length が不正です")
+
+    def _read_json(self) -> Dict:
+        length = self._content_length()
+        if length > MAX_JSON_BYTES:
+            raise ApiError(413, "依頼の本文が大きすぎます")
+        try:
+            return json.loads(self.rfile.read(length) or b'{}')
+        except ValueError:
+            raise ApiError(400, "JSONの形式が不正です")
+
+    def _dispatch(self, routes: Dict[str, Callable[[], Tuple[int, Dict]]], job_route=None):
+        try:
+            self._check_token()
+            path = self.path.split('?')[0]
+            if path in routes:
+                status, data = routes[path]()
+            elif job_route and _JOB_PATH_PATTERN.match(path):
+                status, data = job_route(int(_JOB_PATH_PATTERN.match(path).group(1)))
+            else:
+                raise ApiError(404, "見つかりません")
+        except ApiError as e:
+            self.close_connection = True
+            status, data = e.status, {'error': str(e)}
+        except Exception as e:
+            status, data = 500, {'error': f"サーバーエラー: {str(e)}"}
+        self._send_json(status, data)
+
+    def do_GET(self):
+        self._dispatch({
+            '/health': lambda: (200, {'status': 'ok'}),
+            '/presets': self._get_presets,
+        }, job_route=lambda job_id: (200, self.service.get_job(job_id)))
+
+    def do_POST(self):
+        self._dispatch({
+            '/uploads': self._post_upload,
+            '/jobs': self._post_job,
+        })
+
+    def _get_presets(self) -> Tuple[int, Dict]:
+        from src.presets import PresetManager
+        presets = PresetManager.get_all_presets()
+        return 200, {'presets': [
+            {'key': key, 'name': preset.name, 'description': preset.description}
+            for key, preset in presets.items()
+        ]}
+
+    def _post_upload(self) -> Tuple[int, Dict]:
+        file_name = unquote(self.headers.get('X-Filename', ''))
+        upload_id = self.service.save_upload(file_name, self.rfile, self._content_length())
+        return 201, {'upload_id': upload_id}
+
+    def _post_job(self) -> Tuple[int, Dict]:
+        data = self._read_json()
+        upload_ids = data.get('uploads') or []
+        if not isinstance(upload_ids, list):
+            raise ApiError(400, "uploads はアップロードIDの配列で指定してください")
+        job_id = self.service.create_job(upload_ids, data.get('preset') or 'summary')
+        return 202, {'job_id': job_id, 'status_url': f"/jobs/{job_id}"}
+
+
+def create_server(service: ApiService, host: Optional[str] = None, port: Optional[int] = None) -> ThreadingHTTPServer:
+    """
+    HTTPサーバーを作成（リクエストはスレッドごとに並行して処理）
+
+    Args:
+        service: ApiService
+        host: 待ち受けるアドレス（Noneの場合は設定に従う）
+        port: 待ち受けるポート（Noneの場合は設定に従う、0は空いているポート）
+
+    Returns:
+        ThreadingHTTPServer: サーバー（serve_forever() で開始）
+    """
+    from src.config import config
+
+    server = ThreadingHTTPServer(
+        (host or config.API_HOST, config.API_PORT if port is None else port), _Handler
+    )
+    server.daemon_threads = True
+    server.service = service
+    return server
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """HTTP APIサーバーのコマンド"""
+    import argparse
+
+    from src.config import config
+
+    parser = argparse.ArgumentParser(description="要約のHTTP APIサーバーを起動します")
+    parser.add_argument('--host', default=config.API_HOST, help="待ち受けるアドレス")
+    parser.add_argument('--port', type=int, default=config.API_PORT, help="待ち受けるポート")
+    parser.add_argument('--workers', type=int, default=config.API_WORKERS, help="同時に実行するジョブ数")
+    args = parser.parse_args(argv)
+
+    errors = config.validate_config()
+    if errors:
+        for error in errors:
+            print(f"❌ {error}")
+        return 1
+
+    if args.host not in ('127.0.0.1', 'localhost', '::1') and not config.API_TOKEN:
+        print("⚠️  院内ネットワークに公開する場合は api_token を設定してください")
+
+    service = ApiService(workers=args.workers)
+    resumed = service.resume_unfinished()
+    if resumed:
+        print(f"中断していたジョブを再開します: {resumed}")
+
+    server = create_server(service, args.host, args.port)
+    print(f"APIサーバーを起動しました: http://{args.host}:{server.server_address[1]}（同時実行数: {service.workers}）")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nAPIサーバーを終了します（実行中のジョブの完了を待っています）")
+    finally:
+        server.server_close()
+        service.close()
+    return 0
+
+
+if __name__ == "__main__":
+    import sys
+    sys.exit(main())
@@ -43,6 +43,120 @@ class Config:
         else os.getenv("AI_MODEL", "claude-3-5-haiku-20241022")
     )
 
+    # API呼び出しの再試行回数（レート制限・接続エラー・サーバーエラーの場合）
+    API_MAX_RETRIES = int(
+        _user_config.get("api_max_retries", 2) if _user_config
+        else os.getenv("API_MAX_RETRIES", "2")
+    )
+
+    # 計測結果の出力形式（jsonl / prometheus、未設定なら出力しない）
+    METRICS_EXPORT_FORMAT = (
+        _user_config.get("metrics_export_format") if _user_config
+        else os.getenv("METRICS_EXPORT_FORMAT")
+    )
+
+    # プロファイリング（処理が閾値秒数を超えた場合にトレースを保存）
+    PROFILING_ENABLED = bool(
+        _user_config.get("profiling_enabled", False) if _user_config
+        else os.getenv("PROFILING_ENABLED", "").lower() in ("1", "true")
+    )
+    PROFILING_THRESHOLD_SEC = float(
+        _user_config.get("profiling_threshold_sec", 30) if _user_config
+        else os.getenv("PROFILING_THRESHOLD_SEC", "30")
+    )
+
+    # PDFのテキスト抽出エンジン（auto / pdfium / pdfminer / pypdf2）
+    PDF_BACKEND = (
+        _user_config.get("pdf_backend", "auto") if _user_config
+        else os.getenv("PDF_BACKEND", "auto")
+    )
+
+    # 個人情報削除のプロセス数（0: CPU数、1: 並列化しない）
+    MASK_WORKERS = int(
+        _user_config.get("mask_workers", 0) if _user_config
+        else os.getenv("MASK_WORKERS", "0")
+    )
+
+    # 仮名化（個人情報を[氏名1]などの番号付きの記号に置換し、要約では元の値に戻す）
+    PSEUDONYMIZE = bool(
+        _user_config.get("pseudonymize", False) if _user_config
+        else os.getenv("PSEUDONYMIZE", "").lower() in ("1", "true")
+    )
+
+    # 送信前チェック（mask: 残った個人情報をマスクして送信 / block: 送信を中止 / off: 検査しない）
+    LEAK_SCAN_MODE = (
+        _user_config.get("leak_scan_mode", "mask") if _user_config
+        else os.getenv("LEAK_SCAN_MODE", "mask")
+    )
+
+    # 個人情報削除の前に全角英数字・半角カタカナなどを正規化
+    NORMALIZE_TEXT = bool(
+        _user_config.get("normalize_text", True) if _user_config
+        else os.getenv("NORMALIZE_TEXT", "true").lower() in ("1", "true")
+    )
+
+    # 画像・PDFのOCR結果から繰り返しのヘッダー・フッターや記号のノイズを除去
+    OCR_CLEANUP = bool(
+        _user_config.get("ocr_cleanup", True) if _user_config
+        else os.getenv("OCR_CLEANUP", "true").lower() in ("1", "true")
+    )
+
+    # 複数ファイル間の重複除去（off / exact / near）
+    DEDUPE_MODE = (
+        _user_config.get("dedupe_mode", "exact") if _user_config
+        else os.getenv("DEDUPE_MODE", "exact")
+    )
+
+    # ジョブの記録（チェックポイント・仮名化の保管庫）を残す時間（起動時にこれより古いものを削除）
+    JOB_RETENTION_HOURS = float(
+        _user_config.get("job_retention_hours", 24) if _user_config
+        else os.getenv("JOB_RETENTION_HOURS", "24")
+    )
+
+    # 監視フォルダ（python -m src.folder_watcher で使用）
+    WATCH_DIR = (
+        _user_config.get("watch_dir") if _user_config
+        else os.getenv("WATCH_DIR")
+    )
+    WATCH_PRESET = (
+        _user_config.get("watch_preset", "summary") if _user_config
+        else os.getenv("WATCH_PRESET", "summary")
+    )
+    WATCH_WORKERS = int(  # 同時に処理する患者数
+        _user_config.get("watch_workers", 2) if _user_config
+        else os.getenv("WATCH_WORKERS", "2")
+    )
+    WATCH_SETTLE_SEC = float(  # 書き込み完了とみなすまでの待ち時間
+        _user_config.get("watch_settle_sec", 10) if _user_config
+        else os.getenv("WATCH_SETTLE_SEC", "10")
+    )
+    WATCH_RETRIES = int(  # エラーになったジョブを再実行する回数（超えたら failed/ に移動）
+        _user_config.get("watch_retries", 2) if _user_config
+        else os.getenv("WATCH_RETRIES", "2")
+    )
+
+    # HTTP APIサーバー（python -m src.api_server で使用）
+    API_HOST = (
+        _user_config.get("api_host", "127.0.0.1") if _user_config
+        else os.getenv("API_HOST", "127.0.0.1")
+    )
+    API_PORT = int(
+        _user_config.get("api_port", 8765) if _user_config
+        else os.getenv("API_PORT", "8765")
+    )
+    API_WORKERS = int(  # 同時に実行するジョブ数
+        _user_config.get("api_workers", 2) if _user_config
+        else os.getenv("API_WORKERS", "2")
+    )
+    API_TOKEN = (  # 設定した場合は Authorization: Bearer <トークン> が必要
+        _user_config.get("api_token") if _user_config
+        else os.getenv("API_TOKEN")
+    )
+    API_UPLOAD_EXPIRY_HOURS = float(  # ジョブに使われなかったアップロードを削除するまでの時間
+        _user_config.get("api_upload_expiry_hours", 1) if _user_config
+        else os.getenv("API_UPLOAD_EXPIRY_HOURS", "1")
+    )
+
     # ディレクトリ設定
     BASE_DIR = Path(__file__).parent.parent
     OUTPUT_DIR = BASE_DIR / "output"
@@ -52,8 +166,29 @@ class Config:
     OUTPUT_DIR.mkdir(exist_ok=True)
     TESTS_DIR.mkdir(exist_ok=True)
 
-    # ファイルサイズ制限（MB）
-    MAX_FILE_SIZE_MB = 10
+    # 読み込みの上限（超えるファイルは読み込まずにエラーにする）
+    MAX_FILE_SIZE_MB = float(  # 1ファイルの大きさ
+        _user_config.get("max_file_size_mb", 100) if _user_config
+        else os.getenv("MAX_FILE_SIZE_MB", "100")
+    )
+    MAX_BATCH_SIZE_MB = float(  # 1回に処理するファイルの合計
+        _user_config.get("max_batch_size_mb", 300) if _user_config
+        else os.getenv("MAX_BATCH_SIZE_MB", "300")
+    )
+    MAX_PDF_PAGES = int(  # PDF 1ファイルのページ数
+        _user_config.get("max_pdf_pages", 500) if _user_config
+        else os.getenv("MAX_PDF_PAGES", "500")
+    )
+    MAX_IMAGE_MEGAPIXELS = float(  # 画像1枚の画素数（百万画素）
+        _user_config.get("max_image_megapixels", 150) if _user_config
+        else os.getenv("MAX_IMAGE_MEGAPIXELS", "150")
+    )
+
+    # これ以上の大きさのファイルは、全体をバッファに読み込まない方法で処理する（MB）
+    STREAMING_THRESHOLD_MB = float(
+        _user_config.get("streaming_threshold_mb", 8) if _user_config
+        else os.getenv("STREAMING_THRESHOLD_MB", "8")
+    )
 
     # 対応ファイル形式
     SUPPORTED_TEXT_FORMATS = [".txt"]
@@ -114,6 +249,148 @@ class Config:
             else os.getenv("AI_MODEL", "claude-3-5-haiku-20241022")
         )
 
+        # API呼び出しの再試行回数
+        cls.API_MAX_RETRIES = int(
+            cls._user_config.get("api_max_retries", 2) if cls._user_config
+            else os.getenv("API_MAX_RETRIES", "2")
+        )
+
+        # 計測結果の出力形式
+        cls.METRICS_EXPORT_FORMAT = (
+            cls._user_config.get("metrics_export_format") if cls._user_config
+            else os.getenv("METRICS_EXPORT_FORMAT")
+        )
+
+        # プロファイリング
+        cls.PROFILING_ENABLED = bool(
+            cls._user_config.get("profiling_enabled", False) if cls._user_config
+            else os.getenv("PROFILING_ENABLED", "").lower() in ("1", "true")
+        )
+        cls.PROFILING_THRESHOLD_SEC = float(
+            cls._user_config.get("profiling_threshold_sec", 30) if cls._user_config
+            else os.getenv("PROFILING_THRESHOLD_SEC", "30")
+        )
+
+        # PDFのテキスト抽出エンジン
+        cls.PDF_BACKEND = (
+            cls._user_config.get("pdf_backend", "auto") if cls._user_config
+            else os.getenv("PDF_BACKEND", "auto")
+        )
+
+        # 読み込みの上限
+        cls.MAX_FILE_SIZE_MB = float(
+            cls._user_config.get("max_file_size_mb", 100) if cls._user_config
+            else os.getenv("MAX_FILE_SIZE_MB", "100")
+        )
+        cls.MAX_BATCH_SIZE_MB = float(
+            cls._user_config.get("max_batch_size_mb", 300) if cls._user_config
+            else os.getenv("MAX_BATCH_SIZE_MB", "300")
+        )
+        cls.MAX_PDF_PAGES = int(
+            cls._user_config.get("max_pdf_pages", 500) if cls._user_config
+            else os.getenv("MAX_PDF_PAGES", "500")
+        )
+        cls.MAX_IMAGE_MEGAPIXELS = float(
+            cls._user_config.get("max_image_megapixels", 150) if cls._user_config
+            else os.getenv("MAX_IMAGE_MEGAPIXELS", "150")
+        )
+        cls.STREAMING_THRESHOLD_MB = float(
+            cls._user_config.get("streaming_threshold_mb", 8) if cls._user_config
+            else os.getenv("STREAMING_THRESHOLD_MB", "8")
+        )
+
+        # ジョブの記録を残す時間
+        cls.JOB_RETENTION_HOURS = float(
+            cls._user_config.get("job_retention_hours", 24) if cls._user_config
+            else os.getenv("JOB_RETENTION_HOURS", "24")
+        )
+
+        # 監視フォルダ
+        cls.WATCH_DIR = (
+            cls._user_config.get("watch_dir") if cls._user_config
+            else os.getenv("WATCH_DIR")
+        )
+        cls.WATCH_PRESET = (
+            cls._user_config.get("watch_preset", "summary") if cls._user_config
+            else os.getenv("WATCH_PRESET", "summary")
+        )
+        cls.WATCH_WORKERS = int(
+            cls._user_config.get("watch_workers", 2) if cls._user_config
+            else os.getenv("WATCH_WORKERS", "2")
+        )
+        cls.WATCH_SETTLE_SEC = float(
+            cls._user_config.get("watch_settle_sec", 10) if cls._user_config
+            else os.getenv("WATCH_SETTLE_SEC", "10")
+        )
+        cls.WATCH_RETRIES = int(
+            cls._user_config.get("watch_retries", 2) if cls._user_config
+            else os.getenv("WATCH_RETRIES", "2")
+        )
+
+        # HTTP APIサーバー
+        cls.API_HOST = (
+            cls._user_config.get("api_host", "127.0.0.1") if cls._user_config
+            else os.getenv("API_HOST", "127.0.0.1")
+        )
+        cls.API_PORT = int(
+            cls._user_config.get("api_port", 8765) if cls._user_config
+            else os.getenv("API_PORT", "8765")
+        )
+        cls.API_WORKERS = int(
+            cls._user_config.get("api_workers", 2) if cls._user_config
+            else os.getenv("API_WORKERS", "2")
+        )
+        cls.API_TOKEN = (
+            cls._user_config.get("api_token") if cls._user_config
+            else os.getenv("API_TOKEN")
+        )
+        cls.API_UPLOAD_EXPIRY_HOURS = float(
+            cls._user_config.get("api_upload_expiry_hours", 1) if cls._user_config
+            else os.getenv("API_UPLOAD_EXPIRY_HOURS", "1")
+        )
+
+        # 個人情報削除のプロセス数
+        cls.MASK_WORKERS = int(
+            cls._user_config.get("mask_workers", 0) if cls._user_config
+            else os.getenv("MASK_WORKERS", "0")
+        )
+
+        # 仮名化
+        cls.PSEUDONYMIZE = bool(
+            cls._user_config.get("pseudonymize", False) if cls._user_config
+            else os.getenv("PSEUDONYMIZE", "").lower() in ("1", "true")
+        )
+
+        # 送信前チェック
+        cls.LEAK_SCAN_MODE = (
+            cls._user_config.get("leak_scan_mode", "mask") if cls._user_config
+            else os.getenv("LEAK_SCAN_MODE", "mask")
+        )
+
+        # 文字の正規化
+        cls.NORMALIZE_TEXT = bool(
+            cls._user_config.get("normalize_text", True) if cls._user_config
+            else os.getenv("NORMALIZE_TEXT", "true").lower() in ("1", "true")
+        )
+
+        # OCRノイズの除去
+        cls.OCR_CLEANUP = bool(
+            cls._user_config.get("ocr_cleanup", True) if cls._user_config
+            else os.getenv("OCR_CLEANUP", "true").lower() in ("1", "true")
+        )
+
+        # 重複除去
+        cls.DEDUPE_MODE = (
+            cls._user_config.get("dedupe_mode", "exact") if cls._user_config
+            else os.getenv("DEDUPE_MODE", "exact")
+        )
+
+    @classmethod
+    def get_metrics_export_path(cls):
+        """計測結果の出力先を取得（設定ディレクトリ内）"""
+        suffix = "prom" if cls.METRICS_EXPORT_FORMAT == "prometheus" else "jsonl"
+        return _config_manager.config_dir / f"metrics.{suffix}"
+
     @classmethod
     def validate_config(cls):
         """設定の検証"""
@@ -265,14 +265,16 @@ class ConfigManager:
         if 'custom_presets' not in config_data:
             config_data['custom_presets'] = {}
 
-        # プリセットを保存
-        config_data['custom_presets'][key] = {
+        # プリセットを保存（設定ファイルで追加した項目（disabled_pii_detectors など）は残す）
+        preset_data = config_data['custom_presets'].get(key, {})
+        preset_data.update({
             'name': name,
             'description': description,
             'prompt': prompt,
             'max_tokens': max_tokens,
             'target_chars': target_chars
-        }
+        })
+        config_data['custom_presets'][key] = preset_data
 
         return self.save_config(config_data)
 
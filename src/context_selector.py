@@ -0,0 +1,250 @@
+"""
+文脈選択モジュール
+短い出力のプリセットで、プロンプトの「必ず含める項目」に関連する段落だけを
+トークン数の上限まで選び出してから要約に送ります（外部サービスを使わずローカルで処理します）
+"""
+
+import math
+import re
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+from src.metrics import metrics
+from src.text_segments import split_segments
+from src.text_stats import estimate_tokens
+
+
+# 1つの段落の最大文字数（長い段落は改行位置で分割）
+PASSAGE_CHARS = 600
+
+# 選ばれなかった段落を省略した箇所の表示
+OMISSION_MARK = "［…中略…］"
+
+# プロンプト中の項目行（「- 発症時期」「1. 診断名」など）
+_ITEM_LINE_PATTERN = re.compile(r'^\s*(?:[-・*]|\d+\.)\s*(.+)$', re.MULTILINE)
+
+# 出力の指示（【出力】以降）
+_OUTPUT_SECTION_PATTERN = re.compile(r'【出力】\s*(.+)', re.DOTALL)
+
+# 検索語に使わないバイグラム（ひらがな・記号・空白のみ）
+_NOISE_BIGRAM_PATTERN = re.compile(r'^[぀-ゟ\s\W\d]+$')
+
+# 日付（西暦・和暦）
+_YEAR_PATTERN = re.compile(r'((?:19|20)\d{2})\s*[年/.\-]|(令和|平成|昭和)\s*(\d{1,2}|元)\s*年')
+_ERA_OFFSETS = {'令和': 2018, '平成': 1988, '昭和': 1925}
+
+# 現在の状態を重視するプリセットかどうかの判定語
+_RECENCY_TERMS = ('現在', '今後')
+
+
+@dataclass
+class ContextSelection:
+    """文脈選択の結果"""
+    text: str                # 選択した段落を元の順に連結したテキスト
+    total_passages: int = 0  # 段落数
+    selected_passages: int = 0
+    original_tokens: int = 0
+    tokens: int = 0
+
+    @property
+    def is_trimmed(self) -> bool:
+        """段落を省略したかどうか"""
+        return self.selected_passages < self.total_passages
+
+
+def extract_query_terms(prompt: str) -> List[str]:
+    """
+    プロンプトから検索語（必ず含める項目・構成・出力の指示）を取り出す
+
+    Args:
+        prompt: プリセットのプロンプト
+
+    Returns:
+        List[str]: 検索語のリスト
+    """
+    body = prompt.split('{text}')[0]
+    terms = [m.group(1).strip() for m in _ITEM_LINE_PATTERN.finditer(body)]
+    output = _OUTPUT_SECTION_PATTERN.search(prompt)
+    if output:
+        terms.append(output.group(1).strip())
+    # 項目がないカスタムプロンプトは全体を検索語にする
+    return terms or [body]
+
+
+def _query_bigrams(terms: List[str]) -> List[str]:
+    """検索語を文字バイグラムに分解（単語をまたがない、ひらがなのみのものは除く）"""
+    bigrams = {}
+    for term in terms:
+        for i in range(len(term) - 1):
+            bigram = term[i:i + 2]
+            if not _NOISE_BIGRAM_PATTERN.match(bigram):
+                bigrams[bigram] = None
+    return list(bigrams)
+
+
+def _latest_year(passage: str) -> Optional[int]:
+    """段落中の最も新しい年（西暦に換算）"""
+    years = []
+    for match in _YEAR_PATTERN.finditer(passage):
+        if match.group(1):
+            years.append(int(match.group(1)))
+        else:
+            number = 1 if match.group(3) == '元' else int(match.group(3))
+            years.append(_ERA_OFFSETS[match.group(2)] + number)
+    return max(years) if years else None
+
+
+class ContextSelector:
+    """BM25（文字バイグラム）による段落選択クラス"""
+
+    # BM25のパラメータ
+    K1 = 1.2
+    B = 0.75
+
+    # 日付を含む段落への加点（経過の時期が分かる段落を優先）
+    DATE_BOOST = 0.5
+
+    # 新しい日付の段落への加点の最大値（現在の状態を重視するプリセット）
+    RECENCY_BOOST = 1.0
+
+    def select(self, text: str, prompt: str, max_tokens: int) -> ContextSelection:
+        """
+        プロンプトに関連する段落をトークン数の上限まで選択
+
+        Args:
+            text: 個人情報削除済みの医療文書
+            prompt: プリセットのプロンプト
+            max_tokens: 選択する段落の合計トークン数の上限
+
+        Returns:
+            ContextSelection: 選択結果（上限に収まる場合は元のテキストのまま）
+        """
+        original_tokens = estimate_tokens(text)
+        passages = split_segments(text, max_chars=PASSAGE_CHARS)
+        if original_tokens <= max_tokens:
+            return ContextSelection(
+                text=text, total_passages=len(passages), selected_passages=len(passages),
+                original_tokens=original_tokens, tokens=original_tokens
+            )
+
+        with metrics.timer('context_select', chars_in=len(text), max_tokens=max_tokens) as event:
+            terms = extract_query_terms(prompt)
+            scores = self._score(passages, _query_bigrams(terms), prefer_recent=any(
+                word in term for term in terms for word in _RECENCY_TERMS
+            ))
+
+            # 点数の高い順に上限まで選ぶ
+            selected = set()
+            used = 0
+            for index in sorted(range(len(passages)), key=lambda i: (-scores[i], i)):
+                if scores[index] <= 0:
+                    break
+                tokens = estimate_tokens(passages[index])
+                if used + tokens > max_tokens:
+                    continue
+                selected.add(index)
+                used += tokens
+
+            if not selected:
+                # 関連する段落がない場合は、空の文書を送らないよう先頭から上限まで使う
+                for index, passage in enumerate(passages):
+                    tokens = estimate_tokens(passage)
+                    if used + tokens > max_tokens:
+                        break
+                    selected.add(index)
+                    used += tokens
+            if not selected:
+                # 先頭の段落だけで上限を超える場合は選択しない
+                event.set(chars_out=len(text), passages=len(passages), selected=len(passages))
+                return ContextSelection(
+                    text=text, total_passages=len(passages), selected_passages=len(passages),
+                    original_tokens=original_tokens, tokens=original_tokens
+                )
+
+            # 元の順序で連結（省略した箇所には印を入れる）
+            pieces = []
+            skipped = False
+            for index, passage in enumerate(passages):
+                if index in selected:
+                    if skipped and pieces:
+                        pieces.append(OMISSION_MARK + "\n")
+                    pieces.append(passage if passage.endswith("\n") else passage + "\n")
+                    skipped = False
+                else:
+                    skipped = True
+            if skipped and pieces:
+                pieces.append(OMISSION_MARK + "\n")
+
+            result_text = "".join(pieces)
+            result = ContextSelection(
+                text=result_text,
+                total_passages=len(passages),
+                selected_passages=len(selected),
+                original_tokens=original_tokens,
+                tokens=estimate_tokens(result_text),
+            )
+            event.set(chars_out=len(result_text), passages=len(passages), selected=len(selected))
+
+        print(
+            f"文脈選択: {len(passages)}段落中{len(selected)}段落を使用 "
+            f"(約{original_tokens}→{result.tokens}トークン)"
+        )
+        return result
+
+    def _score(self, passages: List[str], bigrams: List[str], prefer_recent: bool) -> List[float]:
+        """各段落の点数（BM25 + 日付による加点）"""
+        count = len(passages)
+        lengths = [len(p) for p in passages]
+        average_length = (sum(lengths) / count) if count else 1.0
+
+        # 検索語のバイグラムごとの出現回数と、出現する段落数
+        term_frequencies: List[Tuple[str, List[int]]] = []
+        for bigram in bigrams:
+            frequencies = [p.count(bigram) for p in passages]
+            document_frequency = sum(1 for f in frequencies if f)
+            if document_frequency:
+                idf = math.log(1 + (count - document_frequency + 0.5) / (document_frequency + 0.5))
+                term_frequencies.append((idf, frequencies))
+
+        scores = [0.0] * count
+        for idf, frequencies in term_frequencies:
+            for i, tf in enumerate(frequencies):
+                if tf:
+                    norm = self.K1 * (1 - self.B + self.B * lengths[i] / average_length)
+                    scores[i] += idf * tf * (self.K1 + 1) / (tf + norm)
+
+        # 日付を含む段落（発症・初診・入院の時期）を優先し、必要に応じて新しい段落を優先
+        years = [_latest_year(p) for p in passages]
+        known_years = [y for y in years if y is not None]
+        if known_years:
+            oldest, newest = min(known_years), max(known_years)
+            for i, year in enumerate(years):
+                if year is None or scores[i] <= 0:
+                    continue
+                scores[i] += self.DATE_BOOST
+                if prefer_recent and newest > oldest:
+                    scores[i] += self.RECENCY_BOOST * (year - oldest) / (newest - oldest)
+
+        return scores
+
+
+if __name__ == "__main__":
+    # テスト用
+    from src.presets import PresetManager
+
+    with open("tests/sample_medical_record.txt", encoding="utf-8") as f:
+        sample = f.read()
+
+    # バイタルの記録が大半を占める長い文書
+    vitals = "".join(
+        f"{2021 + i // 365}年 定時測定：体温36.{i % 10}℃ 脈拍{70 + i % 15}/分 血圧{110 + i % 20}/70 SpO2 98%\n\n"
+        for i in range(2000)
+    )
+    document = sample + "\n\n" + vitals
+
+    for key in ('medical_history', 'symptom_description'):
+        preset = PresetManager.get_preset(key)
+        result = ContextSelector().select(document, preset.prompt, preset.context_tokens)
+        print(f"\n=== {preset.name} ===")
+        print(f"検索語: {extract_query_terms(preset.prompt)}")
+        print(result.text[:600])
@@ -0,0 +1,365 @@
+"""
+重複除去モジュール
+複数のファイルに同じ検査結果や退院時サマリーが含まれている場合に、
+2回目以降の段落・ページを前出箇所への参照に置き換え、要約に送る文字数を減らします
+"""
+
+import heapq
+import re
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from src.metrics import metrics
+from src.text_segments import split_segments
+from src.text_stats import estimate_tokens
+
+
+# 重複除去のモード
+MODE_OFF = 'off'      # 重複除去しない
+MODE_EXACT = 'exact'  # 完全に同じ段落のみ（空白の違いは無視）
+MODE_NEAR = 'near'    # ほぼ同じ段落も対象（OCRの読み取り揺れなど）
+
+# セグメント先頭のページ区切り・ファイル区切りの行
+_MARKER_PATTERN = re.compile(r'(--- Page (\d+) ---|={20,})\n')
+
+# ファイル見出しの行
+_FILE_HEADER_PATTERN = re.compile(r'ファイル: (.+?) \(種別: ')
+
+# 比較時に無視する空白
+_WHITESPACE_PATTERN = re.compile(r'\s+')
+
+# 数値（検査値・日付・用量）
+_NUMBER_PATTERN = re.compile(r'\d+(?:\.\d+)?')
+
+# 所見の有無・左右・検査結果を表す語（1文字違いで意味が逆になるため、異なる段落は重複とみなさない）
+_FINDING_TERM_PATTERN = re.compile(
+    r'陰性|陽性|右|左|両|認めない|認めず|認められない|認められる|認める|なし|無し|あり|有り|否定|疑い'
+    r'|上昇|低下|増加|減少|改善|悪化|増悪|軽快|不変|\([+＋-－]\)|（[+＋-－]）'
+)
+
+# セグメントの判定結果
+_KEEP = 'keep'              # 初出（残す）
+_DUPLICATE = 'duplicate'    # 重複（省略する）
+_SEEN_SHORT = 'seen_short'  # 既出の短い段落（重複した段落と続いている場合のみ省略する）
+
+
+@dataclass
+class DuplicateSegment:
+    """省略したセグメント"""
+    location: str           # 省略した箇所
+    original_location: str  # 同じ内容の前出箇所
+    chars: int              # 省略した文字数
+    similarity: float       # 前出箇所との類似度（完全一致は1.0）
+
+
+@dataclass
+class _Entry:
+    """セグメントの判定結果"""
+    segment: str
+    marker: str    # 先頭の区切り行
+    body: str      # 区切り行を除いた本文
+    location: str  # 箇所
+    kind: str = _KEEP
+    original_location: str = ""
+    similarity: float = 1.0
+
+
+@dataclass
+class DedupeResult:
+    """重複除去の結果"""
+    text: str  # 重複を除いたテキスト
+    original_chars: int = 0
+    original_tokens: int = 0
+    tokens: int = 0
+    duplicates: List[DuplicateSegment] = field(default_factory=list)
+
+    @property
+    def chars_saved(self) -> int:
+        """削減した文字数"""
+        return self.original_chars - len(self.text)
+
+    @property
+    def tokens_saved(self) -> int:
+        """削減したトークン数（見積もり）"""
+        return self.original_tokens - self.tokens
+
+    def get_summary_report(self) -> str:
+        """
+        重複除去のサマリーレポートを生成
+
+        Returns:
+            str: サマリーレポート
+        """
+        if not self.duplicates:
+            return "重複した段落はありませんでした。"
+
+        exact = sum(1 for d in self.duplicates if d.similarity >= 1.0)
+        lines = [
+            f"重複した段落: {len(self.duplicates)}件"
+            f"（完全一致 {exact}件、ほぼ一致 {len(self.duplicates) - exact}件）",
+            f"削減: {self.chars_saved}文字 / 約{self.tokens_saved}トークン"
+            f"（{self.original_chars}文字 → {len(self.text)}文字）",
+        ]
+
+        # 箇所の組み合わせごとに集計
+        groups: Dict[Tuple[str, str], List[DuplicateSegment]] = {}
+        for duplicate in self.duplicates:
+            groups.setdefault((duplicate.location, duplicate.original_location), []).append(duplicate)
+        for (location, original_location), items in list(groups.items())[:10]:
+            lines.append(
+                f"  - {location} → {original_location}と同じ内容"
+                f"（{len(items)}段落 {sum(d.chars for d in items)}文字, "
+                f"類似度{min(d.similarity for d in items):.2f}）"
+            )
+        if len(groups) > 10:
+            lines.append(f"  ...他{len(groups) - 10}箇所")
+        return "\n".join(lines)
+
+
+class Deduplicator:
+    """
+    段落単位の重複除去クラス
+    完全一致に加え、文字n-gramのMinHashで読み取り揺れ程度の違いしかない段落を検出します
+    数値が異なる段落は、検査値や用量が更新されている可能性があるため残します
+    """
+
+    # これより短い段落（見出し・短い所見など）は重複していても残す
+    MIN_SEGMENT_CHARS = 80
+
+    # 類似度の計算に使う文字n-gramの長さ
+    SHINGLE_CHARS = 5
+
+    # MinHashのスケッチの大きさ（ハッシュ値の小さいほうから何個保持するか）
+    SKETCH_SIZE = 64
+
+    # 候補とするために共有すべきスケッチのハッシュ値の数
+    MIN_SHARED_HASHES = 16
+
+    # ほぼ一致とみなす類似度（Jaccard係数）
+    NEAR_THRESHOLD = 0.9
+
+    def __init__(self, mode: Optional[str] = None):
+        """
+        初期化
+
+        Args:
+            mode: 重複除去のモード（Noneの場合は設定に従う）
+        """
+        if mode is None:
+            from src.config import config
+            mode = config.DEDUPE_MODE
+        self.mode = mode
+
+    def deduplicate(self, text: str) -> DedupeResult:
+        """
+        重複した段落・ページを前出箇所への参照に置き換える
+
+        Args:
+            text: read_multiple_filesで結合したテキスト
+
+        Returns:
+            DedupeResult: 重複除去の結果
+        """
+        if self.mode == MODE_OFF:
+            tokens = estimate_tokens(text)
+            return DedupeResult(text=text, original_chars=len(text), original_tokens=tokens, tokens=tokens)
+
+        with metrics.timer('dedupe', chars_in=len(text), mode=self.mode) as event:
+            entries = self._classify(text)
+
+            # 重複した段落の連続（間の短い既出の段落を含む）を1つの参照にまとめる
+            pieces: List[str] = []
+            duplicates: List[DuplicateSegment] = []
+            i = 0
+            while i < len(entries):
+                if entries[i].kind == _KEEP:
+                    pieces.append(entries[i].segment)
+                    i += 1
+                    continue
+
+                # ページ・ファイルの区切りまでを1つのまとまりとする
+                j = i + 1
+                while j < len(entries) and entries[j].kind != _KEEP and not entries[j].marker:
+                    j += 1
+                run = entries[i:j]
+                i = j
+
+                run_duplicates = [e for e in run if e.kind == _DUPLICATE]
+                if not run_duplicates:
+                    # 既出の短い段落だけの場合はそのまま残す
+                    pieces.extend(e.segment for e in run)
+                    continue
+
+                for entry in run_duplicates:
+                    duplicates.append(DuplicateSegment(
+                        location=entry.location,
+                        original_location=entry.original_location,
+                        chars=len(entry.segment),
+                        similarity=entry.similarity,
+                    ))
+                # 区切りの行と末尾の改行は残し、本文を参照に置き換える
+                originals = "、".join(dict.fromkeys(e.original_location for e in run_duplicates))
+                exact = all(e.similarity >= 1.0 for e in run_duplicates)
+                label = "同じ内容" if exact else "ほぼ同じ内容"
+                last_body = run[-1].body
+                trailing = last_body[len(last_body.rstrip('\n')):]
+                pieces.append(f"{run[0].marker}［重複のため省略：{originals}と{label}］\n{trailing}")
+
+            result_text = "".join(pieces)
+            result = DedupeResult(
+                text=result_text,
+                original_chars=len(text),
+                original_tokens=estimate_tokens(text),
+                tokens=estimate_tokens(result_text),
+                duplicates=duplicates,
+            )
+            event.set(chars_out=len(result_text), matches=len(duplicates), tokens_saved=result.tokens_saved)
+
+        if duplicates:
+            print(f"重複除去: {len(duplicates)}件 {result.chars_saved}文字（約{result.tokens_saved}トークン）を削減")
+        return result
+
+    def _classify(self, text: str) -> List["_Entry"]:
+        """セグメントごとに、初出・重複・既出の短い段落のいずれかを判定"""
+        entries: List[_Entry] = []
+        exact_index: Dict[str, str] = {}                   # 正規化した段落 -> 前出箇所
+        sketch_index: Dict[int, List[int]] = {}            # ハッシュ値 -> 登録した段落の番号
+        registered: List[Tuple[str, List[int], str]] = []  # (正規化した段落, スケッチ, 箇所)
+        current_file: Optional[str] = None
+        current_page: Optional[int] = None
+
+        for segment in split_segments(text):
+            marker, body = self._split_marker(segment)
+            if marker.startswith('---'):
+                current_page = int(_MARKER_PATTERN.match(marker).group(2))
+            header = _FILE_HEADER_PATTERN.match(body)
+            if header:
+                current_file, current_page = header.group(1), None
+
+            entry = _Entry(segment, marker, body, self._format_location(current_file, current_page))
+            entries.append(entry)
+            normalized = _WHITESPACE_PATTERN.sub('', body)
+            if not normalized or header:
+                continue
+
+            original_location = exact_index.get(normalized)
+            if len(normalized) < self.MIN_SEGMENT_CHARS:
+                # 短い段落は単独では省略せず、重複した段落に挟まれている場合のみまとめて省略
+                if original_location is None:
+                    exact_index[normalized] = entry.location
+                else:
+                    entry.kind = _SEEN_SHORT
+                continue
+
+            sketch = None
+            similarity = 1.0
+            if original_location is None and self.mode == MODE_NEAR:
+                shingles = self._shingles(normalized)
+                sketch = heapq.nsmallest(self.SKETCH_SIZE, shingles)
+                original_location, similarity = self._find_similar(
+                    normalized, shingles, sketch, sketch_index, registered
+                )
+
+            if original_location is None:
+                # 初出の段落として登録
+                exact_index[normalized] = entry.location
+                if sketch is not None:
+                    number = len(registered)
+                    registered.append((normalized, sketch, entry.location))
+                    for value in sketch:
+                        sketch_index.setdefault(value, []).append(number)
+            else:
+                entry.kind = _DUPLICATE
+                entry.original_location = original_location
+                entry.similarity = similarity
+
+        return entries
+
+    @staticmethod
+    def _split_marker(segment: str) -> Tuple[str, str]:
+        """セグメントを先頭の区切り行と本文に分ける"""
+        match = _MARKER_PATTERN.match(segment)
+        if match:
+            return segment[:match.end()], segment[match.end():]
+        return "", segment
+
+    @staticmethod
+    def _format_location(file_name: Optional[str], page: Optional[int]) -> str:
+        """箇所の表示名"""
+        parts = []
+        if file_name:
+            parts.append(f"「{file_name}」")
+        if page:
+            parts.append(f"{page}ページ目")
+        return "".join(parts) or "前出の段落"
+
+    def _shingles(self, normalized: str) -> set:
+        """文字n-gramのハッシュ値の集合"""
+        n = self.SHINGLE_CHARS
+        return {hash(normalized[i:i + n]) for i in range(max(len(normalized) - n + 1, 1))}
+
+    def _find_similar(
+        self,
+        normalized: str,
+        shingles: set,
+        sketch: List[int],
+        sketch_index: Dict[int, List[int]],
+        registered: List[Tuple[str, List[int], str]]
+    ) -> Tuple[Optional[str], float]:
+        """登録済みの段落からほぼ同じものを探す"""
+        # スケッチのハッシュ値を多く共有する段落を候補にする
+        shared: Dict[int, int] = {}
+        for value in sketch:
+            for number in sketch_index.get(value, ()):
+                shared[number] = shared.get(number, 0) + 1
+
+        best_location, best_similarity = None, 0.0
+        for number, count in shared.items():
+            if count < self.MIN_SHARED_HASHES:
+                continue
+            candidate, _, location = registered[number]
+            # 長さが大きく異なる場合は類似度が閾値に届かない
+            if min(len(candidate), len(normalized)) < self.NEAR_THRESHOLD * max(len(candidate), len(normalized)):
+                continue
+            # 数値が1つでも異なる場合は検査値や用量の更新の可能性があるため残す
+            if _NUMBER_PATTERN.findall(candidate) != _NUMBER_PATTERN.findall(normalized):
+                continue
+            # 陰性/陽性・右/左・認める/認めない などが異なる場合も所見が異なるため残す
+            if _FINDING_TERM_PATTERN.findall(candidate) != _FINDING_TERM_PATTERN.findall(normalized):
+                continue
+            # 候補のみ正確なJaccard係数を計算（ハッシュの揺れで結果が変わらないように）
+            other = self._shingles(candidate)
+            similarity = len(shingles & other) / len(shingles | other)
+            if similarity >= self.NEAR_THRESHOLD and similarity > best_similarity:
+                best_location, best_similarity = location, similarity
+
+        return best_location, best_similarity
+
+
+if __name__ == "__main__":
+    # テスト用
+    with open("tests/sample_medical_record.txt", encoding="utf-8") as f:
+        sample = f.read()
+
+    lab = (
+        "血液検査結果：WBC 6500/μL、RBC 450万/μL、Hb 13.5g/dL、Plt 25万/μL、"
+        "AST 22 U/L、ALT 18 U/L、γ-GTP 30 U/L、BUN 14 mg/dL、Cr 0.8 mg/dL。"
+        "肝機能・腎機能に異常を認めず、抗精神病薬の継続投与に支障はないと判断した。\n\n"
+    )
+    header = "=" * 60
+    bundle = (
+        f"{header}\nファイル: 紹介状.pdf (種別: PDF)\n{header}\n"
+        f"--- Page 1 ---\n{sample}\n\n--- Page 2 ---\n{lab}\n\n"
+        f"{header}\nファイル: 検査結果.jpg (種別: 画像（OCR）)\n{header}\n"
+        f"{lab.replace('異常', '異當')}\n\n"  # OCRの読み取り揺れ
+        f"{lab.replace('13.5', '12.1')}\n\n"  # 検査値が異なるものは残す
+        f"{lab.replace('異常を認めず', '異常を認める')}\n\n"  # 所見が逆のものは残す
+        f"{header}\nファイル: 紹介状（写し）.pdf (種別: PDF)\n{header}\n"
+        f"--- Page 1 ---\n{sample}\n"
+    )
+
+    for mode in (MODE_EXACT, MODE_NEAR):
+        result = Deduplicator(mode).deduplicate(bundle)
+        print(f"\n=== {mode} ===")
+        print(result.get_summary_report())
+    print("\n" + result.text[-400:])
@@ -5,16 +5,29 @@
 
 from pathlib import Path
 from typing import Union, List, Tuple
-import PyPDF2
 from PIL import Image
 import pytesseract
+import mmap
 import os
 import sys
 
+from src.config import config
+from src.metrics import metrics
+from src.pdf_backends import get_pdf_backend
+from src.profiler import profiled
+
+
+class FileLimitError(Exception):
+    """ファイルの大きさ・ページ数などが設定の上限を超えている"""
+    pass
+
 
 class FileReader:
     """ファイル読み込みクラス"""
 
+    # テキストファイルのエンコーディングを試す順番
+    TEXT_ENCODINGS = ['utf-8', 'shift_jis', 'cp932', 'euc_jp', 'iso2022_jp']
+
     # Tesseractのパスを設定（アプリバンドル内を優先）
     @staticmethod
     def _setup_tesseract():
@@ -80,10 +93,10 @@ class FileReader:
         """
         file_path = Path(file_path)
 
-        # エンコーディングを試す順番
-        encodings = ['utf-8', 'shift_jis', 'cp932', 'euc_jp', 'iso2022_jp']
+        if FileReader.is_large_file(file_path):
+            return FileReader._read_large_text_file(file_path)
 
-        for encoding in encodings:
+        for encoding in FileReader.TEXT_ENCODINGS:
             try:
                 with open(file_path, 'r', encoding=encoding) as f:
                     content = f.read()
@@ -111,29 +124,80 @@ class FileReader:
 
         Raises:
             FileNotFoundError: ファイルが見つからない
+            FileLimitError: ページ数が上限を超えている
         """
         file_path = Path(file_path)
 
         if not file_path.exists():
             raise FileNotFoundError(f"ファイルが見つかりません: {file_path}")
 
-        text_content = []
+        backend = get_pdf_backend()
 
         try:
-            with open(file_path, 'rb') as f:
-                pdf_reader = PyPDF2.PdfReader(f)
-                num_pages = len(pdf_reader.pages)
-
-                for page_num in range(num_pages):
-                    page = pdf_reader.pages[page_num]
-                    text = page.extract_text()
-                    if text.strip():
-                        text_content.append(f"--- Page {page_num + 1} ---\n{text}")
+            return FileReader._extract_pdf_pages(file_path, backend)
 
-            return "\n\n".join(text_content)
+        except FileLimitError:
+            # 上限超過はエンジンを変えても同じため、読み直さない
+            raise
 
         except Exception as e:
-            raise Exception(f"PDF読み込みエラー: {str(e)}")
+            if backend.name == 'pypdf2':
+                raise Exception(f"PDF読み込みエラー: {str(e)}")
+            # 選択したエンジンで読めないPDFはPyPDF2で読み直す
+            print(f"⚠️  {backend.name}で読み込めなかったため、PyPDF2で再試行します: {e}")
+            try:
+                return FileReader._extract_pdf_pages(file_path, get_pdf_backend('pypdf2'))
+            except FileLimitError:
+                raise
+            except Exception as retry_error:
+                raise Exception(f"PDF読み込みエラー: {str(retry_error)}")
+
+    @staticmethod
+    def _extract_pdf_pages(file_path: Path, backend) -> str:
+        """エンジンで1ページずつテキストを抽出し、ページ区切りを付けて結合"""
+        text_content = []
+        with metrics.timer('read_pdf', backend=backend.name) as event:
+            pages = 0
+            for page_num, text in enumerate(backend.iter_pages(file_path), 1):
+                # ページ数を事前に取得できなかった場合も上限で打ち切る
+                if page_num > config.MAX_PDF_PAGES:
+                    raise FileLimitError(
+                        f"ページ数が上限（{config.MAX_PDF_PAGES}ページ）を超えています"
+                    )
+                pages = page_num
+                if text.strip():
+                    text_content.append(f"--- Page {page_num} ---\n{text}")
+            content = "\n\n".join(text_content)
+            event.set(chars_out=len(content), pages=pages)
+        return content
+
+    @staticmethod
+    def _read_large_text_file(file_path: Path) -> str:
+        """
+        大きなテキストファイルをメモリマップから直接デコード
+
+        通常の読み込みではファイル全体のバイト列をコピーしてからデコードしますが、
+        メモリマップではデコード後の文字列のみが作られます
+        """
+        with open(file_path, 'rb') as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            try:
+                with memoryview(mapped) as view:
+                    for encoding in FileReader.TEXT_ENCODINGS:
+                        try:
+                            content = str(view, encoding)
+                        except UnicodeDecodeError:
+                            continue
+                        # テキストモードでの読み込みと同じく改行を \n に統一
+                        return content.replace('\r\n', '\n').replace('\r', '\n')
+            finally:
+                mapped.close()
+
+        raise UnicodeDecodeError(
+            'utf-8', b'', 0, 1,
+            f"ファイル {file_path} を読み込めませんでした。"
+            f"エンコーディングを確認してください。"
+        )
 
     @staticmethod
     def read_image_file(file_path: Union[str, Path], lang: str = 'jpn') -> str:
@@ -160,8 +224,14 @@ class FileReader:
             raise FileNotFoundError(f"ファイルが見つかりません: {file_path}")
 
         try:
-            # 画像を開く
-            image = Image.open(file_path)
+            if FileReader.is_large_file(file_path):
+                # 大きな画像はヘッダーで形式のみ確認し、デコードせずにパスのままTesseractに渡す
+                with Image.open(file_path):
+                    pass
+                image = str(file_path)
+            else:
+                # 画像を開く
+                image = Image.open(file_path)
 
             # OCR実行
             # Tesseractの設定: 日本語 + 英語
@@ -176,6 +246,90 @@ class FileReader:
         except Exception as e:
             raise Exception(f"OCR処理エラー: {str(e)}")
 
+    @staticmethod
+    def is_large_file(file_path: Union[str, Path]) -> bool:
+        """
+        内容をPython側のバッファに読み込まずに処理するファイルかどうか
+        （テキストはメモリマップから直接デコード、画像はパスのままOCRに渡す）
+
+        Args:
+            file_path: ファイルパス
+
+        Returns:
+            bool: 設定（STREAMING_THRESHOLD_MB）以上の大きさの場合True
+        """
+        return Path(file_path).stat().st_size >= config.STREAMING_THRESHOLD_MB * 1024 * 1024
+
+    @staticmethod
+    def check_file_limits(file_path: Union[str, Path]):
+        """
+        ファイルが読み込みの上限内か確認（内容は読み込まない）
+
+        大きさを確認したうえで、PDFはページ数、画像は画素数をヘッダーから確認します
+
+        Args:
+            file_path: ファイルパス
+
+        Raises:
+            FileNotFoundError: ファイルが見つからない
+            FileLimitError: 上限を超えている
+        """
+        file_path = Path(file_path)
+
+        if not file_path.exists():
+            raise FileNotFoundError(f"ファイルが見つかりません: {file_path}")
+
+        size_mb = file_path.stat().st_size / 1024 / 1024
+        if size_mb > config.MAX_FILE_SIZE_MB:
+            raise FileLimitError(
+                f"ファイルサイズ（{size_mb:.1f}MB）が上限（{config.MAX_FILE_SIZE_MB:g}MB）を超えています"
+            )
+
+        suffix = file_path.suffix.lower()
+        if suffix == '.pdf':
+            try:
+                pages = get_pdf_backend().page_count(file_path)
+            except Exception:
+                # ページ数を取得できないPDFは抽出時に確認する
+                return
+            if pages > config.MAX_PDF_PAGES:
+                raise FileLimitError(
+                    f"ページ数（{pages}ページ）が上限（{config.MAX_PDF_PAGES}ページ）を超えています"
+                )
+
+        elif suffix in ['.jpg', '.jpeg', '.png']:
+            try:
+                with Image.open(file_path) as image:
+                    width, height = image.size
+            except Exception:
+                # 画像として開けないファイルはOCR時にエラーにする
+                return
+            megapixels = width * height / 1_000_000
+            if megapixels > config.MAX_IMAGE_MEGAPIXELS:
+                raise FileLimitError(
+                    f"画像の大きさ（{width}×{height}、{megapixels:.0f}百万画素）が"
+                    f"上限（{config.MAX_IMAGE_MEGAPIXELS:g}百万画素）を超えています"
+                )
+
+    @staticmethod
+    def check_batch_limits(file_paths: List[Union[str, Path]]):
+        """
+        一度に処理するファイルの合計サイズが上限内か確認
+
+        Args:
+            file_paths: ファイルパスのリスト
+
+        Raises:
+            FileLimitError: 合計サイズが上限を超えている
+        """
+        total_mb = sum(
+            Path(p).stat().st_size for p in file_paths if Path(p).exists()
+        ) / 1024 / 1024
+        if total_mb > config.MAX_BATCH_SIZE_MB:
+            raise FileLimitError(
+                f"ファイルの合計サイズ（{total_mb:.1f}MB）が上限（{config.MAX_BATCH_SIZE_MB:g}MB）を超えています"
+            )
+
     @classmethod
     def read_file(cls, file_path: Union[str, Path]) -> Tuple[str, str]:
         """
@@ -190,37 +344,78 @@ class FileReader:
 
         Raises:
             ValueError: サポートされていないファイル形式
+            FileLimitError: 上限を超えている
             Exception: 読み込みエラー
         """
         file_path = Path(file_path)
         suffix = file_path.suffix.lower()
+        bytes_in = file_path.stat().st_size if file_path.exists() else 0
 
-        try:
-            # テキストファイル
-            if suffix in ['.txt']:
-                content = cls.read_text_file(file_path)
-                return content, 'text'
+        with metrics.timer('read_file', bytes_in=bytes_in, suffix=suffix) as event:
+            try:
+                cls.check_file_limits(file_path)
 
-            # PDF
-            elif suffix in ['.pdf']:
-                content = cls.read_pdf_file(file_path)
-                return content, 'pdf'
+                # テキストファイル
+                if suffix in ['.txt']:
+                    content, file_type = cls.read_text_file(file_path), 'text'
 
-            # 画像
-            elif suffix in ['.jpg', '.jpeg', '.png']:
-                content = cls.read_image_file(file_path)
-                return content, 'image'
+                # PDF
+                elif suffix in ['.pdf']:
+                    content, file_type = cls.read_pdf_file(file_path), 'pdf'
 
-            else:
-                raise ValueError(
-                    f"サポートされていないファイル形式: {suffix}\n"
-                    f"対応形式: .txt, .pdf, .jpg, .jpeg, .png"
-                )
+                # 画像
+                elif suffix in ['.jpg', '.jpeg', '.png']:
+                    content, file_type = cls.read_image_file(file_path), 'image'
 
-        except Exception as e:
-            raise Exception(f"ファイル読み込みエラー ({file_path.name}): {str(e)}")
+                else:
+                    raise ValueError(
+                        f"サポートされていないファイル形式: {suffix}\n"
+                        f"対応形式: .txt, .pdf, .jpg, .jpeg, .png"
+                    )
+
+            except FileLimitError as e:
+                # 呼び出し側で上限超過を区別できるよう、種類を変えずにファイル名を付ける
+                raise FileLimitError(f"ファイル読み込みエラー ({file_path.name}): {str(e)}") from e
+            except Exception as e:
+                raise Exception(f"ファイル読み込みエラー ({file_path.name}): {str(e)}")
+
+            event.set(chars_out=len(content), file_type=file_type)
+            return content, file_type
 
     @classmethod
+    def read_file_section(cls, file_path: Union[str, Path], remover=None) -> str:
+        """
+        ファイルを読み込み、見出し（マスク済みファイル名）付きのセクションにする
+
+        Args:
+            file_path: ファイルパス
+            remover: ファイル名のマスクに使うPIIRemover（Noneの場合は新規作成）
+
+        Returns:
+            str: 見出し付きのテキスト
+
+        Raises:
+            Exception: 読み込みエラー
+        """
+        if remover is None:
+            from src.pii_remover import PIIRemover
+            remover = PIIRemover()
+
+        content, file_type = cls.read_file(file_path)
+        file_name = Path(file_path).name
+
+        # ファイル名からも個人情報を削除
+        masked_file_name, _ = remover.clean_text(file_name)
+
+        return (
+            f"{'='*60}\n"
+            f"ファイル: {masked_file_name} (種別: {file_type})\n"
+            f"{'='*60}\n"
+            f"{content}\n"
+        )
+
+    @classmethod
+    @profiled('read_multiple_files')
     def read_multiple_files(cls, file_paths: List[Union[str, Path]]) -> str:
         """
         複数のファイルを読み込んで結合
@@ -233,40 +428,36 @@ class FileReader:
             str: 結合されたテキスト
 
         Raises:
+            FileLimitError: 合計サイズが上限を超えている（すべてのファイルが上限を超えている場合を含む）
             Exception: 読み込みエラー
         """
         # PIIRemoverをインポート（循環参照を避けるため関数内でインポート）
         from src.pii_remover import PIIRemover
 
+        cls.check_batch_limits(file_paths)
+
         all_content = []
         errors = []
+        limit_errors = 0
         remover = PIIRemover()
 
         for file_path in file_paths:
             try:
-                content, file_type = cls.read_file(file_path)
-                file_name = Path(file_path).name
-
-                # ファイル名からも個人情報を削除
-                masked_file_name, _ = remover.clean_text(file_name)
-
-                all_content.append(
-                    f"{'='*60}\n"
-                    f"ファイル: {masked_file_name} (種別: {file_type})\n"
-                    f"{'='*60}\n"
-                    f"{content}\n"
-                )
+                all_content.append(cls.read_file_section(file_path, remover))
 
             except Exception as e:
                 # エラーメッセージのファイル名もマスク
                 original_name = Path(file_path).name
                 masked_name, _ = remover.clean_text(original_name)
                 errors.append(f"❌ {masked_name}: {str(e)}")
+                if isinstance(e, FileLimitError):
+                    limit_errors += 1
 
         if errors:
             error_msg = "\n".join(errors)
             if not all_content:
-                raise Exception(f"すべてのファイルの読み込みに失敗しました:\n{error_msg}")
+                error_class = FileLimitError if limit_errors == len(errors) else Exception
+                raise error_class(f"すべてのファイルの読み込みに失敗しました:\n{error_msg}")
             else:
                 print(f"⚠️  一部のファイルの読み込みに失敗しました:\n{error_msg}")
 
@@ -287,6 +478,14 @@ if __name__ == "__main__":
             print(f"=== {Path(file_path).name} ({file_type}) ===")
             print(content[:500])  # 最初の500文字を表示
             print(f"\n... (全{len(content)}文字)")
+            try:
+                import resource
+                # 最大メモリ使用量（Linuxはキロバイト、macOSはバイト単位）
+                peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+                peak_mb = peak / 1024 / 1024 if sys.platform == 'darwin' else peak / 1024
+                print(f"最大メモリ使用量: {peak_mb:.0f}MB")
+            except ImportError:
+                pass
         except Exception as e:
             print(f"エラー: {e}")
     else:
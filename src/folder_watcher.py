@@ -0,0 +1,446 @@
+"""
+監視フォルダモジュール
+共有フォルダに置かれたスキャン文書を患者ごとにまとめ、
+読み込み→個人情報削除→要約生成をバックグラウンドで実行します
+
+フォルダ構成:
+    監視フォルダ/              ここにファイルを置く
+    監視フォルダ/processing/   処理中（ジョブごとのフォルダ、要約結果もここに保存）
+    監視フォルダ/done/         完了したジョブのフォルダ
+    監視フォルダ/failed/       再実行しても完了しなかったジョブのフォルダ（error.txt に理由）
+
+処理はジョブキューに記録されるため、中断した場合は次回起動時に続きから再開します
+"""
+
+import re
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+from src.job_queue import Job, JobQueue, JobRunner
+from src.pii_remover import PIIRemover
+
+
+# 対象のファイル形式
+SUPPORTED_SUFFIXES = ('.txt', '.pdf', '.jpg', '.jpeg', '.png')
+
+# サブフォルダ名
+PROCESSING_DIR = 'processing'
+DONE_DIR = 'done'
+FAILED_DIR = 'failed'
+
+# エラーになったジョブを再実行するまでの待ち時間（秒）
+RETRY_WAIT_SEC = 30
+
+# ファイル名の先頭の患者番号（例: 00123_山本　百花_紹介状.pdf）
+_LEADING_ID_PATTERN = re.compile(r'^\[?(?:患者番号|ID)?\]?(\d{3,})')
+
+# ファイル名中の氏名（PIIRemoverのパターン4・5と同じ表記）
+_NAME_PATTERNS = (
+    re.compile(PIIRemover.ID_NAME_PATTERN),
+    re.compile(PIIRemover.FILENAME_NAME_PATTERN),
+)
+
+
+def group_key(file_name: str) -> str:
+    """
+    ファイル名から患者ごとのまとめ方を決めるキーを作成
+
+    患者番号と氏名（_氏名_ や [患者番号]氏名_ の形式）が同じファイルを同じ患者とみなします
+    どちらも含まないファイルは1ファイルずつ処理します
+
+    Args:
+        file_name: ファイル名
+
+    Returns:
+        str: キー（ログには出力しないこと）
+    """
+    stem = Path(file_name).stem
+    patient_id = ''
+    match = _LEADING_ID_PATTERN.match(stem)
+    if match:
+        patient_id = match.group(1)
+
+    name = ''
+    for pattern in _NAME_PATTERNS:
+        match = pattern.search(stem)
+        if match:
+            name = re.sub(r'[\s　]', '', match.group(1))
+            break
+
+    if not patient_id and not name:
+        return f"file:{file_name}"
+    return f"patient:{patient_id}|{name}"
+
+
+@dataclass
+class _FileState:
+    """書き込み途中かどうかを判定するためのファイルの状態"""
+    size: int
+    mtime: float
+    changed_at: float  # 大きさ・更新時刻が最後に変わったのを確認した時刻
+
+
+class FolderWatcher:
+    """監視フォルダの処理クラス"""
+
+    def __init__(
+        self,
+        watch_dir: Union[str, Path],
+        preset_key: Optional[str] = None,
+        workers: Optional[int] = None,
+        settle_sec: Optional[float] = None,
+        queue: Optional[JobQueue] = None,
+        summarizer_factory: Optional[Callable] = None
+    ):
+        """
+        初期化
+
+        Args:
+            watch_dir: 監視するフォルダ
+            preset_key: 要約に使うプリセット（Noneの場合は設定に従う）
+            workers: 同時に処理するジョブ数（Noneの場合は設定に従う）
+            settle_sec: 大きさが変わらなくなってから処理を始めるまでの秒数（Noneの場合は設定に従う）
+            queue: ジョブキュー（Noneの場合は設定ディレクトリのもの）
+            summarizer_factory: MedicalSummarizerを作成する関数（Noneの場合は既定）
+        """
+        from src.config import config
+
+        self.watch_dir = Path(watch_dir).resolve()
+        self.preset_key = preset_key or config.WATCH_PRESET
+        self.workers = max(1, workers or config.WATCH_WORKERS)
+        self.settle_sec = config.WATCH_SETTLE_SEC if settle_sec is None else settle_sec
+        self.queue = queue or JobQueue()
+        self.summarizer_factory = summarizer_factory
+
+        self.processing_dir = self.watch_dir / PROCESSING_DIR
+        self.done_dir = self.watch_dir / DONE_DIR
+        self.failed_dir = self.watch_dir / FAILED_DIR
+        for directory in (self.watch_dir, self.processing_dir, self.done_dir, self.failed_dir):
+            directory.mkdir(parents=True, exist_ok=True)
+
+        # 期限切れのジョブを削除する前に、元のファイルを処理中フォルダに置き去りにしないよう移動
+        self._set_aside_stale()
+        self.queue.purge_expired()
+
+        self._states: Dict[Path, _FileState] = {}
+        self._futures: Dict[int, Future] = {}
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='watch')
+        self._stop = threading.Event()
+
+    # ========== 検出 ==========
+
+    def _list_files(self) -> List[Path]:
+        """監視フォルダ直下の対象ファイル（隠しファイル・一時ファイルを除く）"""
+        return sorted(
+            path for path in self.watch_dir.iterdir()
+            if path.is_file()
+            and path.suffix.lower() in SUPPORTED_SUFFIXES
+            and not path.name.startswith(('.', '~'))
+        )
+
+    def scan(self, now: Optional[float] = None) -> List[List[Path]]:
+        """
+        書き込みが完了したファイルを患者ごとにまとめて返す
+
+        同じ患者のファイルのうち1つでも書き込み途中（settle_sec以内に大きさか更新時刻が
+        変わった）であれば、その患者のファイルはまとめて次回以降に持ち越します
+
+        Args:
+            now: 現在時刻（time.monotonic()、省略時は現在）
+
+        Returns:
+            List[List[Path]]: 患者ごとのファイルのリスト
+        """
+        now = time.monotonic() if now is None else now
+        groups: Dict[str, List[Path]] = {}
+        settled: Dict[str, bool] = {}
+
+        files = self._list_files()
+        for path in files:
+            try:
+                stat = path.stat()
+            except OSError:
+                continue  # 移動・削除された
+
+            state = self._states.get(path)
+            if state is None or (state.size, state.mtime) != (stat.st_size, stat.st_mtime):
+                state = _FileState(stat.st_size, stat.st_mtime, now)
+                self._states[path] = state
+
+            key = group_key(path.name)
+            groups.setdefault(key, []).append(path)
+            is_settled = stat.st_size > 0 and now - state.changed_at >= self.settle_sec
+            settled[key] = settled.get(key, True) and is_settled
+
+        # なくなったファイルの状態は破棄
+        current = set(files)
+        for path in list(self._states):
+            if path not in current:
+                del self._states[path]
+
+        return [paths for key, paths in groups.items() if settled[key]]
+
+    # ========== 実行 ==========
+
+    def _claim(self, paths: List[Path]) -> Optional[Path]:
+        """
+        ファイルを処理中フォルダに移動（移動できない場合は書き込み中とみなして元に戻す）
+
+        Returns:
+            Optional[Path]: 移動先のフォルダ（移動できなかった場合はNone）
+        """
+        job_dir = Path(tempfile.mkdtemp(
+            prefix=datetime.now().strftime('%Y%m%d_%H%M%S_'), dir=self.processing_dir
+        ))
+        moved: List[Tuple[Path, Path]] = []
+        try:
+            for path in paths:
+                target = job_dir / path.name
+                shutil.move(str(path), str(target))
+                moved.append((path, target))
+        except OSError as e:
+            # Windowsではコピー中のファイルは移動できない
+            print(f"⚠️  ファイルを移動できないため後で再試行します: {e}")
+            for original, target in moved:
+                shutil.move(str(target), str(original))
+            shutil.rmtree(job_dir, ignore_errors=True)
+            return None
+
+        for path in paths:
+            self._states.pop(path, None)
+        return job_dir
+
+    def submit(self, paths: List[Path]) -> Optional[int]:
+        """
+        ファイルをジョブとして登録し、バックグラウンドで実行
+
+        Args:
+            paths: 同じ患者のファイル
+
+        Returns:
+            Optional[int]: ジョブID（ファイルを移動できなかった場合はNone）
+        """
+        job_dir = self._claim(paths)
+        if job_dir is None:
+            return None
+
+        files = sorted(job_dir.iterdir())
+        job_id = self.queue.enqueue(files, self.preset_key, output_dir=str(job_dir))
+        self._start(job_id)
+        return job_id
+
+    def _start(self, job_id: int):
+        print(f"ジョブ{job_id}を開始します")
+        self._futures[job_id] = self._executor.submit(self._run_job, job_id)
+
+    def _run_job(self, job_id: int):
+        """
+        ジョブを実行し、完了したらフォルダを done/ に移動
+
+        エラーになった場合は watch_retries 回まで再実行し（完了済みの段階は再利用）、
+        それでも完了しなければフォルダを failed/ に移動します
+        """
+        from src.config import config
+
+        runner = JobRunner(self.queue, summarizer_factory=self.summarizer_factory)
+        attempt = 0
+        while True:
+            try:
+                runner.run(job_id)
+                break
+            except Exception as e:
+                print(f"❌ ジョブ{job_id}でエラーが発生しました: {e}")
+                if self._stop.is_set():
+                    raise  # 監視の終了中はエラー状態のまま残し、次回起動時に再実行
+                if attempt >= config.WATCH_RETRIES:
+                    job = self.queue.get_job(job_id)
+                    if job is not None:
+                        self._set_aside(job, str(e))
+                    raise
+                attempt += 1
+                if self._stop.wait(RETRY_WAIT_SEC):
+                    raise
+                print(f"ジョブ{job_id}を再実行します（{attempt}/{config.WATCH_RETRIES}回目）")
+
+        job = self.queue.get_job(job_id)
+        if self._is_own_job(job):
+            job_dir = Path(job.output_dir)
+            shutil.move(str(job_dir), str(self.done_dir / job_dir.name))
+        print(f"✅ ジョブ{job_id}が完了しました")
+
+    def _is_own_job(self, job: Job) -> bool:
+        """この監視フォルダのジョブかどうか（画面・APIから実行したジョブは対象外）"""
+        return bool(job.output_dir) and Path(job.output_dir).parent == self.processing_dir
+
+    def _set_aside(self, job: Job, reason: str):
+        """
+        完了できないジョブのフォルダを failed/ に移動し、ジョブキューから削除
+
+        元のファイル（マスク前のスキャン文書）を処理中フォルダに残したままにせず、
+        確認して監視フォルダに戻せば処理し直せるようにします
+
+        Args:
+            job: ジョブ
+            reason: error.txt に書き込む理由
+        """
+        job_dir = Path(job.output_dir)
+        if job_dir.exists():
+            self._move_to_failed(job_dir, reason)
+        self.queue.delete_job(job.id)
+
+    def _move_to_failed(self, job_dir: Path, reason: str):
+        """処理中のフォルダを理由を添えて failed/ に移動"""
+        target = self.failed_dir / job_dir.name
+        shutil.move(str(job_dir), str(target))
+        (target / 'error.txt').write_text(reason + '\n', encoding='utf-8')
+        print(f"⚠️  完了できなかったファイルを {FAILED_DIR}/{job_dir.name} に移動しました。"
+              f"確認後、監視フォルダに戻すと処理し直します")
+
+    def _set_aside_stale(self):
+        """
+        保存期間を過ぎた未完了のジョブと、ジョブキューに記録のない処理中のフォルダを failed/ に移動
+
+        ジョブキューの記録は保存期間を過ぎると（他のプロセスの起動時にも）削除されるため、
+        記録がなくなったフォルダは再実行されずに元のファイルが残り続けます
+        """
+        from src.config import config
+
+        cutoff = (datetime.now() - timedelta(hours=config.JOB_RETENTION_HOURS)).isoformat(timespec='seconds')
+        referenced = set()
+        for job in self.queue.list_jobs():
+            if not self._is_own_job(job):
+                continue
+            if job.is_unfinished and job.updated_at < cutoff:
+                self._set_aside(job, (
+                    f"保存期間（{config.JOB_RETENTION_HOURS:g}時間）を過ぎても完了しませんでした: "
+                    f"{job.error or '中断'}"
+                ))
+            else:
+                referenced.add(Path(job.output_dir))
+
+        for job_dir in sorted(self.processing_dir.iterdir()):
+            if job_dir.is_dir() and job_dir not in referenced:
+                self._move_to_failed(job_dir, "ジョブの記録が見つかりません（保存期間を過ぎて削除された可能性があります）")
+
+    def resume_unfinished(self) -> List[int]:
+        """
+        前回中断した（またはエラーになった）監視フォルダのジョブを再実行
+
+        Returns:
+            List[int]: 再実行したジョブID
+        """
+        resumed = []
+        for job in self.queue.unfinished_jobs():
+            if not self._is_own_job(job):
+                continue  # 画面・APIから実行したジョブは対象外
+            if job.id in self._futures or not Path(job.output_dir).exists():
+                continue
+            self.queue.retry(job.id)
+            self._start(job.id)
+            resumed.append(job.id)
+        return resumed
+
+    def poll_once(self) -> List[int]:
+        """
+        監視フォルダを1回確認し、書き込みが完了した患者のジョブを開始
+
+        Returns:
+            List[int]: 開始したジョブID
+        """
+        # 完了したジョブを片付け
+        for job_id in [job_id for job_id, future in self._futures.items() if future.done()]:
+            del self._futures[job_id]
+
+        started = []
+        for paths in self.scan():
+            job_id = self.submit(paths)
+            if job_id is not None:
+                started.append(job_id)
+        return started
+
+    def run(self, poll_sec: float = 2.0):
+        """
+        stop() が呼ばれるまで監視フォルダを確認し続ける
+
+        Args:
+            poll_sec: 確認する間隔（秒）
+        """
+        resumed = self.resume_unfinished()
+        if resumed:
+            print(f"中断していたジョブを再開します: {resumed}")
+        print(f"監視を開始します: {self.watch_dir}（プリセット: {self.preset_key}、同時実行数: {self.workers}）")
+
+        try:
+            while not self._stop.is_set():
+                self.poll_once()
+                self._stop.wait(poll_sec)
+        finally:
+            self.close()
+
+    def wait(self):
+        """実行中のジョブがすべて終わるまで待つ"""
+        for future in list(self._futures.values()):
+            try:
+                future.result()
+            except Exception:
+                pass  # エラーは _run_job で表示済み
+
+    def stop(self):
+        """監視を終了（実行中のジョブは完了まで待つ）"""
+        self._stop.set()
+
+    def close(self):
+        """実行中のジョブの完了を待ってから終了"""
+        self._executor.shutdown(wait=True)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """監視フォルダのコマンド"""
+    import argparse
+
+    from src.config import config
+
+    parser = argparse.ArgumentParser(description="監視フォルダに置かれた文書を自動で要約します")
+    parser.add_argument('watch_dir', nargs='?', default=config.WATCH_DIR,
+                        help="監視するフォルダ（省略時は設定の watch_dir）")
+    parser.add_argument('--preset', default=config.WATCH_PRESET, help="使用するプリセット")
+    parser.add_argument('--workers', type=int, default=config.WATCH_WORKERS, help="同時に処理する患者数")
+    parser.add_argument('--settle', type=float, default=config.WATCH_SETTLE_SEC,
+                        help="書き込み完了とみなすまでの秒数")
+    parser.add_argument('--interval', type=float, default=2.0, help="フォルダを確認する間隔（秒）")
+    args = parser.parse_args(argv)
+
+    if not args.watch_dir:
+        parser.error("監視するフォルダを指定してください（または設定ファイルの watch_dir）")
+
+    errors = config.validate_config()
+    if errors:
+        for error in errors:
+            print(f"❌ {error}")
+        return 1
+
+    from src.presets import PresetManager
+    presets = PresetManager.get_all_presets()  # カスタムプリセットを含む
+    if args.preset not in presets:
+        print(f"❌ プリセット '{args.preset}' が見つかりません。利用可能なプリセット: {list(presets.keys())}")
+        return 1
+
+    watcher = FolderWatcher(args.watch_dir, args.preset, args.workers, args.settle)
+    try:
+        watcher.run(poll_sec=args.interval)
+    except KeyboardInterrupt:
+        print("\n監視を終了します（実行中のジョブの完了を待っています）")
+        watcher.close()
+    return 0
+
+
+if __name__ == "__main__":
+    import sys
+    sys.exit(main())
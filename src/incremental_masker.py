@@ -0,0 +1,124 @@
+"""
+差分マスキングモジュール
+確認画面で編集されたテキストのうち、変更されたセグメントだけを再スキャンします
+"""
+
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+from src.metrics import metrics
+from src.pii_remover import PIIRemover
+from src.text_segments import split_segments, segment_hash
+
+
+class IncrementalMasker:
+    """差分マスキングクラス"""
+
+    # キャッシュするセグメント数の上限
+    MAX_CACHE_ENTRIES = 20000
+
+    def __init__(self, remover: Optional[PIIRemover] = None):
+        """
+        初期化
+
+        Args:
+            remover: 使用するPIIRemover（Noneの場合は新規作成）
+        """
+        self.remover = remover or PIIRemover()
+        # セグメントのハッシュ -> (マスク済みセグメント, 置換ログ)
+        self._cache: "OrderedDict[str, Tuple[str, List[Tuple[str, str]]]]" = OrderedDict()
+        self.last_rescanned = 0  # 直近のupdateで再スキャンしたセグメント数
+        self.last_reused = 0     # 直近のupdateでキャッシュを使ったセグメント数
+
+    def prime(self, masked_text: str):
+        """
+        マスク済みテキストを登録（以降、変更のないセグメントは再スキャンしない）
+
+        Args:
+            masked_text: clean_text済みのテキスト
+        """
+        for segment in split_segments(masked_text):
+            self._store(segment_hash(segment), segment, [])
+
+    def update(self, text: str) -> Tuple[str, List[Tuple[str, str]]]:
+        """
+        変更のあったセグメントのみ個人情報を削除
+
+        Args:
+            text: 編集後のテキスト
+
+        Returns:
+            Tuple[str, List[Tuple[str, str]]]:
+                (個人情報を削除したテキスト, 再スキャンで新たに検出した置換ログ)
+        """
+        masked_segments = []
+        new_log: List[Tuple[str, str]] = []
+        self.last_rescanned = 0
+        self.last_reused = 0
+
+        with metrics.timer('incremental_mask', chars_in=len(text)) as event:
+            for segment in split_segments(text):
+                key = segment_hash(segment)
+                cached = self._cache.get(key)
+                if cached is not None:
+                    self._cache.move_to_end(key)
+                    masked_segments.append(cached[0])
+                    self.last_reused += 1
+                    continue
+
+                masked, log = self.remover.clean_text(segment)
+                log = list(log)
+                self._store(key, masked, log)
+                masked_segments.append(masked)
+                new_log.extend(log)
+                self.last_rescanned += 1
+
+                # マスク結果が再マスクで変化しない場合は、結果自体もマスク済みとして登録
+                masked_key = segment_hash(masked)
+                if masked_key not in self._cache:
+                    recheck, _ = self.remover.clean_text(masked)
+                    if recheck == masked:
+                        self._store(masked_key, masked, [])
+
+            result = "".join(masked_segments)
+            event.set(
+                chars_out=len(result),
+                rescanned=self.last_rescanned,
+                reused=self.last_reused,
+                matches=len(new_log),
+            )
+
+        metrics.increment('cache_hits', self.last_reused, stage='incremental_mask')
+        metrics.increment('cache_misses', self.last_rescanned, stage='incremental_mask')
+
+        return result, new_log
+
+    def _store(self, key: str, masked: str, log: List[Tuple[str, str]]):
+        """キャッシュに登録（上限を超えた場合は古いものから削除）"""
+        self._cache[key] = (masked, log)
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.MAX_CACHE_ENTRIES:
+            self._cache.popitem(last=False)
+
+
+if __name__ == "__main__":
+    # テスト用
+    import time
+
+    with open("tests/sample_medical_record.txt", encoding="utf-8") as f:
+        original = f.read()
+    document = "\n\n".join([original] * 300)
+
+    masker = IncrementalMasker()
+    start = time.perf_counter()
+    masked, _ = PIIRemover().clean_text(document)
+    print(f"全体マスキング: {time.perf_counter() - start:.3f}秒")
+    masker.prime(masked)
+
+    # 1か所だけ編集して再チェック
+    edited = masked.replace("診断名", "患者氏名：山田 花子\n電話：03-1234-5678\n診断名", 1)
+    start = time.perf_counter()
+    remasked, new_log = masker.update(edited)
+    print(f"差分マスキング: {time.perf_counter() - start:.3f}秒 "
+          f"(再スキャン {masker.last_rescanned} / 再利用 {masker.last_reused} セグメント)")
+    print(f"新たに検出: {new_log}")
@@ -0,0 +1,576 @@
+"""
+ジョブキューモジュール
+ファイル読み込み→個人情報削除→要約生成→保存の各段階をSQLiteに記録し、
+アプリの終了やクラッシュで中断した処理を、完了済みの段階を繰り返さずに再開します
+
+チェックポイントには個人情報を含む読み込み結果が一時的に保存されるため、
+データベースは所有者のみ読み書き可能にし、不要になった段階のデータは削除します
+仮名化する場合の対応表（保管庫）は、ジョブごとに暗号化したファイルとして完了まで保存します
+"""
+
+import json
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Tuple, Union
+
+from src.metrics import metrics
+from src.pseudonym_vault import CRYPTOGRAPHY_AVAILABLE, PseudonymVault
+
+
+# ジョブの状態
+STATUS_PENDING = 'pending'   # 未実行
+STATUS_RUNNING = 'running'   # 実行中（アプリ終了時にこの状態なら中断されている）
+STATUS_DONE = 'done'         # 完了
+STATUS_FAILED = 'failed'     # エラー
+
+# 処理段階
+STAGE_READ = 'read'
+STAGE_MASK = 'mask'
+STAGE_SUMMARIZE = 'summarize'
+STAGE_SAVE = 'save'
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    status TEXT NOT NULL,
+    preset_key TEXT NOT NULL,
+    files TEXT NOT NULL,
+    output_dir TEXT,
+    error TEXT,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS checkpoints (
+    job_id INTEGER NOT NULL REFERENCES jobs(id) ON DELETE CASCADE,
+    stage TEXT NOT NULL,
+    item TEXT NOT NULL DEFAULT '',
+    data TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    PRIMARY KEY (job_id, stage, item)
+);
+"""
+
+
+@dataclass
+class Job:
+    """ジョブ"""
+    id: int
+    status: str
+    preset_key: str
+    files: List[str] = field(default_factory=list)
+    output_dir: Optional[str] = None
+    error: Optional[str] = None
+    created_at: str = ""
+    updated_at: str = ""
+
+    @property
+    def is_unfinished(self) -> bool:
+        """未完了（未実行・中断・エラー）かどうか"""
+        return self.status != STATUS_DONE
+
+
+def get_default_db_path() -> Path:
+    """ジョブキューのデータベースのパスを取得"""
+    from src.config import config
+    return config.get_config_manager().config_dir / 'jobs.db'
+
+
+class JobQueue:
+    """SQLiteを使ったジョブキュークラス"""
+
+    def __init__(self, db_path: Optional[Union[str, Path]] = None):
+        """
+        初期化
+
+        Args:
+            db_path: データベースのパス（Noneの場合は設定ディレクトリ内）
+        """
+        self.db_path = Path(db_path) if db_path else get_default_db_path()
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.vault_dir = self.db_path.parent / 'vaults'
+        self._lock = threading.Lock()
+        # 暗号化できない環境（cryptography なし）では保管庫をこのプロセス内でのみ保持
+        self._memory_vaults: Dict[int, PseudonymVault] = {}
+
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+        try:
+            os.chmod(self.db_path, 0o600)  # 所有者のみ読み書き可能
+        except OSError:
+            pass
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """接続を開き、処理後にコミットして閉じる"""
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA foreign_keys = ON")
+        try:
+            with self._lock:
+                with conn:
+                    yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _now() -> str:
+        return datetime.now().isoformat(timespec='seconds')
+
+    @staticmethod
+    def _to_job(row: sqlite3.Row) -> Job:
+        return Job(
+            id=row['id'],
+            status=row['status'],
+            preset_key=row['preset_key'],
+            files=json.loads(row['files']),
+            output_dir=row['output_dir'],
+            error=row['error'],
+            created_at=row['created_at'],
+            updated_at=row['updated_at'],
+        )
+
+    # ========== ジョブ ==========
+
+    def enqueue(
+        self,
+        files: List[Union[str, Path]],
+        preset_key: str,
+        output_dir: Optional[str] = None,
+        masked_text: Optional[str] = None,
+        vault: Optional[PseudonymVault] = None
+    ) -> int:
+        """
+        ジョブを登録
+
+        Args:
+            files: 入力ファイルのパスのリスト
+            preset_key: 使用するプリセットのキー
+            output_dir: 出力ディレクトリ（Noneの場合は設定に従う）
+            masked_text: 確認済みのマスク済みテキスト（指定した場合は読み込み・削除を省略）
+            vault: masked_text を仮名化した保管庫（要約で元の値に戻すために保存）
+
+        Returns:
+            int: ジョブID
+        """
+        now = self._now()
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "INSERT INTO jobs (status, preset_key, files, output_dir, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (STATUS_PENDING, preset_key, json.dumps([str(f) for f in files], ensure_ascii=False),
+                 output_dir, now, now)
+            )
+            job_id = cursor.lastrowid
+            if masked_text is not None:
+                conn.execute(
+                    "INSERT INTO checkpoints (job_id, stage, item, data, created_at) VALUES (?, ?, '', ?, ?)",
+                    (job_id, STAGE_MASK, json.dumps({'text': masked_text}, ensure_ascii=False), now)
+                )
+        if vault is not None:
+            self.save_vault(job_id, vault)
+        return job_id
+
+    def get_job(self, job_id: int) -> Optional[Job]:
+        """
+        ジョブを取得
+
+        Args:
+            job_id: ジョブID
+
+        Returns:
+            Optional[Job]: ジョブ（存在しない場合はNone）
+        """
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._to_job(row) if row else None
+
+    def list_jobs(self, statuses: Optional[List[str]] = None) -> List[Job]:
+        """
+        ジョブの一覧を取得（登録順）
+
+        Args:
+            statuses: 取得する状態（Noneの場合はすべて）
+
+        Returns:
+            List[Job]: ジョブのリスト
+        """
+        with self._connect() as conn:
+            if statuses:
+                placeholders = ",".join("?" * len(statuses))
+                rows = conn.execute(
+                    f"SELECT * FROM jobs WHERE status IN ({placeholders}) ORDER BY id", statuses
+                ).fetchall()
+            else:
+                rows = conn.execute("SELECT * FROM jobs ORDER BY id").fetchall()
+        return [self._to_job(row) for row in rows]
+
+    def unfinished_jobs(self) -> List[Job]:
+        """未実行・中断・エラーのジョブの一覧（再開できるジョブ）"""
+        return self.list_jobs([STATUS_PENDING, STATUS_RUNNING, STATUS_FAILED])
+
+    def set_status(self, job_id: int, status: str, error: Optional[str] = None):
+        """
+        ジョブの状態を更新
+
+        Args:
+            job_id: ジョブID
+            status: 新しい状態
+            error: エラーメッセージ
+        """
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, updated_at = ? WHERE id = ?",
+                (status, error, self._now(), job_id)
+            )
+
+    def retry(self, job_id: int):
+        """エラーになったジョブを再実行待ちに戻す（完了済みの段階は再利用）"""
+        self.set_status(job_id, STATUS_PENDING)
+
+    def delete_job(self, job_id: int):
+        """ジョブとチェックポイント・保管庫を削除"""
+        with self._connect() as conn:
+            conn.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+        self.delete_vault(job_id)
+
+    def purge_expired(self, retention_hours: Optional[float] = None) -> int:
+        """
+        保存期間を過ぎたジョブを、チェックポイント・保管庫とともに削除
+
+        完了したジョブの要約結果や、エラー・中断のまま再開されなかったジョブの読み込み結果
+        （マスク前の個人情報を含む）を残し続けないため、起動時に呼び出します
+
+        Args:
+            retention_hours: 最後に更新されてから残す時間（Noneの場合は設定に従う）
+
+        Returns:
+            int: 削除したジョブの数
+        """
+        if retention_hours is None:
+            from src.config import config
+            retention_hours = config.JOB_RETENTION_HOURS
+        cutoff = (datetime.now() - timedelta(hours=retention_hours)).isoformat(timespec='seconds')
+        with self._connect() as conn:
+            rows = conn.execute("SELECT id FROM jobs WHERE updated_at < ?", (cutoff,)).fetchall()
+            conn.execute("DELETE FROM jobs WHERE updated_at < ?", (cutoff,))
+        for row in rows:
+            self.delete_vault(row['id'])
+        if rows:
+            print(f"🗑  保存期間（{retention_hours:g}時間）を過ぎたジョブを削除しました: {len(rows)}件")
+        return len(rows)
+
+    # ========== チェックポイント ==========
+
+    def save_checkpoint(self, job_id: int, stage: str, data: Dict, item: str = ''):
+        """
+        段階の処理結果を保存
+
+        Args:
+            job_id: ジョブID
+            stage: 処理段階
+            data: 処理結果（JSONに変換できる辞書）
+            item: 段階内の項目（ファイルごとの読み込み結果など）
+        """
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO checkpoints (job_id, stage, item, data, created_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (job_id, stage, item, json.dumps(data, ensure_ascii=False), self._now())
+            )
+
+    def get_checkpoint(self, job_id: int, stage: str, item: str = '') -> Optional[Dict]:
+        """
+        段階の処理結果を取得
+
+        Args:
+            job_id: ジョブID
+            stage: 処理段階
+            item: 段階内の項目
+
+        Returns:
+            Optional[Dict]: 処理結果（未完了の場合はNone）
+        """
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT data FROM checkpoints WHERE job_id = ? AND stage = ? AND item = ?",
+                (job_id, stage, item)
+            ).fetchone()
+        return json.loads(row['data']) if row else None
+
+    def clear_checkpoints(self, job_id: int, stage: str):
+        """
+        段階の処理結果を削除（個人情報を含む中間データを残さないため）
+
+        Args:
+            job_id: ジョブID
+            stage: 処理段階
+        """
+        with self._connect() as conn:
+            conn.execute("DELETE FROM checkpoints WHERE job_id = ? AND stage = ?", (job_id, stage))
+
+    # ========== 仮名化の保管庫 ==========
+
+    def _vault_path(self, job_id: int) -> Path:
+        return self.vault_dir / f"{job_id}.vault"
+
+    def save_vault(self, job_id: int, vault: PseudonymVault):
+        """
+        ジョブの保管庫を暗号化して保存（暗号化キーはデータベースと同じディレクトリ）
+
+        cryptography がない場合は、平文で保存せずにこのプロセス内でのみ保持します
+        （アプリを終了すると中断したジョブの要約は記号のまま保存されます）
+
+        Args:
+            job_id: ジョブID
+            vault: 保管庫
+        """
+        if not CRYPTOGRAPHY_AVAILABLE:
+            if job_id not in self._memory_vaults:
+                print("⚠️  cryptography がないため、仮名化の対応表はファイルに保存しません")
+            self._memory_vaults[job_id] = vault
+            return
+        vault.save(self._vault_path(job_id), self.db_path.parent / 'vault.key')
+
+    def load_vault(self, job_id: int) -> Optional[PseudonymVault]:
+        """
+        ジョブの保管庫を読み込む
+
+        Args:
+            job_id: ジョブID
+
+        Returns:
+            Optional[PseudonymVault]: 保管庫（仮名化していないジョブの場合はNone）
+        """
+        if job_id in self._memory_vaults:
+            return self._memory_vaults[job_id]
+        path = self._vault_path(job_id)
+        if not path.exists():
+            return None
+        return PseudonymVault.load(path, self.db_path.parent / 'vault.key')
+
+    def delete_vault(self, job_id: int):
+        """ジョブの保管庫を削除（要約を元の値に戻して保存した後は不要）"""
+        self._memory_vaults.pop(job_id, None)
+        try:
+            self._vault_path(job_id).unlink()
+        except FileNotFoundError:
+            pass
+
+
+class JobRunner:
+    """
+    ジョブの実行クラス
+    各段階の結果をチェックポイントとして保存し、再実行時は保存済みの段階を省略します
+    """
+
+    def __init__(self, queue: JobQueue, summarizer_factory: Optional[Callable] = None):
+        """
+        初期化
+
+        Args:
+            queue: ジョブキュー
+            summarizer_factory: MedicalSummarizerを作成する関数（Noneの場合は既定）
+        """
+        self.queue = queue
+        self.summarizer_factory = summarizer_factory
+        self._summarizer = None
+
+    def _get_summarizer(self):
+        """要約生成が必要になった時点でMedicalSummarizerを作成"""
+        if self._summarizer is None:
+            if self.summarizer_factory is not None:
+                self._summarizer = self.summarizer_factory()
+            else:
+                from src.summarizer import MedicalSummarizer
+                self._summarizer = MedicalSummarizer()
+        return self._summarizer
+
+    def run(self, job_id: int, progress: Optional[Callable[[str], None]] = None):
+        """
+        ジョブを実行（中断されたジョブは続きから再開）
+
+        Args:
+            job_id: ジョブID
+            progress: 段階が切り替わるたびに呼ばれる関数（段階名を受け取る）
+
+        Returns:
+            Tuple[SummaryResult, Dict[str, str], str]: (要約結果, 保存したファイルのパス, マスク済みテキスト)
+
+        Raises:
+            Exception: 処理エラー（ジョブはエラー状態として記録されます）
+        """
+        from src.summarizer import SummaryResult
+
+        job = self.queue.get_job(job_id)
+        if job is None:
+            raise Exception(f"ジョブが見つかりません: {job_id}")
+
+        self.queue.set_status(job_id, STATUS_RUNNING)
+        try:
+            masked_text, vault = self._run_read_and_mask(job, progress)
+
+            # 要約生成
+            summary = self.queue.get_checkpoint(job_id, STAGE_SUMMARIZE)
+            if summary is None:
+                self._notify(progress, STAGE_SUMMARIZE)
+                result = self._get_summarizer().generate_summary(masked_text, preset_key=job.preset_key)
+                if result.error:
+                    raise Exception(result.error)
+                summary = asdict(result)
+                self.queue.save_checkpoint(job_id, STAGE_SUMMARIZE, summary)
+            else:
+                metrics.increment('cache_hits', stage=f'job.{STAGE_SUMMARIZE}')
+            result = SummaryResult(**summary)
+            if vault is not None and result.content:
+                # チェックポイントには記号のまま残し、保存・表示する要約だけ元の値に戻す
+                result.content = vault.restore(result.content)
+
+            # ファイル保存
+            saved = self.queue.get_checkpoint(job_id, STAGE_SAVE)
+            if saved is None:
+                self._notify(progress, STAGE_SAVE)
+                saved = self._get_summarizer().save_results(result, job.output_dir)
+                self.queue.save_checkpoint(job_id, STAGE_SAVE, saved)
+
+            self.queue.set_status(job_id, STATUS_DONE)
+            # 完了後はマスク済みの全文・仮名化の対応表を残さない（記号のままの要約結果のみ保持）
+            self.queue.clear_checkpoints(job_id, STAGE_MASK)
+            self.queue.delete_vault(job_id)
+            return result, saved, masked_text
+
+        except Exception as e:
+            self.queue.set_status(job_id, STATUS_FAILED, str(e))
+            raise
+
+    def _run_read_and_mask(
+        self, job: Job, progress: Optional[Callable[[str], None]]
+    ) -> Tuple[str, Optional[PseudonymVault]]:
+        """ファイル読み込みと個人情報削除（保存済みの場合は省略）、仮名化した場合は保管庫も返す"""
+        masked = self.queue.get_checkpoint(job.id, STAGE_MASK)
+        if masked is not None:
+            metrics.increment('cache_hits', stage=f'job.{STAGE_MASK}')
+            return masked['text'], self.queue.load_vault(job.id)
+
+        from src.config import config
+        from src.deduplicator import Deduplicator
+        from src.file_reader import FileReader
+        from src.ocr_cleaner import OCRCleaner
+        from src.parallel_masker import ParallelMasker
+        from src.pii_remover import PIIRemover
+        from src.text_normalizer import normalize_text
+
+        # 読み込み済みのファイル見出しは保管庫の記号でマスクしているため、再開時は同じ保管庫を使う
+        vault = self.queue.load_vault(job.id)
+        if vault is None and config.PSEUDONYMIZE:
+            # 保管庫がない（cryptography がなくアプリを終了した場合など）と記号を元に戻せないため読み込み直す
+            self.queue.clear_checkpoints(job.id, STAGE_READ)
+            vault = PseudonymVault()
+        remover = PIIRemover.for_preset(job.preset_key, vault=vault)
+        FileReader.check_batch_limits(job.files)
+
+        # ファイルごとに読み込み（OCR済みのファイルは再読み込みしない）
+        self._notify(progress, STAGE_READ)
+        sections = []
+        errors = []
+        for index, file_path in enumerate(job.files):
+            item = str(index)
+            cached = self.queue.get_checkpoint(job.id, STAGE_READ, item)
+            if cached is not None:
+                metrics.increment('cache_hits', stage=f'job.{STAGE_READ}')
+                sections.append(cached['text'])
+                continue
+            try:
+                section = FileReader.read_file_section(file_path, remover)
+            except Exception as e:
+                masked_name, _ = remover.clean_text(Path(file_path).name)
+                errors.append(f"❌ {masked_name}: {str(e)}")
+                continue
+            if vault is not None:
+                self.queue.save_vault(job.id, vault)  # 読み込んだテキストより先に保存（ファイル名の記号を元に戻せるように）
+            self.queue.save_checkpoint(job.id, STAGE_READ, {'text': section}, item)
+            sections.append(section)
+
+        if errors:
+            error_msg = "\n".join(errors)
+            if not sections:
+                raise Exception(f"すべてのファイルの読み込みに失敗しました:\n{error_msg}")
+            print(f"⚠️  一部のファイルの読み込みに失敗しました:\n{error_msg}")
+
+        # 文字を正規化し、OCRノイズと重複した段落を除いてから個人情報削除
+        self._notify(progress, STAGE_MASK)
+        text = "\n\n".join(sections)
+        if config.NORMALIZE_TEXT:
+            text = normalize_text(text).text
+        if config.OCR_CLEANUP:
+            cleanup = OCRCleaner().clean(text)
+            text = cleanup.text
+            if cleanup.chars_saved:
+                print(f"🧹 OCRノイズを除去しました:\n{cleanup.get_summary_report()}")
+        deduped = Deduplicator().deduplicate(text)
+        masked_text, _ = ParallelMasker(remover).clean_text(deduped.text)
+        if vault is not None:
+            self.queue.save_vault(job.id, vault)  # マスク済みテキストより先に保存（再開時に元に戻せるように）
+        self.queue.save_checkpoint(job.id, STAGE_MASK, {'text': masked_text})
+
+        # マスク前のテキストは再開に不要になったため削除
+        self.queue.clear_checkpoints(job.id, STAGE_READ)
+        return masked_text, vault
+
+    @staticmethod
+    def _notify(progress: Optional[Callable[[str], None]], stage: str):
+        if progress is not None:
+            progress(stage)
+
+
+if __name__ == "__main__":
+    # テスト用
+    import tempfile
+
+    from src.summarizer import SummaryResult
+
+    class _FormatOnlySummarizer:
+        """API呼び出しを行わない動作確認用の要約クラス"""
+        calls = 0
+        interrupted = False
+
+        def generate_summary(self, text, preset_key):
+            _FormatOnlySummarizer.calls += 1
+            return SummaryResult(content=text[:200], preset_name=preset_key, char_count=200)
+
+        def save_results(self, result, output_dir=None):
+            if not _FormatOnlySummarizer.interrupted:
+                _FormatOnlySummarizer.interrupted = True
+                raise Exception("保存中に中断されました（動作確認用）")
+            return {'summary': f"{output_dir}/{result.preset_name}.txt"}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        queue = JobQueue(Path(tmp) / 'jobs.db')
+        job_id = queue.enqueue(["tests/sample_medical_record.txt"], 'format_only', output_dir=tmp)
+        runner = JobRunner(queue, summarizer_factory=_FormatOnlySummarizer)
+
+        try:
+            runner.run(job_id, progress=lambda stage: print(f"  段階: {stage}"))
+        except Exception as e:
+            print(f"1回目: {e}")
+        print(f"未完了のジョブ: {[job.id for job in queue.unfinished_jobs()]}")
+
+        queue.retry(job_id)
+        result, saved, _ = runner.run(job_id, progress=lambda stage: print(f"  段階: {stage}"))
+        print(f"2回目: {saved} (要約生成の呼び出し回数: {_FormatOnlySummarizer.calls})")
+        print(f"状態: {queue.get_job(job_id).status}")
+
+        # 仮名化したジョブ（要約生成には記号のまま渡し、保存する要約は元の値に戻す）
+        from src.config import config
+
+        config.PSEUDONYMIZE = True
+        job_id = queue.enqueue(["tests/sample_medical_record.txt"], 'format_only', output_dir=tmp)
+        _FormatOnlySummarizer.interrupted = True
+        result, _, masked_text = runner.run(job_id)
+        print(f"要約生成に渡したテキスト: {masked_text[masked_text.find('['):][:60]!r}")
+        print(f"保存した要約: {result.content[masked_text.find('['):][:60]!r}")
+        print(f"完了後に保管庫を削除: {queue.load_vault(job_id) is None}")
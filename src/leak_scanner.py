@@ -0,0 +1,170 @@
+"""
+送信前チェックモジュール
+AI APIに送る直前の文書（プロンプトの指示文を除く）を個人情報の検出処理で検査し、
+確認画面での編集などで残った個人情報を再マスク（または送信を中止）します
+"""
+
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from src.metrics import metrics
+from src.pii_remover import PIIRemover, PIISpan
+
+
+# 検出時の動作
+MODE_MASK = 'mask'    # 検出した個人情報をマスクして送信
+MODE_BLOCK = 'block'  # 送信を中止（PHILeakError）
+MODE_OFF = 'off'      # 検査しない
+MODES = (MODE_MASK, MODE_BLOCK, MODE_OFF)
+
+
+class PHILeakError(Exception):
+    """送信するプロンプトに個人情報が含まれている（block モード）"""
+    pass
+
+
+@dataclass
+class LeakScanResult:
+    """送信前チェックの結果"""
+    text: str                                           # 送信するプロンプト（mask モードではマスク済み）
+    spans: List[PIISpan] = field(default_factory=list)  # 検出した個人情報（元のプロンプトでの位置）
+    seconds: float = 0.0                                # 検査にかかった時間（秒）
+
+    @property
+    def has_leaks(self) -> bool:
+        return bool(self.spans)
+
+    def category_counts(self) -> Dict[str, int]:
+        """種別ごとの件数"""
+        return dict(Counter(span.category for span in self.spans))
+
+    def describe(self) -> str:
+        """検出内容の説明（ログに個人情報を残さないよう、値は含めない）"""
+        return "、".join(f"{category}{count}件" for category, count in self.category_counts().items())
+
+
+class LeakScanner:
+    """送信前チェッククラス"""
+
+    def __init__(self, mode: Optional[str] = None, remover: Optional[PIIRemover] = None):
+        """
+        初期化
+
+        Args:
+            mode: 検出時の動作（mask / block / off、Noneの場合は設定に従う）
+            remover: 検査に使うPIIRemover（Noneの場合はすべての検出処理を使用）
+
+        Raises:
+            ValueError: 不明な動作
+        """
+        if mode is None:
+            from src.config import config
+            mode = config.LEAK_SCAN_MODE
+        if mode not in MODES:
+            raise ValueError(f"サポートされていない送信前チェックの動作: {mode}")
+        self.mode = mode
+        # プリセットで無効にした検出処理も含め、すべての検出処理で検査する
+        self.remover = remover or PIIRemover()
+
+    def scan(self, prompt: str) -> LeakScanResult:
+        """
+        プロンプトを検査（mask モードでは検出した個人情報をマスク）
+
+        Args:
+            prompt: 送信するプロンプト
+
+        Returns:
+            LeakScanResult: 検査結果
+        """
+        if self.mode == MODE_OFF:
+            return LeakScanResult(prompt)
+
+        with metrics.timer('leak_scan', chars_in=len(prompt), mode=self.mode) as event:
+            if self.mode == MODE_MASK:
+                text, _ = self.remover.clean_text(prompt)
+                spans = list(self.remover.spans)
+            else:
+                text = prompt
+                spans = sorted(
+                    (span for span in self.remover.detect(prompt) if not span.absorbed), key=lambda s: s.start
+                )
+            event.set(matches=len(spans))
+
+        if spans:
+            metrics.increment('phi_leaks', len(spans), stage='leak_scan')
+        return LeakScanResult(text, spans, event.duration)
+
+    def check(self, prompt: str) -> str:
+        """
+        送信前チェック（送信してよいプロンプトを返す）
+
+        Args:
+            prompt: 送信するプロンプト
+
+        Returns:
+            str: 送信するプロンプト（mask モードで検出した場合はマスク済み）
+
+        Raises:
+            PHILeakError: block モードで個人情報を検出した場合
+        """
+        result = self.scan(prompt)
+        if not result.has_leaks:
+            return prompt
+
+        if self.mode == MODE_BLOCK:
+            raise PHILeakError(
+                f"送信するテキストに個人情報が残っています（{result.describe()}）。確認画面で削除してください"
+            )
+        print(f"⚠️  送信前チェックで個人情報をマスクしました: {result.describe()}")
+        return result.text
+
+
+if __name__ == "__main__":
+    # テスト用（送信前チェックにかかる時間を計測）
+    import time
+
+    from src.presets import PresetManager
+    from src.pseudonym_vault import PROMPT_NOTE, PseudonymVault
+    from src.text_stats import estimate_tokens
+
+    with open("tests/sample_medical_record.txt", encoding="utf-8") as f:
+        masked_text, _ = PIIRemover().clean_text(f.read())
+
+    preset = PresetManager.get_preset('summary')
+    scanner = LeakScanner(MODE_MASK)
+
+    print("=== 確認画面で個人情報を書き戻した場合 ===")
+    edited = masked_text + "\n追記：本日、山本太郎さんの妻より電話あり（03-1234-5678）。"
+    result = scanner.scan(edited)
+    print(f"検出: {result.describe()}")
+    print(result.text[-60:])
+
+    try:
+        LeakScanner(MODE_BLOCK).check(edited)
+    except PHILeakError as e:
+        print(f"block: {e}")
+
+    # 仮名化した文書（MedicalSummarizer.generate_summary と同じ順序: 文書を検査してから指示文を追加）
+    print("\n=== 仮名化した文書 ===")
+    with open("tests/sample_medical_record.txt", encoding="utf-8") as f:
+        pseudonymized, _ = PIIRemover(vault=PseudonymVault()).clean_text(f.read())
+    for mode in (MODE_MASK, MODE_BLOCK):
+        checked = LeakScanner(mode).check(pseudonymized)
+        prompt = f"{PROMPT_NOTE}\n\n" + PresetManager.format_prompt(
+            preset.prompt, checked, target_chars=preset.target_chars
+        )
+        print(f"{mode}: 文書は変更なし: {checked == pseudonymized}、指示文は変更なし: {prompt.startswith(PROMPT_NOTE)}")
+
+    print(f"\n=== 計測（{preset.name}、max_tokens={preset.max_tokens}） ===")
+    for copies in (1, 4, 16):
+        prompt = PresetManager.format_prompt(
+            preset.prompt, "\n\n".join([masked_text] * copies), target_chars=preset.target_chars
+        )
+        best = None
+        for _ in range(20):
+            start = time.perf_counter()
+            scanner.scan(prompt)
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        print(f"{len(prompt)}文字（約{estimate_tokens(prompt)}トークン）: {best * 1000:.2f}ms")
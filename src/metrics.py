@@ -0,0 +1,372 @@
+"""
+計測モジュール
+各処理ステージの所要時間・入出力サイズ・トークン使用量などを記録します
+記録内容は文字数やバイト数などの数値のみで、文書の本文は保持しません
+"""
+
+import json
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass, field, asdict
+from pathlib import Path
+from typing import Any, Deque, Dict, Iterator, List, Optional, Tuple, Union
+
+
+@dataclass
+class MetricEvent:
+    """計測イベントクラス"""
+    stage: str  # ステージ名（read_file, pii.detect_names, call_api など）
+    duration: float = 0.0  # 所要時間（秒）
+    chars_in: int = 0  # 入力文字数
+    chars_out: int = 0  # 出力文字数
+    bytes_in: int = 0  # 入力バイト数
+    timestamp: float = 0.0  # 記録時刻（UNIX時間）
+    seq: int = 0  # 記録順の通し番号
+    thread_id: int = 0  # 記録したスレッド（プロファイルに同じ実行のイベントのみ含めるため）
+    attributes: Dict[str, Any] = field(default_factory=dict)  # その他の数値・ラベル
+
+    def set(self, **attributes: Any):
+        """追加属性を設定（トークン数、ファイル種別など）"""
+        for key, value in attributes.items():
+            if key in ('chars_in', 'chars_out', 'bytes_in'):
+                setattr(self, key, value)
+            else:
+                self.attributes[key] = value
+
+
+class MetricsRegistry:
+    """プロセス内の計測レジストリクラス"""
+
+    # Prometheus出力時のメトリクス名の接頭辞
+    PROMETHEUS_PREFIX = "summaryfordoc"
+
+    def __init__(self, max_events: int = 10000):
+        """
+        初期化
+
+        Args:
+            max_events: 保持するイベントの最大数（古いものから破棄）
+        """
+        self._events: Deque[MetricEvent] = deque(maxlen=max_events)
+        self._counters: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], float] = {}
+        self._lock = threading.Lock()
+        self._seq = 0  # 最後に記録したイベントの通し番号
+        self._exported_seq = 0  # JSON Linesに出力済みの通し番号
+
+    def _append(self, event: MetricEvent):
+        """イベントに通し番号を付けて保存"""
+        event.thread_id = threading.get_ident()
+        with self._lock:
+            self._seq += 1
+            event.seq = self._seq
+            self._events.append(event)
+
+    def record(self, stage: str, duration: float = 0.0, **attributes: Any) -> MetricEvent:
+        """
+        イベントを記録
+
+        Args:
+            stage: ステージ名
+            duration: 所要時間（秒）
+            **attributes: chars_in, chars_out, bytes_in およびその他の属性
+
+        Returns:
+            MetricEvent: 記録したイベント
+        """
+        event = MetricEvent(stage=stage, duration=duration, timestamp=time.time())
+        event.set(**attributes)
+        self._append(event)
+        return event
+
+    @contextmanager
+    def timer(self, stage: str, **attributes: Any) -> Iterator[MetricEvent]:
+        """
+        処理時間を計測するコンテキストマネージャー
+
+        with metrics.timer('read_file', bytes_in=size) as event:
+            content = ...
+            event.set(chars_out=len(content))
+
+        Args:
+            stage: ステージ名
+            **attributes: 事前に分かっている属性
+
+        Yields:
+            MetricEvent: 処理中に属性を追加できるイベント
+        """
+        event = MetricEvent(stage=stage, timestamp=time.time())
+        event.set(**attributes)
+        start = time.perf_counter()
+        try:
+            yield event
+        except Exception:
+            event.attributes['error'] = 1
+            raise
+        finally:
+            event.duration = time.perf_counter() - start
+            self._append(event)
+
+    def increment(self, name: str, value: float = 1, **labels: str):
+        """
+        カウンターを加算（キャッシュヒット数など）
+
+        Args:
+            name: カウンター名
+            value: 加算する値
+            **labels: ラベル（stage など）
+        """
+        key = (name, tuple(sorted((k, str(v)) for k, v in labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def get_counter(self, name: str, **labels: str) -> float:
+        """
+        カウンターの値を取得
+
+        Args:
+            name: カウンター名
+            **labels: ラベル（指定しない場合は全ラベルの合計）
+
+        Returns:
+            float: カウンターの値
+        """
+        wanted = {k: str(v) for k, v in labels.items()}
+        total = 0
+        with self._lock:
+            for (counter_name, counter_labels), value in self._counters.items():
+                if counter_name != name:
+                    continue
+                if all(dict(counter_labels).get(k) == v for k, v in wanted.items()):
+                    total += value
+        return total
+
+    def events(self, stage: Optional[str] = None, prefix: Optional[str] = None) -> List[MetricEvent]:
+        """
+        記録済みイベントを取得
+
+        Args:
+            stage: ステージ名で絞り込み（完全一致）
+            prefix: ステージ名の接頭辞で絞り込み（例: "pii."）
+
+        Returns:
+            List[MetricEvent]: イベントのリスト（古い順）
+        """
+        with self._lock:
+            events = list(self._events)
+        if stage is not None:
+            events = [e for e in events if e.stage == stage]
+        if prefix is not None:
+            events = [e for e in events if e.stage.startswith(prefix)]
+        return events
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """
+        ステージごとの集計を取得
+
+        Returns:
+            Dict[str, Dict[str, float]]:
+                {ステージ名: {count, total_seconds, avg_seconds, max_seconds,
+                              chars_in, chars_out, bytes_in, その他の数値属性の合計}}
+        """
+        stats: Dict[str, Dict[str, float]] = {}
+        for event in self.events():
+            s = stats.setdefault(event.stage, {
+                'count': 0, 'total_seconds': 0.0, 'max_seconds': 0.0,
+                'chars_in': 0, 'chars_out': 0, 'bytes_in': 0,
+            })
+            s['count'] += 1
+            s['total_seconds'] += event.duration
+            s['max_seconds'] = max(s['max_seconds'], event.duration)
+            s['chars_in'] += event.chars_in
+            s['chars_out'] += event.chars_out
+            s['bytes_in'] += event.bytes_in
+            for key, value in event.attributes.items():
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    s[key] = s.get(key, 0) + value
+
+        for s in stats.values():
+            s['avg_seconds'] = s['total_seconds'] / s['count'] if s['count'] else 0.0
+
+        return stats
+
+    def get_summary_report(self) -> str:
+        """
+        所要時間の多い順にステージ別のレポートを生成
+
+        Returns:
+            str: レポート
+        """
+        stats = self.summary()
+        if not stats:
+            return "計測データはありません。"
+
+        report_lines = ["=== 処理時間の内訳 ==="]
+        for stage, s in sorted(stats.items(), key=lambda item: -item[1]['total_seconds']):
+            line = (
+                f"{stage}: {s['total_seconds']:.3f}秒 "
+                f"({int(s['count'])}回, 平均{s['avg_seconds']:.3f}秒, "
+                f"入力{int(s['chars_in'])}文字 → 出力{int(s['chars_out'])}文字)"
+            )
+            if 'input_tokens' in s or 'output_tokens' in s:
+                line += (
+                    f" トークン: 入力{int(s.get('input_tokens', 0))}"
+                    f" / 出力{int(s.get('output_tokens', 0))}"
+                )
+            report_lines.append(line)
+
+        with self._lock:
+            counters = dict(self._counters)
+        for (name, labels), value in sorted(counters.items()):
+            label_text = ", ".join(f"{k}={v}" for k, v in labels)
+            report_lines.append(f"{name}{f' ({label_text})' if label_text else ''}: {value:g}")
+
+        return "\n".join(report_lines)
+
+    def to_json_lines(self, since_seq: int = 0, until_seq: Optional[int] = None) -> str:
+        """
+        イベントとカウンターをJSON Lines形式で出力
+
+        Args:
+            since_seq: この通し番号より後のイベントのみ出力
+            until_seq: この通し番号までのイベントのみ出力（Noneの場合は最新まで）
+
+        Returns:
+            str: 1行1イベントのJSON文字列
+        """
+        lines = [
+            json.dumps({'type': 'event', **asdict(event)}, ensure_ascii=False)
+            for event in self.events()
+            if event.seq > since_seq and (until_seq is None or event.seq <= until_seq)
+        ]
+        with self._lock:
+            counters = dict(self._counters)
+        for (name, labels), value in sorted(counters.items()):
+            lines.append(json.dumps(
+                {'type': 'counter', 'name': name, 'labels': dict(labels), 'value': value},
+                ensure_ascii=False
+            ))
+        return "\n".join(lines) + ("\n" if lines else "")
+
+    def to_prometheus(self) -> str:
+        """
+        集計結果をPrometheusのテキスト形式で出力
+
+        Returns:
+            str: Prometheus exposition形式のテキスト
+        """
+        prefix = self.PROMETHEUS_PREFIX
+        stats = self.summary()
+        lines = [
+            f"# HELP {prefix}_stage_duration_seconds 処理ステージの所要時間",
+            f"# TYPE {prefix}_stage_duration_seconds summary",
+        ]
+        for stage, s in sorted(stats.items()):
+            label = f'{{stage="{_escape_label(stage)}"}}'
+            lines.append(f"{prefix}_stage_duration_seconds_count{label} {int(s['count'])}")
+            lines.append(f"{prefix}_stage_duration_seconds_sum{label} {s['total_seconds']:.6f}")
+
+        # 数値属性はステージごとの合計として出力
+        value_keys = sorted({
+            key for s in stats.values() for key in s
+            if key not in ('count', 'total_seconds', 'avg_seconds', 'max_seconds')
+        })
+        for key in value_keys:
+            metric = f"{prefix}_stage_{_sanitize_metric_name(key)}_total"
+            lines.append(f"# TYPE {metric} counter")
+            for stage, s in sorted(stats.items()):
+                if key in s:
+                    lines.append(f'{metric}{{stage="{_escape_label(stage)}"}} {s[key]:g}')
+
+        with self._lock:
+            counters = dict(self._counters)
+        for name in sorted({name for name, _ in counters}):
+            metric = f"{prefix}_{_sanitize_metric_name(name)}_total"
+            lines.append(f"# TYPE {metric} counter")
+            for (counter_name, labels), value in sorted(counters.items()):
+                if counter_name != name:
+                    continue
+                label_text = ",".join(f'{k}="{_escape_label(v)}"' for k, v in labels)
+                lines.append(f"{metric}{{{label_text}}} {value:g}" if label_text else f"{metric} {value:g}")
+
+        return "\n".join(lines) + "\n"
+
+    def export(self, path: Union[str, Path], fmt: str = 'jsonl') -> Path:
+        """
+        計測結果をファイルに出力
+
+        Args:
+            path: 出力先のパス
+            fmt: 出力形式（jsonl または prometheus）
+
+        Returns:
+            Path: 出力したファイルのパス
+
+        Raises:
+            ValueError: サポートされていない出力形式
+        """
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        if fmt == 'jsonl':
+            # JSON Linesは前回出力以降のイベントを追記していく
+            with self._lock:
+                since_seq, last_seq = self._exported_seq, self._seq
+                oldest_seq = self._events[0].seq if self._events else last_seq + 1
+            # 前回の出力から max_events 件を超えて記録された場合、古いイベントは出力前に破棄されている
+            dropped = max(0, min(oldest_seq, last_seq + 1) - since_seq - 1)
+            with open(path, 'a', encoding='utf-8') as f:
+                if dropped:
+                    print(f"⚠️  出力前に破棄された計測イベントがあります: {dropped}件")
+                    f.write(json.dumps(
+                        {'type': 'dropped', 'after_seq': since_seq, 'count': dropped}, ensure_ascii=False
+                    ) + "\n")
+                f.write(self.to_json_lines(since_seq=since_seq, until_seq=last_seq))
+            self._exported_seq = last_seq
+        elif fmt == 'prometheus':
+            # Prometheus形式は最新の集計で上書き
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(self.to_prometheus())
+        else:
+            raise ValueError(f"サポートされていない出力形式: {fmt}（jsonl または prometheus を指定してください）")
+
+        return path
+
+    def reset(self):
+        """記録済みのイベントとカウンターをすべて削除"""
+        with self._lock:
+            self._events.clear()
+            self._counters.clear()
+            self._exported_seq = self._seq
+
+
+def _sanitize_metric_name(name: str) -> str:
+    """Prometheusのメトリクス名として使える文字列に変換"""
+    return "".join(c if c.isascii() and (c.isalnum() or c == '_') else '_' for c in name)
+
+
+def _escape_label(value: str) -> str:
+    """Prometheusのラベル値をエスケープ"""
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+# 計測レジストリ（アプリ全体で共有）
+metrics = MetricsRegistry()
+
+
+if __name__ == "__main__":
+    # テスト用
+    with metrics.timer('read_file', bytes_in=2048, file_type='text') as event:
+        time.sleep(0.01)
+        event.set(chars_out=1000)
+
+    metrics.record('call_api', duration=1.5, chars_in=1200, chars_out=280,
+                   input_tokens=900, output_tokens=350)
+    metrics.increment('cache_hits', stage='mask')
+
+    print(metrics.get_summary_report())
+    print("\n=== JSON Lines ===")
+    print(metrics.to_json_lines())
+    print("=== Prometheus ===")
+    print(metrics.to_prometheus())
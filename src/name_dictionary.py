@@ -0,0 +1,271 @@
+"""
+氏名辞書モジュール
+日本人の姓・名の辞書（src/data/japanese_names.txt）をトライ木に読み込み、
+テキスト中の「姓＋名」の並びを検出します
+
+各位置から辿るのは辞書の最長の語の長さまでのため、テキストの長さに比例した時間で検出できます
+（正規表現のバックトラックは発生しません）
+"""
+
+import re
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+
+# 同梱の辞書ファイル
+DICTIONARY_PATH = Path(__file__).parent / 'data' / 'japanese_names.txt'
+
+# 氏名の直後に続いてもよい敬称
+HONORIFICS = ('様', 'さま', 'さん', '氏', '君', 'くん', 'ちゃん', '殿', '先生')
+
+# 姓と名の間の区切り（最大文字数）
+MAX_SEPARATOR_CHARS = 2
+_SEPARATORS = ' 　'
+
+_END = ''  # トライ木で語の終わりを表すキー
+
+
+def _is_kanji(char: str) -> bool:
+    return '一' <= char <= '龯' or char == '々'
+
+
+def _is_katakana(char: str) -> bool:
+    return 'ァ' <= char <= 'ヴ' or char == 'ー'
+
+
+def _is_hiragana(char: str) -> bool:
+    return 'ぁ' <= char <= 'ん'
+
+
+def _is_name_char(char: str) -> bool:
+    """氏名の一部になりうる文字（漢字・カタカナ）"""
+    return _is_kanji(char) or _is_katakana(char)
+
+
+class NameTrie:
+    """語の集合を保持するトライ木（1文字ごとの辞書を入れ子にしたもの）"""
+
+    def __init__(self, words: Iterable[str] = ()):
+        """
+        初期化
+
+        Args:
+            words: 登録する語
+        """
+        self.root: Dict[str, dict] = {}
+        self.max_length = 0
+        self._count = 0
+        for word in words:
+            self.add(word)
+
+    def add(self, word: str):
+        """語を登録"""
+        if not word:
+            return
+        node = self.root
+        for char in word:
+            node = node.setdefault(char, {})
+        if _END not in node:
+            node[_END] = True
+            self._count += 1
+        self.max_length = max(self.max_length, len(word))
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __contains__(self, word: str) -> bool:
+        node = self.root
+        for char in word:
+            node = node.get(char)
+            if node is None:
+                return False
+        return _END in node
+
+    def prefixes(self, text: str, pos: int) -> List[int]:
+        """
+        text[pos:] の先頭に一致する登録語の長さ（長い順）
+
+        Args:
+            text: テキスト
+            pos: 開始位置
+
+        Returns:
+            List[int]: 一致した語の長さ
+        """
+        lengths = []
+        node = self.root
+        end = min(len(text), pos + self.max_length)
+        for index in range(pos, end):
+            node = node.get(text[index])
+            if node is None:
+                break
+            if _END in node:
+                lengths.append(index - pos + 1)
+        lengths.reverse()
+        return lengths
+
+
+class NameDictionary:
+    """姓・名の辞書"""
+
+    _default: Optional['NameDictionary'] = None
+    _default_lock = threading.Lock()
+
+    def __init__(self, surnames: Iterable[str], given_names: Iterable[str]):
+        """
+        初期化
+
+        Args:
+            surnames: 姓
+            given_names: 名
+        """
+        self.surnames = NameTrie(surnames)
+        self.given_names = NameTrie(given_names)
+        self._start_patterns: Dict[int, Tuple[Optional[NameTrie], re.Pattern]] = {}
+
+    def _start_pattern(self, protected: Optional[NameTrie]) -> re.Pattern:
+        """
+        検出を始める位置（漢字・カタカナの連続の先頭で、姓か保護する語の先頭の文字）の正規表現
+
+        大半の位置をこの正規表現で読み飛ばすため、トライ木を辿る回数が少なくなります
+        """
+        cached = self._start_patterns.get(id(protected))
+        if cached is not None and cached[0] is protected:
+            return cached[1]
+
+        first_chars = set(self.surnames.root)
+        if protected is not None:
+            first_chars.update(protected.root)
+        first_chars.discard(_END)
+        pattern = re.compile(
+            r'(?<![一-龯々ァ-ヴー])[' + ''.join(re.escape(char) for char in sorted(first_chars)) + ']'
+        )
+        self._start_patterns[id(protected)] = (protected, pattern)
+        return pattern
+
+    @classmethod
+    def load(cls, path: Union[str, Path] = DICTIONARY_PATH) -> 'NameDictionary':
+        """
+        辞書ファイルを読み込む
+
+        1行に1件、「姓」または「名」と表記をタブ区切りで記載したファイルです
+        # で始まる行と空行は無視します
+
+        Args:
+            path: 辞書ファイル
+
+        Returns:
+            NameDictionary: 辞書
+
+        Raises:
+            Exception: 読み込みエラー
+        """
+        surnames = []
+        given_names = []
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                for line_number, line in enumerate(f, 1):
+                    line = line.strip()
+                    if not line or line.startswith('#'):
+                        continue
+                    kind, _, word = line.partition('\t')
+                    word = word.strip()
+                    if kind == '姓' and word:
+                        surnames.append(word)
+                    elif kind == '名' and word:
+                        given_names.append(word)
+                    else:
+                        print(f"⚠️  氏名辞書の{line_number}行目を読み込めません: {line}")
+        except OSError as e:
+            raise Exception(f"氏名辞書の読み込みエラー: {str(e)}")
+        return cls(surnames, given_names)
+
+    @classmethod
+    def default(cls) -> 'NameDictionary':
+        """同梱の辞書（初回のみ読み込み）"""
+        with cls._default_lock:
+            if cls._default is None:
+                cls._default = cls.load()
+            return cls._default
+
+    def _match_at(self, text: str, start: int) -> int:
+        """
+        start から始まる「姓＋名」の終了位置（一致しない場合は-1）
+
+        姓・名とも辞書の語に一致し、直後が漢字・カタカナでない（または敬称が続く）場合のみ一致とします
+        1文字の姓・名は誤検知が多いため、姓が1文字なら姓と名の間に区切りがある場合、
+        名が1文字ならひらがな（送り仮名の可能性）が続かない場合に限ります
+        """
+        length = len(text)
+        for surname_length in self.surnames.prefixes(text, start):
+            middle = start + surname_length
+            while middle < length and middle - start - surname_length < MAX_SEPARATOR_CHARS \
+                    and text[middle] in _SEPARATORS:
+                middle += 1
+
+            if surname_length == 1 and middle == start + 1:
+                continue  # 区切りのない1文字の姓（林、森など）は熟語の一部の可能性が高い
+
+            for given_length in self.given_names.prefixes(text, middle):
+                end = middle + given_length
+                if end == length:
+                    return end
+                if text.startswith(HONORIFICS, end):
+                    return end
+                if _is_name_char(text[end]):
+                    continue
+                if given_length == 1 and _is_hiragana(text[end]):
+                    continue
+                return end
+        return -1
+
+    def find_names(self, text: str, protected: Optional[NameTrie] = None) -> Iterator[Tuple[int, int]]:
+        """
+        テキスト中の「姓＋名」の位置を返す
+
+        漢字・カタカナの連続の先頭から始まるもののみを対象とし、熟語の途中からは検出しません
+        ただし、連続の先頭が保護する語（医療用語など、例: 患者・家族）の場合は、その直後からも検出します
+
+        Args:
+            text: テキスト
+            protected: 保護する語（氏名の一部とはみなさない）
+
+        Yields:
+            Tuple[int, int]: (開始位置, 終了位置)
+        """
+        position = 0
+        for run in self._start_pattern(protected).finditer(text):
+            if run.start() < position:
+                continue  # 直前に検出した氏名の途中
+
+            # 漢字・カタカナの連続の先頭
+            starts = [run.start()]
+            if protected is not None:
+                starts.extend(run.start() + term_length for term_length in protected.prefixes(text, run.start()))
+
+            for start in starts:
+                end = self._match_at(text, start)
+                if end != -1:
+                    yield start, end
+                    position = end
+                    break
+
+
+if __name__ == "__main__":
+    # テスト用
+    dictionary = NameDictionary.default()
+    print(f"姓: {len(dictionary.surnames)}件、名: {len(dictionary.given_names)}件")
+
+    protected = NameTrie(['患者', '家族', '母', '父'])
+    samples = [
+        "本日、山本太郎さんが来院された。",
+        "患者田中花子は昨日より発熱あり。",
+        "母佐藤恵子が付き添い。",
+        "紹介元：鈴木　一郎先生",
+        "森林浴、関節痛、原発性の所見あり。",
+        "小林明らかな異常なし。",
+    ]
+    for sample in samples:
+        names = [sample[start:end] for start, end in dictionary.find_names(sample, protected)]
+        print(f"{sample} → {names}")
@@ -0,0 +1,356 @@
+"""
+OCRノイズ除去モジュール
+画像・PDFから読み取ったテキストの、ページごとに繰り返されるヘッダー・フッター、
+行の折り返しで分かれた文、OCRの読み取りで生じた記号の連続を取り除き、要約に送る文字数を減らします
+
+テキストファイル（種別: text）は入力されたとおりの内容のため対象外です
+"""
+
+import re
+from dataclasses import dataclass, field
+from typing import Dict, List
+
+from src.metrics import metrics
+from src.text_stats import estimate_tokens
+
+
+# 対象とするファイル種別
+CLEANUP_FILE_TYPES = ('image', 'pdf')
+
+# ファイル見出し（FileReader.read_file_section の形式）
+_FILE_HEADER_PATTERN = re.compile(r'^={20,}\nファイル: (.+?) \(種別: (\w+)\)\n={20,}\n', re.MULTILINE)
+
+# ページ区切りの行
+_PAGE_MARKER_PATTERN = re.compile(r'^--- Page \d+ ---\n', re.MULTILINE)
+
+# ヘッダー・フッターの候補とするページの先頭・末尾の行数
+HEADER_FOOTER_LINES = 2
+
+# ヘッダー・フッターとみなす最小ページ数と、出現するページの割合
+MIN_PAGES = 3
+MIN_PAGE_RATIO = 0.5
+
+# ヘッダー・フッターとみなす行の最大文字数（長い行は本文として残す）
+MAX_HEADER_CHARS = 40
+
+# 記号の連続（文字・数字・空白と、医療文書で使う記号以外の3文字以上）
+_GARBAGE_RUN_PATTERN = re.compile(
+    r'[^\w\s、。，．・（）()「」『』【】［］\[\]：:/／％%℃～〜\-－ー+＋±×=＝<>＜＞≦≧↑↓→←'
+    r'○●◎△▲□■◇◆※*＊#＃&＆\'"’”?？!！;；,.]{3,}'
+)
+
+# 文字・数字を含まない短い行（縦線・下線の読み取りなど）
+_WORDLESS_PATTERN = re.compile(r'^[^\w]{1,5}$')
+
+# 比較時にヘッダー・フッターのページ番号・総ページ数と空白を無視する
+# （日付・検査値などのそれ以外の数字がページごとに異なる行は本文として残す）
+_DIGITS_PATTERN = re.compile(r'\d+')
+_PAGE_NUMBER_PATTERN = re.compile(r'--- Page (\d+) ---')
+_WHITESPACE_PATTERN = re.compile(r'\s+')
+
+# 文末とみなす文字（この文字で終わる行は次の行と結合しない）
+_SENTENCE_ENDS = frozenset('。．.!?！？」』）)：:')
+
+# 箇条書き・見出しとみなす行頭の文字（この文字で始まる行は前の行と結合しない）
+_LINE_STARTS = frozenset('・○●◎※■□◆◇【［[（(-－*＊#＃0123456789①②③④⑤⑥⑦⑧⑨⑩')
+
+# 結合する行の最小文字数（ページ内の最長行に対する割合）
+WRAP_WIDTH_RATIO = 0.7
+MIN_WRAP_CHARS = 20
+
+
+def _is_cjk(char: str) -> bool:
+    """日本語の文字（漢字・ひらがな・カタカナ）"""
+    return '぀' <= char <= 'ヿ' or '一' <= char <= '鿿' or char == '々'
+
+
+@dataclass
+class DocumentCleanup:
+    """1つのファイルのノイズ除去結果"""
+    name: str                  # ファイル名（マスク済み）
+    file_type: str             # ファイル種別
+    original_chars: int = 0
+    chars: int = 0
+    original_tokens: int = 0
+    tokens: int = 0
+    headers_removed: int = 0   # 取り除いたヘッダー・フッターの行数
+    lines_joined: int = 0      # 結合した行数
+    garbage_chars: int = 0     # 取り除いた記号の文字数
+
+    @property
+    def chars_saved(self) -> int:
+        """削減した文字数"""
+        return self.original_chars - self.chars
+
+    @property
+    def tokens_saved(self) -> int:
+        """削減したトークン数（見積もり）"""
+        return self.original_tokens - self.tokens
+
+
+@dataclass
+class OCRCleanupResult:
+    """ノイズ除去の結果"""
+    text: str  # ノイズを除いたテキスト
+    documents: List[DocumentCleanup] = field(default_factory=list)
+
+    @property
+    def chars_saved(self) -> int:
+        """削減した文字数"""
+        return sum(document.chars_saved for document in self.documents)
+
+    @property
+    def tokens_saved(self) -> int:
+        """削減したトークン数（見積もり）"""
+        return sum(document.tokens_saved for document in self.documents)
+
+    def get_summary_report(self) -> str:
+        """
+        ノイズ除去のサマリーレポートを生成（ファイルごと）
+
+        Returns:
+            str: サマリーレポート
+        """
+        if not self.documents:
+            return "OCRノイズの除去対象のファイルはありませんでした。"
+
+        lines = [f"削減: {self.chars_saved}文字 / 約{self.tokens_saved}トークン"]
+        for document in self.documents:
+            lines.append(
+                f"  - {document.name}: {document.original_chars}文字 → {document.chars}文字"
+                f"（約{document.tokens_saved}トークン削減、ヘッダー・フッター {document.headers_removed}行、"
+                f"結合 {document.lines_joined}行、記号 {document.garbage_chars}文字）"
+            )
+        return "\n".join(lines)
+
+
+@dataclass
+class _Page:
+    """ページ（区切り行と本文の行）"""
+    marker: str
+    lines: List[str]
+    trailing: str  # ページ末尾の改行（次のページ・ファイルとの間の空行）
+    document: DocumentCleanup
+    page_numbers: frozenset = frozenset()  # ページ番号・総ページ数とみなす数字
+
+
+class OCRCleaner:
+    """OCRノイズ除去クラス"""
+
+    def clean(self, text: str) -> OCRCleanupResult:
+        """
+        ノイズを除去（画像・PDFのファイルのみ）
+
+        ヘッダー・フッターは、画像・PDFのすべてのページ（画像は1ファイルを1ページ）で
+        先頭・末尾の行を比較し、ページ番号・総ページ数以外が同じ行が半数以上のページにあるものを取り除きます
+
+        Args:
+            text: FileReader で読み込んだテキスト（ファイル見出し付き）
+
+        Returns:
+            OCRCleanupResult: ノイズ除去の結果
+        """
+        with metrics.timer('ocr_cleanup', chars_in=len(text)) as event:
+            pieces, pages, documents = self._split(text)
+            repeated = self._find_headers_footers(pages)
+
+            for page in pages:
+                lines = self._remove_headers_footers(page, repeated)
+                lines = self._remove_garbage(page, lines)
+                page.lines = self._join_wrapped_lines(page, lines)
+
+            # ファイルごとの文字数・トークン数
+            result_pieces = []
+            for piece in pieces:
+                if isinstance(piece, str):
+                    result_pieces.append(piece)
+                    continue
+                document, document_pages, original = piece
+                body = "".join(page.marker + "\n".join(page.lines) + page.trailing for page in document_pages)
+                document.original_chars = len(original)
+                document.original_tokens = estimate_tokens(original)
+                document.chars = len(body)
+                document.tokens = estimate_tokens(body)
+                result_pieces.append(body)
+
+            result = OCRCleanupResult("".join(result_pieces), documents)
+            event.set(chars_out=len(result.text), documents=len(documents))
+
+        if result.chars_saved:
+            metrics.increment('ocr_chars_saved', result.chars_saved, stage='ocr_cleanup')
+        return result
+
+    def _split(self, text: str):
+        """
+        ファイル見出しとページ区切りで分割
+
+        Returns:
+            (部品のリスト（そのまま残す文字列、または (結果, ページ, 元の本文)）, 対象のページ, 対象のファイル)
+        """
+        pieces: list = []
+        pages: List[_Page] = []
+        documents: List[DocumentCleanup] = []
+
+        headers = list(_FILE_HEADER_PATTERN.finditer(text))
+        pieces.append(text[:headers[0].start()] if headers else text)
+        for index, header in enumerate(headers):
+            end = headers[index + 1].start() if index + 1 < len(headers) else len(text)
+            body = text[header.end():end]
+            pieces.append(header.group(0))
+
+            name, file_type = header.group(1), header.group(2)
+            if file_type not in CLEANUP_FILE_TYPES:
+                pieces.append(body)
+                continue
+
+            document = DocumentCleanup(name, file_type)
+            documents.append(document)
+            document_pages = []
+            markers = list(_PAGE_MARKER_PATTERN.finditer(body))
+            bounds = []
+            if not markers or markers[0].start() > 0:
+                # 区切り行の前の本文（画像は1ファイル全体）
+                bounds.append((0, markers[0].start() if markers else len(body), ""))
+            for marker_index, marker in enumerate(markers):
+                page_end = markers[marker_index + 1].start() if marker_index + 1 < len(markers) else len(body)
+                bounds.append((marker.end(), page_end, marker.group(0)))
+            for start, end, marker in bounds:
+                page_text = body[start:end]
+                content = page_text.rstrip("\n")
+                document_pages.append(_Page(marker, content.split("\n"), page_text[len(content):], document))
+            pages.extend(document_pages)
+            pieces.append((document, document_pages, body))
+
+        # ページ番号（ファイル内・全体での位置、PDFの区切り行の番号）と総ページ数
+        document_page_counts: Dict[int, int] = {}
+        for page in pages:
+            document_page_counts[id(page.document)] = document_page_counts.get(id(page.document), 0) + 1
+        document_positions: Dict[int, int] = {}
+        for index, page in enumerate(pages, 1):
+            position = document_positions.get(id(page.document), 0) + 1
+            document_positions[id(page.document)] = position
+            numbers = {index, position, len(pages), document_page_counts[id(page.document)]}
+            marker = _PAGE_NUMBER_PATTERN.match(page.marker)
+            if marker:
+                numbers.add(int(marker.group(1)))
+            page.page_numbers = frozenset(numbers)
+
+        return pieces, pages, documents
+
+    @staticmethod
+    def _line_key(page: _Page, line: str) -> str:
+        """ヘッダー・フッターの比較用（空白と、ページ番号・総ページ数の数字を無視）"""
+        return _DIGITS_PATTERN.sub(
+            lambda match: '#' if int(match.group(0)) in page.page_numbers else match.group(0),
+            _WHITESPACE_PATTERN.sub('', line)
+        )
+
+    @staticmethod
+    def _edge_indexes(lines: List[str]) -> List[int]:
+        """ページの先頭・末尾の空でない短い行の位置"""
+        non_empty = [index for index, line in enumerate(lines) if line.strip()]
+        edges = set(non_empty[:HEADER_FOOTER_LINES] + non_empty[-HEADER_FOOTER_LINES:])
+        return sorted(index for index in edges if len(lines[index].strip()) <= MAX_HEADER_CHARS)
+
+    def _find_headers_footers(self, pages: List[_Page]) -> set:
+        """複数のページの先頭・末尾に繰り返し現れる行（比較用の形）"""
+        if len(pages) < MIN_PAGES:
+            return set()
+        counts: Dict[str, int] = {}
+        for page in pages:
+            keys = {self._line_key(page, page.lines[index]) for index in self._edge_indexes(page.lines)}
+            for key in keys:
+                counts[key] = counts.get(key, 0) + 1
+        threshold = max(MIN_PAGES, len(pages) * MIN_PAGE_RATIO)
+        return {key for key, count in counts.items() if key and count >= threshold}
+
+    def _remove_headers_footers(self, page: _Page, repeated: set) -> List[str]:
+        if not repeated:
+            return page.lines
+        removed = {
+            index for index in self._edge_indexes(page.lines) if self._line_key(page, page.lines[index]) in repeated
+        }
+        lines = [line for index, line in enumerate(page.lines) if index not in removed]
+        if removed and not any(line.strip() for line in lines):
+            # 本文がすべて消える場合は、繰り返しではなく各ページの本文とみなして残す
+            return page.lines
+        page.document.headers_removed += len(removed)
+        return lines
+
+    @staticmethod
+    def _remove_garbage(page: _Page, lines: List[str]) -> List[str]:
+        """記号の連続と、文字・数字を含まない短い行を取り除く"""
+        cleaned = []
+        for line in lines:
+            stripped = line.strip()
+            if stripped and _WORDLESS_PATTERN.match(stripped) and stripped[0] not in _LINE_STARTS:
+                page.document.garbage_chars += len(line)
+                continue
+            new_line = _GARBAGE_RUN_PATTERN.sub('', line)
+            if len(new_line) != len(line):
+                page.document.garbage_chars += len(line) - len(new_line)
+                if not new_line.strip():
+                    continue
+            cleaned.append(new_line)
+        return cleaned
+
+    @staticmethod
+    def _join_wrapped_lines(page: _Page, lines: List[str]) -> List[str]:
+        """
+        折り返しで分かれた行を結合
+
+        ページ内の最長行に近い長さで、文末の記号がなく、次の行が箇条書き・見出しでない場合のみ結合します
+        """
+        width = max((len(line.strip()) for line in lines), default=0)
+        if width < MIN_WRAP_CHARS:
+            return lines
+        min_chars = width * WRAP_WIDTH_RATIO
+
+        joined: List[str] = []
+        for line in lines:
+            stripped = line.strip()
+            if joined and stripped and stripped[0] not in _LINE_STARTS:
+                previous = joined[-1].rstrip()
+                if (len(previous.strip()) >= min_chars
+                        and previous[-1] not in _SENTENCE_ENDS):
+                    if _is_cjk(previous[-1]) and _is_cjk(stripped[0]):
+                        joined[-1] = previous + stripped
+                        page.document.lines_joined += 1
+                        continue
+                    if previous[-1].isalpha() and stripped[0].isalpha() and previous[-1].isascii():
+                        joined[-1] = previous + " " + stripped
+                        page.document.lines_joined += 1
+                        continue
+            joined.append(line)
+        return joined
+
+
+if __name__ == "__main__":
+    # テスト用（OCR結果を模した3ページの画像・PDF）
+    header = f"{'=' * 60}\nファイル: scan_{{}}.png (種別: image)\n{'=' * 60}\n"
+    bodies = [
+        "2020年4月頃より幻聴と被害念慮が出現し、自宅で様子をみていたが症状が悪化した\n"
+        "ため、同年6月15日に当院を初診となった。初診時は不眠と食欲低下を認め、身体的\n"
+        "な異常所見はなかった。|¦~^ リスペリドンを開始した。\n・幻聴あり\n",
+        "7月以降は幻聴が軽減し、睡眠も改善した。外来では服薬を継続できており、家族\n"
+        "からも落ち着いて過ごしているとの報告があった。\n",
+        "9月に職場復帰を希望したため、短時間の勤務から再開することとした。~~^^\n",
+        "10月の時点で症状の再燃はない。\n・リスペリドン 2mg 継続\n",
+    ]
+    pages_text = []
+    for page, body in enumerate(bodies, 1):
+        pages_text.append(
+            header.format(page)
+            + "○○病院 精神科 診療録\n"
+            + f"2020年{page + 5}月1日\n"
+            + body
+            + "|\n"
+            + f"- {page} -\n"
+        )
+    pages_text.insert(0, f"{'=' * 60}\nファイル: memo.txt (種別: text)\n{'=' * 60}\n○○病院 精神科 診療録\n- 1 -\n")
+    text = "\n".join(pages_text)
+
+    result = OCRCleaner().clean(text)
+    print(result.text)
+    print("\n=== OCRノイズ除去 ===")
+    print(result.get_summary_report())
@@ -0,0 +1,184 @@
+"""
+ページ分割文書モジュール
+確認画面で長いテキストを表示範囲のページだけ描画できるよう、文書をページ単位で保持します
+各ページの編集内容は元の文書全体に反映されます
+"""
+
+from bisect import bisect_right
+from typing import List, Optional, Tuple
+
+from src.text_segments import split_segments
+
+
+# 1ページの目安文字数
+PAGE_CHARS = 8000
+
+
+def paginate(text: str, page_chars: int = PAGE_CHARS) -> List[str]:
+    """
+    テキストをページに分割（段落・ページ・ファイルの区切りで分割）
+
+    Args:
+        text: 分割するテキスト
+        page_chars: 1ページの目安文字数
+
+    Returns:
+        List[str]: ページのリスト（連結すると元のテキストに戻る）
+    """
+    pages: List[str] = []
+    current: List[str] = []
+    current_len = 0
+
+    for segment in split_segments(text, max_chars=page_chars):
+        # ファイル区切りで始まるセグメントは、ページがある程度埋まっていれば新しいページにする
+        starts_new_file = segment.startswith('=' * 20)
+        if current and (
+            current_len + len(segment) > page_chars
+            or (starts_new_file and current_len >= page_chars // 2)
+        ):
+            pages.append("".join(current))
+            current, current_len = [], 0
+        current.append(segment)
+        current_len += len(segment)
+
+    if current or not pages:
+        pages.append("".join(current))
+
+    return pages
+
+
+class PagedDocument:
+    """ページ分割文書クラス"""
+
+    def __init__(self, text: str, page_chars: int = PAGE_CHARS):
+        """
+        初期化
+
+        Args:
+            text: 文書全体のテキスト
+            page_chars: 1ページの目安文字数
+        """
+        self.page_chars = page_chars
+        self._pages: List[str] = []
+        self._text: Optional[str] = None       # 連結済みテキストのキャッシュ
+        self._offsets: Optional[List[int]] = None  # 各ページの開始位置のキャッシュ
+        self.set_text(text)
+
+    @property
+    def text(self) -> str:
+        """文書全体のテキスト（編集内容を反映）"""
+        if self._text is None:
+            self._text = "".join(self._pages)
+        return self._text
+
+    @property
+    def page_count(self) -> int:
+        """ページ数"""
+        return len(self._pages)
+
+    def set_text(self, text: str):
+        """
+        文書全体を置き換えてページを分割し直す
+
+        Args:
+            text: 新しいテキスト
+        """
+        self._pages = paginate(text, self.page_chars)
+        self._text = text
+        self._offsets = None
+
+    def get_page(self, index: int) -> str:
+        """
+        ページの内容を取得
+
+        Args:
+            index: ページ番号（0始まり）
+
+        Returns:
+            str: ページの内容
+        """
+        return self._pages[index]
+
+    def set_page(self, index: int, page_text: str):
+        """
+        ページの内容を更新（確認画面での編集を文書に反映）
+
+        Args:
+            index: ページ番号（0始まり）
+            page_text: 編集後のページの内容
+        """
+        if self._pages[index] == page_text:
+            return
+        self._pages[index] = page_text
+        self._text = None
+        self._offsets = None
+
+    def page_start(self, index: int) -> int:
+        """
+        ページの開始位置（文書全体での文字位置）
+
+        Args:
+            index: ページ番号（0始まり）
+
+        Returns:
+            int: 開始位置
+        """
+        return self._ensure_offsets()[index]
+
+    def locate(self, position: int) -> Tuple[int, int]:
+        """
+        文書全体での文字位置をページとページ内の位置に変換
+
+        Args:
+            position: 文書全体での文字位置
+
+        Returns:
+            Tuple[int, int]: (ページ番号, ページ内の位置)
+        """
+        offsets = self._ensure_offsets()
+        index = max(0, min(bisect_right(offsets, position) - 1, len(self._pages) - 1))
+        return index, position - offsets[index]
+
+    def replace_range(self, start: int, end: int, replacement: str = ""):
+        """
+        文書全体での範囲を置換（1ページ内に収まる場合はそのページだけ更新）
+
+        Args:
+            start: 開始位置
+            end: 終了位置
+            replacement: 置換後の文字列
+        """
+        page_index, local_start = self.locate(start)
+        page = self._pages[page_index]
+        local_end = local_start + (end - start)
+        if local_end <= len(page):
+            self.set_page(page_index, page[:local_start] + replacement + page[local_end:])
+        else:
+            text = self.text
+            self.set_text(text[:start] + replacement + text[end:])
+
+    def _ensure_offsets(self) -> List[int]:
+        """各ページの開始位置を計算"""
+        if self._offsets is None:
+            offsets = []
+            total = 0
+            for page in self._pages:
+                offsets.append(total)
+                total += len(page)
+            self._offsets = offsets
+        return self._offsets
+
+
+if __name__ == "__main__":
+    # テスト用
+    with open("tests/sample_medical_record.txt", encoding="utf-8") as f:
+        sample = f.read()
+    document = PagedDocument("\n\n".join([sample] * 200))
+    print(f"全体: {len(document.text)}文字 / {document.page_count}ページ")
+
+    position = document.text.find("リスペリドン", 100000)
+    page_index, local = document.locate(position)
+    print(f"位置{position} → {page_index + 1}ページ目の{local}文字目")
+
+    document.replace_range(position, position + len("リスペリドン"), "")
+    print(f"削除後: {len(document.text)}文字")
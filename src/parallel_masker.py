@@ -0,0 +1,249 @@
+"""
+並列マスキングモジュール
+長い文書を安全な区切り（ファイル区切り・ページ区切り・空行）で分割し、
+複数のプロセスで個人情報削除を行います（結果は1つのプロセスで処理した場合と同じです）
+"""
+
+import copy
+import os
+import re
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from src.metrics import metrics
+from src.pii_remover import DetectorStats, PIIRemover, PIISpan, apply_spans
+from src.text_segments import split_segments
+
+
+# これより短い文書は分割せずに処理する（プロセス起動・データ転送の方が遅い）
+PARALLEL_MIN_CHARS = 200_000
+
+# 1つのプロセスに渡すテキストの最小文字数
+MIN_CHUNK_CHARS = 50_000
+
+_NON_SPACE_PATTERN = re.compile(r'\S')
+
+_executor: Optional[ProcessPoolExecutor] = None
+_executor_workers = 0
+_executor_lock = threading.Lock()
+
+
+def _get_executor(workers: int) -> ProcessPoolExecutor:
+    """プロセスプールを取得（同じ数のプロセスで使い回す）"""
+    global _executor, _executor_workers
+    with _executor_lock:
+        if _executor is None or _executor_workers != workers:
+            if _executor is not None:
+                _executor.shutdown(wait=False)
+            _executor = ProcessPoolExecutor(max_workers=workers)
+            _executor_workers = workers
+        return _executor
+
+
+def _mask_chunk(args: Tuple[PIIRemover, str]) -> Tuple[str, List[PIISpan], List[DetectorStats]]:
+    """
+    プロセス内で1つの区間の個人情報を削除
+
+    置換ログを文書の順に並べ直せるよう、まとめて置換された検出も含めてすべての検出結果を返します
+    """
+    remover, chunk = args
+    spans = remover.detect(chunk)
+    return apply_spans(chunk, spans), spans, remover.detector_stats
+
+
+def _left_context(text: str) -> str:
+    """区切りの前側で、区切りをまたいで一致しうる部分（最後の空白でない行以降）"""
+    last = len(text.rstrip())
+    return text[text.rfind('\n', 0, last) + 1:]
+
+
+def _right_context(text: str) -> str:
+    """区切りの後側で、区切りをまたいで一致しうる部分（最初の空白でない行まで）"""
+    match = _NON_SPACE_PATTERN.search(text)
+    if match is None:
+        return text
+    end = text.find('\n', match.start())
+    return text if end == -1 else text[:end + 1]
+
+
+class ParallelMasker:
+    """並列マスキングクラス"""
+
+    def __init__(self, remover: Optional[PIIRemover] = None, workers: Optional[int] = None):
+        """
+        初期化
+
+        Args:
+            remover: 使用するPIIRemover（Noneの場合は新規作成、各プロセスに複製して使用）
+            workers: プロセス数（Noneの場合は設定に従う、0はCPU数、1は並列化しない）
+        """
+        if workers is None:
+            from src.config import config
+            workers = config.MASK_WORKERS
+        self.remover = remover or PIIRemover()
+        self.workers = workers or os.cpu_count() or 1
+
+    def seam_is_safe(self, left: str, right: str) -> bool:
+        """
+        2つの区間を別々にマスクしても、続けてマスクした場合と同じ結果になるか確認
+
+        住所・生年月日などの「ラベル：値」のパターンは空行をまたいで一致することがあるため、
+        区切りの前後の行だけを取り出して、分けた場合と続けた場合の結果を比較します
+
+        Args:
+            left: 区切りの前の区間
+            right: 区切りの後の区間
+
+        Returns:
+            bool: 区切りで分割してよい場合True
+        """
+        left_context = _left_context(left)
+        right_context = _right_context(right)
+        remover = copy.copy(self.remover)  # 置換ログを上書きしないよう複製して使用
+        remover.vault = None  # 確認用の置換で仮名化の番号を割り当てない
+        joined, _ = remover.clean_text(left_context + right_context)
+        separate = remover.clean_text(left_context)[0] + remover.clean_text(right_context)[0]
+        return joined == separate
+
+    def split_chunks(self, text: str, chunk_chars: int) -> List[str]:
+        """
+        テキストをプロセスに渡す区間に分割
+
+        段落・ページ・ファイルの区切りのうち、前後を別々にマスクしても結果が変わらない
+        区切りでのみ分割します（''.join(chunks) == text）
+
+        Args:
+            text: テキスト
+            chunk_chars: 1区間のおおよその文字数
+
+        Returns:
+            List[str]: 区間のリスト
+        """
+        chunks: List[str] = []
+        current: List[str] = []
+        current_chars = 0
+        for segment in split_segments(text):
+            if current_chars >= chunk_chars and self.seam_is_safe(current[-1], segment):
+                chunks.append("".join(current))
+                current, current_chars = [], 0
+            current.append(segment)
+            current_chars += len(segment)
+        if current:
+            chunks.append("".join(current))
+        return chunks
+
+    def clean_text(self, text: str) -> Tuple[str, List[Tuple[str, str]]]:
+        """
+        すべての個人情報を削除（長い文書は複数のプロセスで処理）
+
+        分割して処理した場合、置換ログは検出位置の順（文書の順）に並べ、remover.replacement_log にも設定します
+        検出位置は文書全体での位置に直して remover.spans に、
+        検出処理ごとの処理時間（各プロセスの合計）・件数は remover.detector_stats に設定します
+        仮名化する場合、各プロセスでは検出だけを使い、番号付きの記号は文書全体での出現順に
+        このプロセスで割り当てて置換します（1つのプロセスで処理した場合と同じ番号になります）
+
+        Args:
+            text: 元のテキスト
+
+        Returns:
+            Tuple[str, List[Tuple[str, str]]]:
+                (個人情報を削除したテキスト, 置換ログ)
+        """
+        if self.workers <= 1 or len(text) < PARALLEL_MIN_CHARS:
+            return self.remover.clean_text(text)
+
+        chunk_chars = max(MIN_CHUNK_CHARS, len(text) // (self.workers * 4))
+        with metrics.timer('pii.parallel', chars_in=len(text), workers=self.workers) as event:
+            chunks = self.split_chunks(text, chunk_chars)
+            if len(chunks) <= 1:
+                return self.remover.clean_text(text)
+
+            worker_remover = self.remover
+            if self.remover.vault is not None:
+                worker_remover = copy.copy(self.remover)
+                worker_remover.vault = None
+
+            try:
+                results = list(_get_executor(self.workers).map(
+                    _mask_chunk, [(worker_remover, chunk) for chunk in chunks]
+                ))
+            except Exception as e:
+                # プロセスを起動できない環境では1つのプロセスで処理
+                print(f"⚠️  並列処理に失敗したため、1つのプロセスで処理します: {e}")
+                return self.remover.clean_text(text)
+
+            result = "".join(masked for masked, _, _ in results)
+
+            # 検出位置を文書全体での位置に直す
+            spans = []
+            offset = masked_offset = 0
+            for chunk, (masked, chunk_spans, _) in zip(chunks, results):
+                for span in chunk_spans:
+                    span.start += offset
+                    span.end += offset
+                    if not span.absorbed:
+                        span.masked_start += masked_offset
+                        span.masked_end += masked_offset
+                    spans.append(span)
+                offset += len(chunk)
+                masked_offset += len(masked)
+
+            # 置換ログは検出位置の順（同じ位置では検出した順）
+            spans.sort(key=lambda s: s.start)
+            log = [(span.category, span.value) for span in spans]
+            event.set(chars_out=len(result), chunks=len(chunks), matches=len(log))
+
+        if self.remover.vault is not None:
+            self.remover.vault.pseudonymize(spans)
+            result = apply_spans(text, spans)
+
+        # 検出処理ごとの処理時間・件数は各プロセスの合計
+        detector_stats: Dict[str, DetectorStats] = {}
+        for _, _, chunk_stats in results:
+            for stats in chunk_stats:
+                total = detector_stats.setdefault(stats.name, DetectorStats(stats.name, stats.label))
+                total.seconds += stats.seconds
+                total.matches += stats.matches
+
+        self.remover.replacement_log = log
+        self.remover.spans = [span for span in spans if not span.absorbed]
+        self.remover.detector_stats = list(detector_stats.values())
+        return result, log
+
+
+if __name__ == "__main__":
+    # テスト用
+    import time
+
+    with open("tests/sample_medical_record.txt", encoding="utf-8") as f:
+        original = f.read()
+
+    # ラベルと値の間に空行がある記載（区切りをまたぐ一致）を含む長い文書
+    pieces = []
+    for i in range(2000):
+        pieces.append(f"{'=' * 60}\nファイル: record_{i}.txt (種別: text)\n{'=' * 60}\n")
+        pieces.append(original if i % 3 else original.replace("住所：", "住所：\n\n"))
+        pieces.append(f"\n--- Page {i + 1} ---\n生年月日：\n\n1980年{i % 12 + 1}月{i % 28 + 1}日\n\n")
+    document = "".join(pieces)
+
+    start = time.perf_counter()
+    sequential, sequential_log = PIIRemover().clean_text(document)
+    print(f"1プロセス: {time.perf_counter() - start:.2f}秒 ({len(document)}文字)")
+
+    masker = ParallelMasker()
+    start = time.perf_counter()
+    parallel, parallel_log = masker.clean_text(document)
+    print(f"{masker.workers}プロセス: {time.perf_counter() - start:.2f}秒")
+
+    print(f"結果が一致: {parallel == sequential}")
+    document_order = sorted(PIIRemover().detect(document), key=lambda s: s.start)
+    print(f"置換ログが文書の順: {parallel_log == [(s.category, s.value) for s in document_order]}")
+    print(f"検出位置が一致: {all(document[s.start:s.end] == s.value for s in masker.remover.spans)}")
+
+    # 仮名化（番号は1つのプロセスで処理した場合と同じ）
+    from src.pseudonym_vault import PseudonymVault
+
+    sequential, _ = PIIRemover(vault=PseudonymVault()).clean_text(document)
+    parallel, _ = ParallelMasker(PIIRemover(vault=PseudonymVault())).clean_text(document)
+    print(f"仮名化の結果が一致: {parallel == sequential}")
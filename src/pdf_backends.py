@@ -0,0 +1,210 @@
+"""
+PDFテキスト抽出エンジンモジュール
+PDFからのテキスト抽出方法を切り替えられるようにします
+- pdfium: pypdfium2（高速・日本語の縦書きにも比較的強い）
+- pdfminer: pdfminer.six（レイアウト解析あり・低速）
+- pypdf2: PyPDF2（追加のライブラリ不要・フォールバック用）
+
+いずれのエンジンも1ページずつ読み込み、文書全体のテキストを一度に保持しません
+"""
+
+import threading
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Union
+
+import PyPDF2
+
+# 任意のライブラリ（インストールされていない場合はPyPDF2を使用）
+try:
+    import pypdfium2 as pdfium
+    PDFIUM_AVAILABLE = True
+except ImportError:
+    PDFIUM_AVAILABLE = False
+
+try:
+    from pdfminer.high_level import extract_pages
+    from pdfminer.layout import LAParams, LTTextContainer
+    PDFMINER_AVAILABLE = True
+except ImportError:
+    PDFMINER_AVAILABLE = False
+
+
+# 自動選択時の優先順位
+AUTO_ORDER = ('pdfium', 'pypdf2')
+
+
+class PdfBackend(ABC):
+    """PDFテキスト抽出エンジンの基底クラス"""
+
+    name = ''
+    available = True
+
+    @abstractmethod
+    def iter_pages(self, file_path: Union[str, Path]) -> Iterator[str]:
+        """
+        ページごとのテキストを順に返す
+
+        Args:
+            file_path: PDFファイルのパス
+
+        Yields:
+            str: ページのテキスト（改行は \\n に統一）
+        """
+
+    def page_count(self, file_path: Union[str, Path]) -> int:
+        """
+        ページ数を取得（テキストは抽出しない）
+
+        Args:
+            file_path: PDFファイルのパス
+
+        Returns:
+            int: ページ数
+        """
+        with open(file_path, 'rb') as f:
+            return len(PyPDF2.PdfReader(f).pages)
+
+
+class PyPDF2Backend(PdfBackend):
+    """PyPDF2によるテキスト抽出"""
+
+    name = 'pypdf2'
+
+    def iter_pages(self, file_path: Union[str, Path]) -> Iterator[str]:
+        with open(file_path, 'rb') as f:
+            pdf_reader = PyPDF2.PdfReader(f)
+            for page in pdf_reader.pages:
+                yield page.extract_text() or ""
+
+
+class PdfiumBackend(PdfBackend):
+    """pypdfium2（PDFium）によるテキスト抽出"""
+
+    name = 'pdfium'
+    available = PDFIUM_AVAILABLE
+
+    # PDFiumはスレッドセーフではないため、呼び出しを直列化する
+    _lock = threading.Lock()
+
+    def iter_pages(self, file_path: Union[str, Path]) -> Iterator[str]:
+        with self._lock:
+            document = pdfium.PdfDocument(str(file_path))
+            pages = len(document)
+        try:
+            for index in range(pages):
+                with self._lock:
+                    page = document[index]
+                    text_page = page.get_textpage()
+                    try:
+                        text = text_page.get_text_range()
+                    finally:
+                        text_page.close()
+                        page.close()
+                yield text.replace('\r\n', '\n').replace('\r', '\n')
+        finally:
+            with self._lock:
+                document.close()
+
+    def page_count(self, file_path: Union[str, Path]) -> int:
+        with self._lock:
+            document = pdfium.PdfDocument(str(file_path))
+            try:
+                return len(document)
+            finally:
+                document.close()
+
+
+class PdfMinerBackend(PdfBackend):
+    """pdfminer.sixによるテキスト抽出（縦書きの検出あり）"""
+
+    name = 'pdfminer'
+    available = PDFMINER_AVAILABLE
+
+    def iter_pages(self, file_path: Union[str, Path]) -> Iterator[str]:
+        params = LAParams(detect_vertical=True)
+        for layout in extract_pages(str(file_path), laparams=params):
+            yield "".join(
+                element.get_text() for element in layout if isinstance(element, LTTextContainer)
+            )
+
+
+BACKENDS: Dict[str, PdfBackend] = {
+    backend.name: backend
+    for backend in (PdfiumBackend(), PdfMinerBackend(), PyPDF2Backend())
+}
+
+
+def available_backends() -> List[str]:
+    """使用できるエンジン名の一覧"""
+    return [name for name, backend in BACKENDS.items() if backend.available]
+
+
+def get_pdf_backend(name: Optional[str] = None) -> PdfBackend:
+    """
+    PDFテキスト抽出エンジンを取得
+
+    Args:
+        name: エンジン名（pdfium / pdfminer / pypdf2 / auto、Noneの場合は設定に従う）
+
+    Returns:
+        PdfBackend: エンジン（指定したものが使えない場合はPyPDF2）
+    """
+    if name is None:
+        from src.config import config
+        name = config.PDF_BACKEND
+
+    if name in (None, '', 'auto'):
+        for candidate in AUTO_ORDER:
+            if BACKENDS[candidate].available:
+                return BACKENDS[candidate]
+
+    backend = BACKENDS.get(name)
+    if backend is None or not backend.available:
+        print(f"⚠️  PDFエンジン「{name}」は使用できないため、PyPDF2を使用します")
+        return BACKENDS['pypdf2']
+    return backend
+
+
+def benchmark(paths: List[Union[str, Path]], repeat: int = 3) -> Dict[str, float]:
+    """
+    エンジンごとの処理速度（ページ/秒）を計測
+
+    Args:
+        paths: 計測に使うPDFファイル
+        repeat: 繰り返し回数（最も速い結果を採用）
+
+    Returns:
+        Dict[str, float]: エンジン名 -> ページ/秒
+    """
+    import time
+
+    results = {}
+    for name in available_backends():
+        backend = BACKENDS[name]
+        best = None
+        pages = 0
+        for _ in range(repeat):
+            start = time.perf_counter()
+            pages = sum(1 for path in paths for _ in backend.iter_pages(path))
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        results[name] = pages / best if best else 0.0
+    return results
+
+
+if __name__ == "__main__":
+    # テスト用（python -m src.pdf_backends ファイル.pdf ... でエンジンを比較）
+    import sys
+
+    print(f"使用できるエンジン: {available_backends()}")
+    pdf_paths = sys.argv[1:]
+    if not pdf_paths:
+        print("使い方: python -m src.pdf_backends ファイル.pdf [ファイル.pdf ...]")
+        sys.exit(0)
+
+    for name, pages_per_sec in benchmark(pdf_paths).items():
+        print(f"{name}: {pages_per_sec:.1f}ページ/秒")
+
+    first_page = next(get_pdf_backend().iter_pages(pdf_paths[0]), "")
+    print(f"\n--- 1ページ目（{get_pdf_backend().name}） ---\n{first_page[:500]}")
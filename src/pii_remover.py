@@ -1,10 +1,344 @@
 """
 個人情報削除モジュール
 医療文書から個人情報（氏名、生年月日、住所、電話番号など）を削除します
+
+各パターンは元のテキスト上の位置（PIISpan）を返し、優先順位の高いパターンから順に、
+採用済みの位置と重ならない部分だけを検出します。置換は最後に1回だけ行い、
+検出した位置（元のテキストと置換後のテキストでの位置）は PIIRemover.spans に残ります
 """
 
+import bisect
 import re
-from typing import List, Tuple, Dict
+import sys
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from src.metrics import metrics
+from src.name_dictionary import NameDictionary, NameTrie
+from src.profiler import profiled
+from src.pseudonym_vault import PseudonymVault
+
+
+@dataclass
+class PIISpan:
+    """検出した個人情報の位置"""
+    start: int              # 元のテキストでの開始位置
+    end: int                # 元のテキストでの終了位置
+    category: str           # 種別（氏名、生年月日、住所など）
+    replacement: str        # 置換後の文字列
+    value: str = ""         # 元の文字列（置換ログに記録する値）
+    confidence: float = 1.0  # 確からしさ（0〜1）
+    priority: int = 0       # 重なった場合の優先順位（小さいほど優先）
+    masked_start: int = -1  # 置換後のテキストでの開始位置（置換後に設定）
+    masked_end: int = -1    # 置換後のテキストでの終了位置（置換後に設定）
+    absorbed: bool = False  # 外側の検出にまとめて置換された
+
+
+@dataclass
+class PIIPattern:
+    """個人情報の検出パターン"""
+    pattern: str            # 正規表現
+    category: str           # 種別
+    replacement: str        # 置換後の文字列
+    confidence: float = 1.0  # 確からしさ
+    accept: Optional[Callable[[re.Match], bool]] = None  # 一致を採用するか判定する関数
+    group: int = 0          # 置換するグループ（0以外は前後の空白を除いた部分を置換）
+    absorbs: Tuple[str, ...] = ()  # 内側に含めて一緒に置換できる種別（行全体を置換するパターン）
+    blocked_by: Tuple[str, ...] = ()  # 一致の中に含まれる場合は置換しない種別
+    anchors: Tuple[str, ...] = ()  # 事前チェック: 一致には少なくとも1つを含む文字列（生年月日、住所、〒など）
+    charset: str = ''       # 事前チェック: 一致に必ず含まれる文字の正規表現（数字の r'\d' など）
+
+    def __post_init__(self):
+        self.regex = re.compile(self.pattern)
+        # 単語境界で始まるパターンは、置換済みの位置の直後も単語境界とみなす（置換後の文字列は記号で終わるため）
+        self._gap_regex = re.compile(self.pattern[2:]) if self.pattern.startswith(r'\b') else None
+        self._charset_regex = re.compile(self.charset) if self.charset else None
+
+    def may_match(self, text: str, checks: Dict[object, bool]) -> bool:
+        """
+        一致する可能性があるか（事前チェック）
+
+        正規表現で全体を検索する前に、必要な文字・文字列がテキストに含まれるかだけを確認します
+        同じ確認は複数のパターンで共通のため、結果は checks に保存して使い回します
+
+        Args:
+            text: 元のテキスト
+            checks: 確認結果（確認内容 → 結果）
+
+        Returns:
+            bool: 一致する可能性がある場合True（Falseの場合は検索を省略できる）
+        """
+        if self.anchors:
+            found = checks.get(self.anchors)
+            if found is None:
+                found = checks[self.anchors] = any(anchor in text for anchor in self.anchors)
+            if not found:
+                return False
+        if self._charset_regex is not None:
+            found = checks.get(self.charset)
+            if found is None:
+                found = checks[self.charset] = self._charset_regex.search(text) is not None
+            if not found:
+                return False
+        return True
+
+    def _context_matches(self, text: str) -> Iterator[re.Match]:
+        """テキスト全体で一致を順に返す（行全体を置換するパターン・前後の文脈で判定するパターン）"""
+        if not self.group:
+            yield from self.regex.finditer(text)
+            return
+
+        # 前後の文脈（区切りの _ など）は次の一致と共有できるよう、置換する部分の直後から続けて検索
+        pos = 0
+        while True:
+            match = self.regex.search(text, pos)
+            if match is None:
+                return
+            yield match
+            pos = max(match.end(self.group), match.start() + 1)
+
+    def _gap_matches(self, text: str, span_set: '_SpanSet') -> Iterator[re.Match]:
+        """採用済みの位置の間の範囲だけで一致を順に返す（採用済みの位置にかかる一致はその手前で探し直す）"""
+        if self._gap_regex is not None:
+            # 単語境界で始まるパターンは、置換済みの位置の直後から始まる一致もあるため範囲ごとに検索
+            for gap_start, gap_end in span_set.gaps(len(text)):
+                pos = gap_start
+                if gap_start > 0:
+                    match = self._gap_regex.match(text, gap_start, gap_end)
+                    if match is not None:
+                        yield match
+                        pos = match.end()
+                yield from self.regex.finditer(text, pos, gap_end)
+            return
+
+        pos = 0
+        while True:
+            match = self.regex.search(text, pos)
+            if match is None:
+                return
+            gap_start, gap_end = span_set.gap_at(match.start())
+            if gap_start > match.start():
+                # 採用済みの位置の中から始まる一致は使わず、その直後から探し直す
+                pos = gap_start
+                continue
+            if match.end() > gap_end:
+                match = self.regex.search(text, match.start(), gap_end)
+                if match is None:
+                    pos = gap_end
+                    continue
+            yield match
+            pos = max(match.end(), match.start() + 1)
+
+    def find(self, text: str, span_set: '_SpanSet', priority: int) -> Iterator[PIISpan]:
+        """
+        採用済みの位置と重ならない一致を返す
+
+        一致全体を置換するパターンは採用済みの位置の間の範囲だけを検索するため、
+        先に検出された個人情報の続きに一致することはありません
+
+        Args:
+            text: 元のテキスト
+            span_set: 採用済みの検出結果
+            priority: 検出結果に設定する優先順位
+
+        Yields:
+            PIISpan: 検出結果
+        """
+        if self.absorbs or self.group:
+            matches = self._context_matches(text)
+        else:
+            matches = self._gap_matches(text, span_set)
+
+        for match in matches:
+            if self.accept is not None and not self.accept(match):
+                continue
+            if self.group:
+                raw = match.group(self.group)
+                value = raw.strip()
+                start = match.start(self.group) + raw.find(value)
+                end = start + len(value)
+            else:
+                value = match.group(0)
+                start, end = match.start(), match.end()
+            yield PIISpan(
+                start, end, self.category, self.replacement,
+                value=value, confidence=self.confidence, priority=priority,
+            )
+
+
+@dataclass
+class NameDictionaryPattern(PIIPattern):
+    """氏名辞書による検出パターン（正規表現の代わりに姓・名の辞書で「姓＋名」を検出）"""
+    dictionary: Optional[NameDictionary] = None  # 姓・名の辞書（Noneの場合は同梱の辞書）
+    protected: Tuple[str, ...] = ()  # 氏名の一部とみなさない語（医療用語など）
+
+    def __post_init__(self):
+        if self.dictionary is None:
+            self.dictionary = NameDictionary.default()
+        self._protected = NameTrie(self.protected)
+        self._charset_regex = re.compile(self.charset) if self.charset else None
+
+    def find(self, text: str, span_set: '_SpanSet', priority: int) -> Iterator[PIISpan]:
+        """
+        辞書の「姓＋名」に一致する位置を返す
+
+        Args:
+            text: 元のテキスト
+            span_set: 採用済みの検出結果（重なりは採用時に判定）
+            priority: 検出結果に設定する優先順位
+
+        Yields:
+            PIISpan: 検出結果
+        """
+        for start, end in self.dictionary.find_names(text, self._protected):
+            value = text[start:end]
+            if any(term in value for term in self.protected):
+                continue
+            yield PIISpan(
+                start, end, self.category, self.replacement,
+                value=value, confidence=self.confidence, priority=priority,
+            )
+
+
+@dataclass
+class PIIDetector:
+    """個人情報の検出処理（PIIRemover.register_detector で登録）"""
+    name: str       # 検出処理名（プリセットの disabled_pii_detectors で指定する名前）
+    label: str      # 表示名
+    priority: int   # 優先順位（小さいほど先に検出し、重なった場合に優先）
+    patterns: Callable[[], List[PIIPattern]]  # 検出パターンを作成する関数
+    compiled: Optional[List[PIIPattern]] = field(default=None, repr=False, compare=False)  # 作成済みのパターン
+
+    def __getstate__(self):
+        # 並列処理のプロセスに渡す際は、コンパイル済みのパターンを除く（プロセス内で作り直す）
+        state = self.__dict__.copy()
+        state['compiled'] = None
+        return state
+
+    def get_patterns(self) -> List[PIIPattern]:
+        """コンパイル済みのパターン（プロセス内で1回だけ作成）"""
+        if self.compiled is None:
+            self.compiled = self.patterns()
+        return self.compiled
+
+
+@dataclass
+class DetectorStats:
+    """検出処理ごとの処理時間と検出件数"""
+    name: str             # 検出処理名
+    label: str            # 表示名
+    seconds: float = 0.0  # 処理時間（秒）
+    matches: int = 0      # 検出件数（重なりにより採用しなかったものを除く）
+    skipped: bool = False  # 事前チェックで検索を省略した場合True
+
+
+class _SpanSet:
+    """採用済みの検出結果（開始位置の順に保持）"""
+
+    def __init__(self):
+        self._starts: List[int] = []
+        self._spans: List[PIISpan] = []
+        self.accepted: List[PIISpan] = []  # 採用した順（まとめて置換されたものを含む）
+
+    def gaps(self, length: int) -> List[Tuple[int, int]]:
+        """採用済みの位置の間の範囲"""
+        gaps = []
+        last = 0
+        for span in self._spans:
+            if span.start > last:
+                gaps.append((last, span.start))
+            last = span.end
+        if last < length:
+            gaps.append((last, length))
+        return gaps
+
+    def gap_at(self, pos: int) -> Tuple[int, int]:
+        """
+        位置を含む（採用済みの位置の中であればその直後の）、採用済みの位置の間の範囲
+
+        Returns:
+            Tuple[int, int]: (開始位置, 終了位置)、終了位置が不明な末尾の範囲は終了位置が大きな値
+        """
+        index = bisect.bisect_right(self._starts, pos)
+        gap_start = 0
+        if index > 0:
+            gap_start = self._spans[index - 1].end
+            if gap_start > pos:
+                # 採用済みの位置の中: 直後の範囲
+                index = bisect.bisect_right(self._starts, gap_start)
+        gap_end = self._spans[index].start if index < len(self._spans) else sys.maxsize
+        return gap_start, gap_end
+
+    def add(self, span: PIISpan, absorbs: Tuple[str, ...] = (), blocked_by: Tuple[str, ...] = ()) -> bool:
+        """
+        重ならない場合に採用
+
+        absorbs を指定した場合は、内側に完全に含まれる採用済みの検出（指定した種別のみ）を
+        まとめて置換し、それ以外の検出と重なる場合はその手前までに縮めて採用します
+
+        Args:
+            span: 検出結果
+            absorbs: まとめて置換できる種別
+            blocked_by: 重なる場合は採用しない種別
+
+        Returns:
+            bool: 採用した場合True
+        """
+        first = bisect.bisect_left(self._starts, span.start)
+        if first > 0 and self._spans[first - 1].end > span.start:
+            first -= 1
+        last = first
+        while last < len(self._spans) and self._spans[last].start < span.end:
+            last += 1
+
+        inner = self._spans[first:last]
+        if any(other.category in blocked_by for other in inner):
+            return False
+        if inner and not absorbs:
+            return False
+
+        for index, other in enumerate(inner):
+            if other.start <= span.start:
+                return False
+            if other.category not in absorbs or other.end > span.end:
+                # 手前までに縮める
+                span.value = span.value[:other.start - span.start]
+                span.end = other.start
+                last = first + index
+                break
+
+        for other in self._spans[first:last]:
+            other.absorbed = True
+        self._starts[first:last] = [span.start]
+        self._spans[first:last] = [span]
+        self.accepted.append(span)
+        return True
+
+
+def apply_spans(text: str, spans: List[PIISpan]) -> str:
+    """
+    検出結果を1回で置換し、各検出の置換後の位置を設定
+
+    Args:
+        text: 元のテキスト
+        spans: 重なりのない検出結果
+
+    Returns:
+        str: 置換後のテキスト
+    """
+    pieces = []
+    last = 0
+    out = 0
+    for span in sorted((s for s in spans if not s.absorbed), key=lambda s: s.start):
+        pieces.append(text[last:span.start])
+        out += span.start - last
+        pieces.append(span.replacement)
+        span.masked_start = out
+        out += len(span.replacement)
+        span.masked_end = out
+        last = span.end
+    pieces.append(text[last:])
+    return "".join(pieces)
 
 
 class PIIRemover:
@@ -30,110 +364,376 @@ class PIIRemover:
         '医師', '看護師', '薬剤師', '患者', '家族', '母', '父',
     ]
 
-    def __init__(self):
-        """初期化"""
-        self.replacement_log = []  # 置換ログ
+    # ファイル名などで患者番号の後にアンダースコアで区切られた氏名（例: _山本　百花_）
+    FILENAME_NAME_PATTERN = r'_([一-龯ァ-ヴー]{1,5}[\s　]+[一-龯ァ-ヴー]{1,5}|[一-龯ァ-ヴー]{2,10})_'
 
-    def remove_names(self, text: str) -> str:
+    # [患者番号]や[ID]（仮名化した[患者番号1]など）の直後にある氏名（例: [患者番号]山本　百花_）
+    ID_NAME_PATTERN = r'\[(?:患者番号|ID)\d*\]([一-龯ァ-ヴー]{1,5}[\s　]+[一-龯ァ-ヴー]{1,5}|[一-龯ァ-ヴー]{2,10})_'
+
+    # 登録済みの検出処理（検出処理名 → 検出処理）
+    _registry: Dict[str, PIIDetector] = {}
+
+    # 事前チェックで一致しえないパターンの検索を省略する（計測での比較用に切り替え可能）
+    USE_PREFILTERS = True
+
+    def __init__(self, disabled: Iterable[str] = (), vault: Optional[PseudonymVault] = None):
         """
-        氏名を削除
-        日本人の氏名パターンを検出して [氏名] に置換
+        初期化
 
         Args:
-            text: 元のテキスト
+            disabled: 使用しない検出処理名（既に個人情報を除いた文書で処理を省く場合など）
+            vault: 仮名化の保管庫（指定した場合は [氏名] の代わりに [氏名1] などの番号付きの記号に置換）
+        """
+        self.vault = vault
+        self.replacement_log = []  # 置換ログ
+        self.spans: List[PIISpan] = []  # 直近のclean_textで置換した位置（開始位置の順）
+        self.detector_stats: List[DetectorStats] = []  # 直近の検出での検出処理ごとの処理時間・件数
+        self.disabled = set(disabled)
+        # 作成時点で登録済みの検出処理を使用（並列処理のプロセスにも同じものを渡す）
+        self._detectors = self.registered_detectors()
+
+    def __setstate__(self, state):
+        # 並列処理のプロセスでは、登録済みと同じ検出処理はプロセス内のコンパイル済みのものを使う
+        detectors = []
+        for detector in state['_detectors']:
+            registered = self._registry.get(detector.name)
+            detectors.append(registered if registered == detector else detector)
+        state['_detectors'] = detectors
+        self.__dict__.update(state)
+
+    @classmethod
+    def register_detector(
+        cls,
+        name: str,
+        label: str,
+        priority: int,
+        patterns: Callable[[], List[PIIPattern]]
+    ) -> PIIDetector:
+        """
+        検出処理を登録（同じ名前の場合は置き換え）
+
+        施設独自の番号などを検出する場合に使用します
+        パターンは登録時に1回だけ作成・コンパイルします
+        並列処理で使用するため、patterns はモジュールの関数（lambdaでないもの）にしてください
+
+        例:
+            def insurance_patterns():
+                return [PIIPattern(r'保険者番号[：:\s]*\d{6,8}', '保険者番号', '[保険者番号]',
+                                   anchors=('保険者番号',))]
+
+            PIIRemover.register_detector('insurance', '保険者番号', 150, insurance_patterns)
+
+        Args:
+            name: 検出処理名
+            label: 表示名
+            priority: 優先順位（組み込みの検出処理は 生年月日100・電話番号200・住所300・ID400・氏名500）
+            patterns: 検出パターンを返す関数
 
         Returns:
-            str: 氏名を削除したテキスト
+            PIIDetector: 登録した検出処理
+        """
+        detector = PIIDetector(name, label, priority, patterns)
+        detector.get_patterns()
+        cls._registry[name] = detector
+        return detector
+
+    @classmethod
+    def unregister_detector(cls, name: str):
+        """検出処理の登録を解除"""
+        cls._registry.pop(name, None)
+
+    @classmethod
+    def registered_detectors(cls) -> List[PIIDetector]:
+        """登録済みの検出処理（優先順位の順）"""
+        return sorted(cls._registry.values(), key=lambda detector: (detector.priority, detector.name))
+
+    @classmethod
+    def for_preset(cls, preset_key: Optional[str], vault: Optional[PseudonymVault] = None) -> 'PIIRemover':
         """
-        # 医療用語は保護
-        protected_text = text
+        プリセットの設定（使用しない検出処理）に従って作成
 
+        Args:
+            preset_key: プリセットのキー（Noneまたは存在しない場合はすべて使用）
+            vault: 仮名化の保管庫（Noneの場合は仮名化しない）
+
+        Returns:
+            PIIRemover: 個人情報削除
+        """
+        from src.presets import PresetManager
+
+        preset = PresetManager.get_all_presets().get(preset_key) if preset_key else None
+        return cls(disabled=preset.disabled_pii_detectors if preset else (), vault=vault)
+
+    @classmethod
+    def _is_medical_term(cls, match_text: str) -> bool:
+        """医療用語を含むかどうか"""
+        for term in cls.MEDICAL_TERMS:
+            if term in match_text:
+                return True
+        return False
+
+    @classmethod
+    def _is_name_match(cls, match: re.Match) -> bool:
+        """氏名として置換するかどうか（医療用語を含まない2文字以上）"""
+        name = match.group(1).strip()
+        return not cls._is_medical_term(name) and len(name.replace(' ', '').replace('　', '')) >= 2
+
+    @classmethod
+    def name_patterns(cls) -> List[PIIPattern]:
+        """
+        氏名の検出パターン
+        日本人の氏名パターンを検出して、氏名の部分のみ [氏名] に置換
+        """
         # パターン1: 漢字の姓名（2-4文字の姓 + 2-3文字の名）
-        # 例: 田中太郎、佐藤花子
-        pattern1 = r'(?<![一-龯])[一-龯]{2,4}(?:\s*)[一-龯]{2,3}(?![一-龯])'
+        # 例: 田中太郎、佐藤花子（誤検知が多いため使用しない、代わりにパターン7の氏名辞書で検出）
+        # pattern1 = r'(?<![一-龯])[一-龯]{2,4}(?:\s*)[一-龯]{2,3}(?![一-龯])'
 
-        # パターン2: カタカナの姓名
+        # パターン2: カタカナの姓名（誤検知が多いため使用しない）
         # 例: タナカタロウ、サトウハナコ
-        pattern2 = r'[ァ-ヴー]{2,10}'
+        # pattern2 = r'[ァ-ヴー]{2,10}'
 
         # パターン3: 「患者氏名：〇〇」「氏名：〇〇」などの明示的な記載
         # スペースを含む姓名に対応（例：山本　百花、田中 太郎）
         pattern3 = r'(?:患者)?氏名[：:\s]*([一-龯ァ-ヴー]{1,5}[\s　]+[一-龯ァ-ヴー]{1,5}|[一-龯ァ-ヴー]{2,10})(?=\s|$|\n|/)'
 
         # パターン4: ファイル名などで患者番号の後にアンダースコアで区切られた氏名
-        # 例: _山本　百花_ のようなパターン（患者番号は既に削除されている想定）
-        pattern4 = r'_([一-龯ァ-ヴー]{1,5}[\s　]+[一-龯ァ-ヴー]{1,5}|[一-龯ァ-ヴー]{2,10})_'
+        # 例: _山本　百花_ のようなパターン
+        pattern4 = cls.FILENAME_NAME_PATTERN
 
         # パターン5: [患者番号]や[ID]の直後にある氏名
         # 例: [患者番号]山本　百花_ のようなパターン
-        pattern5 = r'\[(?:患者番号|ID)\]([一-龯ァ-ヴー]{1,5}[\s　]+[一-龯ァ-ヴー]{1,5}|[一-龯ァ-ヴー]{2,10})_'
+        pattern5 = cls.ID_NAME_PATTERN
 
         # パターン6: 数字の直後にある氏名（スペース付き姓名のみ、誤検知防止）
         # 例: ６２２山本　太郎 のようなパターン
         pattern6 = r'\d+([一-龯]{1,5}[\s　]+[一-龯]{1,5})(?=\s|$|\n)'
 
-        # 医療用語をチェック
-        def is_medical_term(match_text: str) -> bool:
-            for term in self.MEDICAL_TERMS:
-                if term in match_text:
-                    return True
-            return False
+        patterns = [
+            PIIPattern(
+                pattern, '氏名', '[氏名]', confidence, accept=cls._is_name_match, group=1,
+                anchors=anchors, charset=charset
+            )
+            for pattern, confidence, anchors, charset in [
+                (pattern3, 0.9, ('氏名',), ''),
+                (pattern4, 0.8, ('_',), ''),
+                (pattern5, 0.8, ('[患者番号', '[ID'), ''),
+                (pattern6, 0.6, (), r'\d'),
+            ]
+        ]
 
-        # パターン3（明示的な氏名記載）を優先して置換
-        def replace_explicit_name(match):
-            name = match.group(1).strip()
-            if not is_medical_term(name) and len(name.replace(' ', '').replace('　', '')) >= 2:
-                self.replacement_log.append(('氏名', name))
-                return match.group(0).replace(name, '[氏名]')
-            return match.group(0)
-
-        protected_text = re.sub(pattern3, replace_explicit_name, protected_text)
-
-        # パターン4（ファイル名のアンダースコア区切り氏名）を置換
-        def replace_filename_name(match):
-            name = match.group(1).strip()
-            if not is_medical_term(name) and len(name.replace(' ', '').replace('　', '')) >= 2:
-                self.replacement_log.append(('氏名', name))
-                return '_[氏名]_'
-            return match.group(0)
-
-        protected_text = re.sub(pattern4, replace_filename_name, protected_text)
-
-        # パターン5（[患者番号]の直後の氏名）を置換
-        def replace_after_id_name(match):
-            name = match.group(1).strip()
-            if not is_medical_term(name) and len(name.replace(' ', '').replace('　', '')) >= 2:
-                self.replacement_log.append(('氏名', name))
-                # [患者番号]や[ID]の部分を保持して、氏名だけ[氏名]に置換
-                return match.group(0).replace(name, '[氏名]')
-            return match.group(0)
-
-        protected_text = re.sub(pattern5, replace_after_id_name, protected_text)
-
-        # パターン6（数字の直後の氏名）を置換
-        def replace_after_number_name(match):
-            name = match.group(1).strip()
-            # スペースを含む姓名のみ（誤検知防止）
-            if not is_medical_term(name) and len(name.replace(' ', '').replace('　', '')) >= 2:
-                self.replacement_log.append(('氏名', name))
-                # 数字の部分は保持して、氏名だけ[氏名]に置換
-                return match.group(0).replace(name, '[氏名]')
-            return match.group(0)
-
-        protected_text = re.sub(pattern6, replace_after_number_name, protected_text)
-
-        # パターン1（漢字の姓名）を置換
-        def replace_kanji_name(match):
-            name = match.group(0)
-            if not is_medical_term(name) and len(name) >= 4:
-                self.replacement_log.append(('氏名', name))
-                return '[氏名]'
-            return name
-
-        # より慎重に置換（誤検知を減らす）
-        # protected_text = re.sub(pattern1, replace_kanji_name, protected_text)
-
-        return protected_text
+        # パターン7: 氏名辞書の姓と名の組み合わせ（本文中の氏名）
+        # 例: 山本太郎さん、患者田中花子、鈴木　一郎先生（医療用語を含むものは対象外）
+        patterns.append(NameDictionaryPattern(
+            '', '氏名', '[氏名]', 0.7, charset=r'[一-龯々ァ-ヴー]', protected=tuple(cls.MEDICAL_TERMS)
+        ))
+        return patterns
+
+    @classmethod
+    def birthdate_patterns(cls) -> List[PIIPattern]:
+        """
+        生年月日の検出パターン
+        病歴の日付（月日のみ、年のみ）は対象外です
+        """
+        def is_birth_year(match):
+            # 1900年代〜2020年代の範囲に限定（生年月日として妥当な範囲）
+            return re.match(r'(19\d{2}|20[0-2]\d)', match.group(0)) is not None
+
+        return [
+            # パターン1: 「生年月日：」の後ろ（最優先、ラベルごと置換）
+            PIIPattern(
+                r'生年月日[：:\s]*([\d年月日明大昭平令和MTSHR\.\/\-\(\)]{6,})',
+                '生年月日', '生年月日：[生年月日]', 0.95, anchors=('生年月日',)
+            ),
+            # パターン2: 西暦+和暦の複合形式（生年月日の可能性が極めて高い）
+            # 2003(H15)/10/19、1985(S60)/3/9
+            PIIPattern(
+                r'\d{4}\([MTSHR]\d{1,3}\)[/\-\.]\d{1,2}[/\-\.]\d{1,2}', '生年月日', '[生年月日]', 0.9,
+                anchors=('(',), charset=r'\d'
+            ),
+            # パターン3: 西暦4桁+月+日の完全な日付（生年月日の可能性が高い）
+            # ただし、病歴の記述（平成○年、令和○年など）を誤検知しないように年月日が揃っているもののみ
+            # 1985年3月9日、1985/3/9、1985-3-9
+            PIIPattern(
+                r'\d{4}[年/\-\.]\d{1,2}[月/\-\.]\d{1,2}日?', '生年月日', '[生年月日]', 0.6,
+                accept=is_birth_year, charset=r'\d'
+            ),
+            # パターン4: 和暦の完全な日付（年月日がすべて揃っているもの）
+            # 昭和60年3月9日、S60.3.9、S60/3/9
+            PIIPattern(
+                r'[明大昭平令和]{1,2}\d{1,3}[年\.]\d{1,2}[月\.]\d{1,2}日?', '生年月日', '[生年月日]', 0.6,
+                anchors=tuple('明大昭平令和'), charset=r'\d'
+            ),
+            PIIPattern(
+                r'[MTSHR]\d{1,3}[\.\/]\d{1,2}[\.\/]\d{1,2}', '生年月日', '[生年月日]', 0.6,
+                anchors=tuple('MTSHR'), charset=r'\d'
+            ),
+        ]
+
+    @classmethod
+    def address_patterns(cls) -> List[PIIPattern]:
+        """住所の検出パターン"""
+        # すでにマスク済みの箇所（仮名化した[住所1]などを含む）を含む場合は対象外
+        def not_masked(match):
+            return '[住所' not in match.group(0) and '[郵便番号' not in match.group(0)
+
+        return [
+            # パターン1: 〒123-4567（郵便番号）
+            PIIPattern(r'〒?\d{3}-?\d{4}', '郵便番号', '[郵便番号]', 0.7, charset=r'\d'),
+            # パターン2: 住所：〇〇（明示的な住所表記を先に処理、ラベルごと行末まで置換）
+            # 行内の電話番号・生年月日なども一緒に置換する（郵便番号を含む行は対象外）
+            PIIPattern(
+                r'住所[：:\s]*[^\n]+', '住所', '住所：[住所]', 0.9, accept=not_masked,
+                absorbs=('生年月日', '電話番号'), blocked_by=('郵便番号', '住所'), anchors=('住所',),
+            ),
+            # パターン3: 東京都渋谷区〇〇1-2-3（都道府県で始まる住所パターン）
+            PIIPattern(
+                r'[東京大阪京都北海道青森岩手宮城秋田山形福島茨城栃木群馬埼玉千葉神奈川新潟富山石川福井山梨長野岐阜静岡愛知三重滋賀兵庫奈良和歌山鳥取島根岡山広島山口徳島香川愛媛高知福岡佐賀長崎熊本大分宮崎鹿児島沖縄][都道府県]{0,1}[一-龯ぁ-んァ-ヴー]+[市区町村郡]{1}[一-龯ぁ-んァ-ヴー0-9\-ー]+',
+                '住所', '[住所]', 0.7, accept=not_masked, charset=r'[市区町村郡]'
+            ),
+        ]
+
+    @classmethod
+    def phone_patterns(cls) -> List[PIIPattern]:
+        """電話番号の検出パターン（より具体的なパターンから）"""
+        def is_phone(match):
+            matched = match.group(0)
+            # 年月日（2023-04-15など）と誤認しないようにチェック
+            if re.match(r'\d{4}-\d{1,2}-\d{1,2}', matched):
+                return False
+            # 郵便番号(123-4567)との区別
+            if re.match(r'\d{3}-\d{4}', matched):
+                return False
+            return True
+
+        return [
+            # パターン1: (03) 1234-5678 形式
+            PIIPattern(r'\(\d{2,4}\)\s*\d{2,4}-\d{4}', '電話番号', '[電話番号]', 0.9, anchors=('(',), charset=r'\d'),
+            # パターン2: 03-1234-5678、090-1234-5678 形式
+            PIIPattern(
+                r'\d{2,4}-\d{3,4}-\d{4}', '電話番号', '[電話番号]', 0.8, accept=is_phone,
+                anchors=('-',), charset=r'\d'
+            ),
+            # パターン3: 0312345678、09012345678 形式（ハイフンなし）
+            # より厳格に：先頭が0で始まる10-11桁の数字のみ
+            PIIPattern(r'\b0\d{9,10}\b', '電話番号', '[電話番号]', 0.7, charset=r'\d'),
+        ]
+
+    @classmethod
+    def medical_id_patterns(cls) -> List[PIIPattern]:
+        """診察券番号・患者IDの検出パターン"""
+        return [
+            # 明示的なID表記
+            PIIPattern(
+                r'(?<!\[)(?:診察券|患者ID|患者番号|カルテ番号)[：:\s]*[\w\-]+', 'ID', '[ID]', 0.9,
+                anchors=('診察券', '患者ID', '患者番号', 'カルテ番号')
+            ),
+            PIIPattern(r'(?<!\[)ID[：:\s]*[\w\-]+', 'ID', '[ID]', 0.8, anchors=('ID',)),  # 仮名化した[ID1]は除く
+            # 患者番号: 240065 のような形式
+            PIIPattern(r'患者番号[：:\s]*\d{4,8}', 'ID', '[ID]', 0.9, anchors=('患者番号',)),
+            # ファイル名などの患者番号（6桁前後の数字 + アンダースコア）
+            # 例: 240065_ のようなパターン（単語境界で囲まれている場合）
+            PIIPattern(r'\b\d{4,8}_', '患者番号', '[患者番号]', 0.6, anchors=('_',), charset=r'\d'),
+        ]
+
+    def detectors(self) -> List[PIIDetector]:
+        """
+        使用する検出処理の一覧（優先順位の順）
+
+        誤検知を防ぐため、より具体的なパターンから順に検出します
+
+        Returns:
+            List[PIIDetector]: 検出処理のリスト
+        """
+        return [detector for detector in self._detectors if detector.name not in self.disabled]
+
+    def _active_patterns(
+        self, text: str, patterns: List[PIIPattern], checks: Dict[object, bool]
+    ) -> List[Optional[PIIPattern]]:
+        """
+        事前チェックで一致しえないパターンを除く（除いたパターンはNone、優先順位を変えないため）
+
+        Args:
+            text: 元のテキスト
+            patterns: 検出処理のパターン
+            checks: 事前チェックの結果（1回の検出の間で共有）
+
+        Returns:
+            List[Optional[PIIPattern]]: 検索するパターン
+        """
+        if not self.USE_PREFILTERS:
+            return list(patterns)
+        return [pattern if pattern.may_match(text, checks) else None for pattern in patterns]
+
+    @staticmethod
+    def _run_patterns(
+        text: str, patterns: List[Optional[PIIPattern]], span_set: _SpanSet, priority: int
+    ) -> int:
+        """
+        パターンを順に適用し、採用済みの位置と重ならない検出を追加
+
+        Returns:
+            int: 次のパターンの優先順位
+        """
+        for pattern in patterns:
+            if pattern is not None:
+                for span in pattern.find(text, span_set, priority):
+                    span_set.add(span, pattern.absorbs, pattern.blocked_by)
+            priority += 1
+        return priority
+
+    def detect(self, text: str) -> List[PIISpan]:
+        """
+        すべての個人情報を検出
+
+        Args:
+            text: 元のテキスト
+
+        Returns:
+            List[PIISpan]: 採用した検出結果（検出した順、まとめて置換されたものを含む）
+        """
+        span_set = _SpanSet()
+        priority = 0
+        checks: Dict[object, bool] = {}
+        self.detector_stats = []
+        for detector in self.detectors():
+            count = len(span_set.accepted)
+            with metrics.timer(f'pii.detect_{detector.name}', chars_in=len(text)) as event:
+                patterns = self._active_patterns(text, detector.get_patterns(), checks)
+                skipped = patterns.count(None)
+                if skipped == len(patterns):
+                    # 一致しうるパターンがない検出処理は丸ごと省略
+                    priority += len(patterns)
+                else:
+                    priority = self._run_patterns(text, patterns, span_set, priority)
+                event.set(matches=len(span_set.accepted) - count, skipped_patterns=skipped)
+            if skipped == len(patterns):
+                metrics.increment('detectors_skipped', stage=f'pii.detect_{detector.name}')
+            self.detector_stats.append(DetectorStats(
+                detector.name, detector.label, event.duration, len(span_set.accepted) - count,
+                skipped == len(patterns)
+            ))
+        return span_set.accepted
+
+    def _remove_with(self, text: str, name: str) -> str:
+        """1つの検出処理だけで置換（置換ログに追加）"""
+        span_set = _SpanSet()
+        patterns = self._active_patterns(text, self._registry[name].get_patterns(), {})
+        self._run_patterns(text, patterns, span_set, 0)
+        self.replacement_log.extend((span.category, span.value) for span in span_set.accepted)
+        return apply_spans(text, span_set.accepted)
+
+    def remove_names(self, text: str) -> str:
+        """
+        氏名を削除
+        日本人の氏名パターンを検出して [氏名] に置換
+
+        Args:
+            text: 元のテキスト
+
+        Returns:
+            str: 氏名を削除したテキスト
+        """
+        return self._remove_with(text, 'names')
 
     def remove_birthdates(self, text: str) -> str:
         """
@@ -146,43 +746,7 @@ class PIIRemover:
         Returns:
             str: 生年月日を削除したテキスト
         """
-        result = text
-
-        # パターン1: 「生年月日：」の後ろ（最優先）
-        def replace_explicit_birthdate(match):
-            self.replacement_log.append(('生年月日', match.group(0)))
-            return '生年月日：[生年月日]'
-        result = re.sub(r'生年月日[：:\s]*([\d年月日明大昭平令和MTSHR\.\/\-\(\)]{6,})', replace_explicit_birthdate, result)
-
-        # パターン2: 西暦+和暦の複合形式（生年月日の可能性が極めて高い）
-        # 2003(H15)/10/19、1985(S60)/3/9
-        def replace_complex_date(match):
-            self.replacement_log.append(('生年月日', match.group(0)))
-            return '[生年月日]'
-        result = re.sub(r'\d{4}\([MTSHR]\d{1,3}\)[/\-\.]\d{1,2}[/\-\.]\d{1,2}', replace_complex_date, result)
-
-        # パターン3: 西暦4桁+月+日の完全な日付（生年月日の可能性が高い）
-        # ただし、病歴の記述（平成○年、令和○年など）を誤検知しないように年月日が揃っているもののみ
-        # 1985年3月9日、1985/3/9、1985-3-9
-        def replace_full_date(match):
-            matched = match.group(0)
-            # 1900年代〜2020年代の範囲に限定（生年月日として妥当な範囲）
-            year_match = re.match(r'(19\d{2}|20[0-2]\d)', matched)
-            if year_match:
-                self.replacement_log.append(('生年月日', matched))
-                return '[生年月日]'
-            return matched
-        result = re.sub(r'\d{4}[年/\-\.]\d{1,2}[月/\-\.]\d{1,2}日?', replace_full_date, result)
-
-        # パターン4: 和暦の完全な日付（年月日がすべて揃っているもの）
-        # 昭和60年3月9日、S60.3.9、S60/3/9
-        def replace_japanese_era_date(match):
-            self.replacement_log.append(('生年月日', match.group(0)))
-            return '[生年月日]'
-        result = re.sub(r'[明大昭平令和]{1,2}\d{1,3}[年\.]\d{1,2}[月\.]\d{1,2}日?', replace_japanese_era_date, result)
-        result = re.sub(r'[MTSHR]\d{1,3}[\.\/]\d{1,2}[\.\/]\d{1,2}', replace_japanese_era_date, result)
-
-        return result
+        return self._remove_with(text, 'birthdates')
 
     def remove_addresses(self, text: str) -> str:
         """
@@ -194,35 +758,7 @@ class PIIRemover:
         Returns:
             str: 住所を削除したテキスト
         """
-        result = text
-
-        # パターン1: 〒123-4567（郵便番号）
-        def replace_postal_code(match):
-            self.replacement_log.append(('郵便番号', match.group(0)))
-            return '[郵便番号]'
-        result = re.sub(r'〒?\d{3}-?\d{4}', replace_postal_code, result)
-
-        # パターン2: 住所：〇〇（明示的な住所表記を先に処理）
-        def replace_explicit_address(match):
-            full_match = match.group(0)
-            # すでに[住所]が含まれていないかチェック
-            if '[住所]' not in full_match and '[郵便番号]' not in full_match:
-                self.replacement_log.append(('住所', full_match))
-                return '住所：[住所]'
-            return full_match
-        result = re.sub(r'住所[：:\s]*[^\n]+', replace_explicit_address, result)
-
-        # パターン3: 東京都渋谷区〇〇1-2-3（都道府県で始まる住所パターン）
-        def replace_prefecture_address(match):
-            matched = match.group(0)
-            # すでにマスク済みでないかチェック
-            if '[住所]' not in matched and '[郵便番号]' not in matched:
-                self.replacement_log.append(('住所', matched))
-                return '[住所]'
-            return matched
-        result = re.sub(r'[東京大阪京都北海道青森岩手宮城秋田山形福島茨城栃木群馬埼玉千葉神奈川新潟富山石川福井山梨長野岐阜静岡愛知三重滋賀兵庫奈良和歌山鳥取島根岡山広島山口徳島香川愛媛高知福岡佐賀長崎熊本大分宮崎鹿児島沖縄][都道府県]{0,1}[一-龯ぁ-んァ-ヴー]+[市区町村郡]{1}[一-龯ぁ-んァ-ヴー0-9\-ー]+', replace_prefecture_address, result)
-
-        return result
+        return self._remove_with(text, 'addresses')
 
     def remove_phone_numbers(self, text: str) -> str:
         """
@@ -234,42 +770,7 @@ class PIIRemover:
         Returns:
             str: 電話番号を削除したテキスト
         """
-        # 順番に処理（より具体的なパターンから）
-        result = text
-
-        # パターン1: (03) 1234-5678 形式
-        def replace_with_parens(match):
-            self.replacement_log.append(('電話番号', match.group(0)))
-            return '[電話番号]'
-        result = re.sub(r'\(\d{2,4}\)\s*\d{2,4}-\d{4}', replace_with_parens, result)
-
-        # パターン2: 03-1234-5678、090-1234-5678 形式
-        def replace_with_hyphens(match):
-            matched = match.group(0)
-            # 年月日（2023-04-15など）と誤認しないようにチェック
-            if re.match(r'\d{4}-\d{1,2}-\d{1,2}', matched):
-                return matched  # 日付なので置換しない
-            # 郵便番号(123-4567)との区別
-            if re.match(r'\d{3}-\d{4}', matched):
-                return matched  # 郵便番号パターンなので置換しない
-
-            self.replacement_log.append(('電話番号', matched))
-            return '[電話番号]'
-        result = re.sub(r'\d{2,4}-\d{3,4}-\d{4}', replace_with_hyphens, result)
-
-        # パターン3: 0312345678、09012345678 形式（ハイフンなし）
-        # より厳格に：先頭が0で始まる10-11桁の数字のみ
-        def replace_no_hyphens(match):
-            matched = match.group(0)
-            # 年（2023など）と誤認しないよう、先頭が0であることを確認
-            if not matched.startswith('0'):
-                return matched
-
-            self.replacement_log.append(('電話番号', matched))
-            return '[電話番号]'
-        result = re.sub(r'\b0\d{9,10}\b', replace_no_hyphens, result)
-
-        return result
+        return self._remove_with(text, 'phone_numbers')
 
     def remove_medical_ids(self, text: str) -> str:
         """
@@ -281,31 +782,17 @@ class PIIRemover:
         Returns:
             str: ID情報を削除したテキスト
         """
-        patterns = [
-            # 明示的なID表記
-            (r'(?:診察券|患者ID|患者番号|カルテ番号)[：:\s]*[\w\-]+', 'ID'),
-            (r'ID[：:\s]*[\w\-]+', 'ID'),
-            # 患者番号: 240065 のような形式
-            (r'患者番号[：:\s]*\d{4,8}', 'ID'),
-            # ファイル名などの患者番号（6桁前後の数字 + アンダースコア）
-            # 例: 240065_ のようなパターン（単語境界で囲まれている場合）
-            (r'\b\d{4,8}_', '患者番号'),
-        ]
-
-        result = text
-        for pattern, label in patterns:
-            def replace_with_log(match):
-                self.replacement_log.append((label, match.group(0)))
-                return f'[{label}]'
-
-            result = re.sub(pattern, replace_with_log, result)
-
-        return result
+        return self._remove_with(text, 'medical_ids')
 
+    @profiled('clean_text')
     def clean_text(self, text: str) -> Tuple[str, List[Tuple[str, str]]]:
         """
         すべての個人情報を削除
 
+        検出はすべて元のテキストに対して行い、置換は最後に1回だけ行います
+        置換した位置（元のテキストと置換後のテキストでの位置）は self.spans に残ります
+        保管庫（self.vault）がある場合は、番号付きの記号（[氏名1] など）に置換します
+
         Args:
             text: 元のテキスト
 
@@ -313,16 +800,17 @@ class PIIRemover:
             Tuple[str, List[Tuple[str, str]]]:
                 (個人情報を削除したテキスト, 置換ログ)
         """
-        self.replacement_log = []  # ログをリセット
+        spans = self.detect(text)
+        if self.vault is not None:
+            self.vault.pseudonymize(spans)
 
-        result = text
+        with metrics.timer('pii.rewrite', chars_in=len(text)) as event:
+            result = apply_spans(text, spans)
+            event.set(chars_out=len(result), matches=len(spans))
 
-        # 順番に削除処理を実行（誤検知を防ぐため、より具体的なパターンから）
-        result = self.remove_birthdates(result)    # 生年月日
-        result = self.remove_phone_numbers(result) # 電話番号 - 郵便番号より先に
-        result = self.remove_addresses(result)     # 住所（郵便番号含む）
-        result = self.remove_medical_ids(result)   # ID情報
-        result = self.remove_names(result)         # 氏名は最後
+        # 置換ログは検出した順（レポートの並び順を維持）
+        self.replacement_log = [(span.category, span.value) for span in spans]
+        self.spans = sorted((span for span in spans if not span.absorbed), key=lambda s: s.start)
 
         return result, self.replacement_log
 
@@ -354,6 +842,68 @@ class PIIRemover:
 
         return "\n".join(report_lines)
 
+    def get_detector_report(self) -> str:
+        """
+        検出処理ごとの処理時間と検出件数のレポートを生成（直近の検出）
+
+        Returns:
+            str: レポート
+        """
+        report_lines = ["=== 検出処理 ==="]
+        for stats in self.detector_stats:
+            skipped = "（事前チェックで省略）" if stats.skipped else ""
+            report_lines.append(
+                f"{stats.label}（{stats.name}）: {stats.seconds * 1000:.1f}ms、{stats.matches}件{skipped}"
+            )
+        for detector in self._detectors:
+            if detector.name in self.disabled:
+                report_lines.append(f"{detector.label}（{detector.name}）: 無効")
+        return "\n".join(report_lines)
+
+
+# 組み込みの検出処理
+PIIRemover.register_detector('birthdates', '生年月日', 100, PIIRemover.birthdate_patterns)
+PIIRemover.register_detector('phone_numbers', '電話番号', 200, PIIRemover.phone_patterns)  # 郵便番号より先に
+PIIRemover.register_detector('addresses', '住所', 300, PIIRemover.address_patterns)  # 郵便番号を含む
+PIIRemover.register_detector('medical_ids', 'ID', 400, PIIRemover.medical_id_patterns)
+PIIRemover.register_detector('names', '氏名', 500, PIIRemover.name_patterns)  # 氏名は最後
+
+
+def benchmark(texts: List[str], repeat: int = 3) -> Dict[str, Tuple[float, float]]:
+    """
+    検出処理ごとの処理時間を、事前チェックなし・ありで計測
+
+    Args:
+        texts: 計測に使うテキスト
+        repeat: 繰り返し回数（最も速い結果を採用）
+
+    Returns:
+        Dict[str, Tuple[float, float]]: 検出処理名 -> (事前チェックなしの秒数, ありの秒数)
+            （'合計' は clean_text 全体の秒数）
+    """
+    import time
+
+    use_prefilters = PIIRemover.USE_PREFILTERS
+    results: Dict[str, List[Optional[float]]] = {}
+    try:
+        for index, enabled in enumerate((False, True)):
+            PIIRemover.USE_PREFILTERS = enabled
+            remover = PIIRemover()
+            for _ in range(repeat):
+                seconds: Dict[str, float] = {}
+                start = time.perf_counter()
+                for text in texts:
+                    remover.clean_text(text)
+                    for stats in remover.detector_stats:
+                        seconds[stats.name] = seconds.get(stats.name, 0.0) + stats.seconds
+                seconds['合計'] = time.perf_counter() - start
+                for name, elapsed in seconds.items():
+                    best = results.setdefault(name, [None, None])
+                    best[index] = elapsed if best[index] is None else min(best[index], elapsed)
+    finally:
+        PIIRemover.USE_PREFILTERS = use_prefilters
+    return {name: (best[0] or 0.0, best[1] or 0.0) for name, best in results.items()}
+
 
 if __name__ == "__main__":
     # テスト用
@@ -377,3 +927,26 @@ if __name__ == "__main__":
     print("\n=== 個人情報削除後 ===")
     print(cleaned_text)
     print("\n" + remover.get_summary_report())
+
+    print("\n=== 検出位置 ===")
+    for span in remover.spans:
+        print(f"{span.start:4d}-{span.end:4d} → {span.masked_start:4d}-{span.masked_end:4d} "
+              f"{span.category} ({span.confidence:.2f}): {span.value}")
+
+    print("\n" + remover.get_detector_report())
+
+    # 事前チェックの効果（python -m src.pii_remover ファイル.txt ... で任意の文書を追加）
+    with open("tests/sample_medical_record.txt", encoding="utf-8") as f:
+        record = f.read()
+    # 個人情報を含む文書、削除済みの文書、数字を含まない所見のみの文書
+    findings = "\n".join(line for line in record.splitlines() if not re.search(r'[\d_]', line))
+    corpus = [record, PIIRemover().clean_text(record)[0], findings]
+    for path in sys.argv[1:]:
+        with open(path, encoding="utf-8") as f:
+            corpus.append(f.read())
+    corpus = corpus * 50
+
+    print(f"\n=== 事前チェックの効果（{len(corpus)}文書、{sum(len(text) for text in corpus)}文字） ===")
+    for name, (without, with_prefilters) in benchmark(corpus).items():
+        speedup = without / with_prefilters if with_prefilters else 0.0
+        print(f"{name}: {without * 1000:.1f}ms → {with_prefilters * 1000:.1f}ms（{speedup:.1f}倍）")
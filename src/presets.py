@@ -3,8 +3,12 @@
 各種文書用のプリセット（プロンプトとパラメータ）を管理します
 """
 
-from dataclasses import dataclass
-from typing import Dict, Optional
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from .metrics import metrics
+from .prompt_template import compile_template
+from .text_formatter import format_text
 
 
 @dataclass
@@ -17,6 +21,8 @@ class PresetConfig:
     target_chars: str = ""  # 目標文字数（表示用）
     is_custom: bool = False  # カスタムプリセットかどうか
     is_format_only: bool = False  # 整形のみモード（AI不使用）
+    context_tokens: int = 0  # 要約に送る文書のトークン数の上限（0の場合は全文を送る）
+    disabled_pii_detectors: List[str] = field(default_factory=list)  # 使用しない個人情報の検出処理（names など）
 
 
 class PresetManager:
@@ -36,6 +42,7 @@ class PresetManager:
             description='診断書の病歴欄用（200~300文字）',
             target_chars='200~300文字',
             max_tokens=600,
+            context_tokens=4000,
             prompt="""以下は個人情報を削除した医療文書です。
 診断書の「病歴」欄に記載する内容を200-300文字で作成してください。
 
@@ -62,6 +69,7 @@ class PresetManager:
             description='診断書の病状記載欄用（200~300文字）',
             target_chars='200~300文字',
             max_tokens=600,
+            context_tokens=4000,
             prompt="""以下は個人情報を削除した医療文書です。
 診断書の「病状」欄に記載する内容を200-300文字で作成してください。
 
@@ -120,6 +128,7 @@ class PresetManager:
             description='介護保険主治医意見書用（200~300文字）',
             target_chars='200~300文字',
             max_tokens=600,
+            context_tokens=4000,
             prompt="""以下は個人情報を削除した医療文書です。
 介護保険主治医意見書に記載する内容を200-300文字で作成してください。
 
@@ -191,6 +200,8 @@ class PresetManager:
                 prompt=preset_data.get('prompt', ''),
                 max_tokens=preset_data.get('max_tokens', 600),
                 target_chars=preset_data.get('target_chars', ''),
+                context_tokens=preset_data.get('context_tokens', 0),
+                disabled_pii_detectors=list(preset_data.get('disabled_pii_detectors', [])),
                 is_custom=True
             )
 
@@ -218,18 +229,25 @@ class PresetManager:
         cls.load_custom_presets()
 
     @classmethod
-    def format_prompt(cls, prompt_template: str, text: str) -> str:
+    def format_prompt(cls, prompt_template: str, text: str, **values: Optional[str]) -> str:
         """
         プロンプトに医療文書を埋め込む
 
+        テンプレートは解析済みのものを再利用します
+        {{ }} 以外の波括弧（{text} などの既知のプレースホルダーを除く）は文字としてそのまま残ります
+
         Args:
             prompt_template: プロンプトテンプレート
             text: 医療文書
+            **values: その他のプレースホルダーの値（target_chars: 目標文字数, date: 作成日）
 
         Returns:
             str: 完成したプロンプト
         """
-        return prompt_template.format(text=text)
+        with metrics.timer('format_prompt', chars_in=len(text)) as event:
+            prompt = compile_template(prompt_template).render(text, **values)
+            event.set(chars_out=len(prompt))
+        return prompt
 
     @classmethod
     def format_text_only(cls, text: str) -> str:
@@ -242,45 +260,8 @@ class PresetManager:
         Returns:
             str: 整形されたテキスト
         """
-        import re
-
-        # 連続する空白行を1つにする
-        text = re.sub(r'\n\n+', '\n\n', text)
-
-        # 段落内の改行を削除（ただし、箇条書きや見出しは保持）
-        lines = text.split('\n')
-        formatted_lines = []
-        current_paragraph = []
-
-        for line in lines:
-            line = line.strip()
-
-            # 空行の場合
-            if not line:
-                if current_paragraph:
-                    formatted_lines.append(''.join(current_paragraph))
-                    current_paragraph = []
-                formatted_lines.append('')
-                continue
-
-            # 箇条書きや見出しっぽい行（短い行、記号で始まる行など）
-            if (len(line) < 30 or
-                line.startswith(('・', '○', '●', '※', '■', '□', '【', '1.', '2.', '3.', '-', '*')) or
-                line.endswith(('：', ':'))):
-                if current_paragraph:
-                    formatted_lines.append(''.join(current_paragraph))
-                    current_paragraph = []
-                formatted_lines.append(line)
-                continue
-
-            # 通常の文章行は結合
-            current_paragraph.append(line)
-
-        # 最後の段落を追加
-        if current_paragraph:
-            formatted_lines.append(''.join(current_paragraph))
-
-        return '\n'.join(formatted_lines)
+        # 連続する空白行を1つにし、段落内の改行を削除（箇条書きや見出しは保持）
+        return format_text(text)
 
 
 # 初期化
@@ -0,0 +1,284 @@
+"""
+プロファイリングモジュール
+処理に時間がかかった実行のcProfileトレースを保存し、集計結果を表示します
+保存するのは関数名・ソースファイル名・呼び出し回数・時間のみで、文書の内容は含みません
+"""
+
+import cProfile
+import functools
+import json
+import pstats
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from src.metrics import metrics
+
+
+# cProfileはプロセス全体で同時に1つしか有効にできない（Python 3.12以降は2つ目で ValueError）ため、
+# 計測中は他のスレッドの実行や入れ子の実行を計測しない
+_profiling_lock = threading.Lock()
+
+
+class RunProfiler:
+    """1回の処理実行をプロファイリングするコンテキストマネージャー"""
+
+    # 保存するプロファイルの最大数（古いものから削除）
+    MAX_PROFILES = 20
+
+    # 1つのプロファイルに保存する関数の最大数（所要時間の多い順）
+    MAX_FUNCTIONS = 200
+
+    def __init__(
+        self,
+        name: str,
+        enabled: Optional[bool] = None,
+        threshold_sec: Optional[float] = None,
+        profile_dir: Optional[Path] = None
+    ):
+        """
+        初期化
+
+        Args:
+            name: 実行の名前（process, summary など）
+            enabled: プロファイリングを行うか（Noneの場合は設定に従う）
+            threshold_sec: この秒数以上かかった場合のみ保存（Noneの場合は設定に従う）
+            profile_dir: 保存先ディレクトリ（Noneの場合は設定ディレクトリ内）
+        """
+        from src.config import config
+
+        self.name = name
+        self.enabled = config.PROFILING_ENABLED if enabled is None else enabled
+        self.threshold_sec = (
+            config.PROFILING_THRESHOLD_SEC if threshold_sec is None else threshold_sec
+        )
+        self.profile_dir = Path(profile_dir) if profile_dir else get_profile_dir()
+        self.saved_path: Optional[Path] = None  # 保存したプロファイルのパス
+        self.elapsed = 0.0  # 所要時間（秒）
+        self._profile: Optional[cProfile.Profile] = None
+        self._start = 0.0
+        self._started_at: Optional[datetime] = None
+        self._first_seq = 0
+        self._thread_id = 0
+
+    def __enter__(self) -> "RunProfiler":
+        self._start = time.perf_counter()
+        self._started_at = datetime.now()
+        # すでに計測中の場合（外側の実行・他のスレッド）は何もしない
+        if self.enabled and _profiling_lock.acquire(blocking=False):
+            self._thread_id = threading.get_ident()
+            self._first_seq = max((e.seq for e in metrics.events()), default=0)
+            profile = cProfile.Profile()
+            try:
+                profile.enable()
+            except ValueError as e:
+                # 他のツール（デバッガーなど）がプロファイラを使用している場合は計測せずに実行
+                _profiling_lock.release()
+                print(f"⚠️  プロファイリングを開始できませんでした: {e}")
+                return self
+            self._profile = profile
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.elapsed = time.perf_counter() - self._start
+        if self._profile is None:
+            return False
+
+        self._profile.disable()
+        _profiling_lock.release()
+
+        if self.elapsed >= self.threshold_sec:
+            try:
+                self.saved_path = self._save(failed=exc_type is not None)
+                print(f"⏱️  処理に{self.elapsed:.1f}秒かかったためプロファイルを保存しました: {self.saved_path}")
+            except Exception as e:
+                print(f"プロファイルの保存に失敗しました: {e}")
+
+        self._profile = None
+        return False
+
+    def _save(self, failed: bool) -> Path:
+        """プロファイルをJSONとして保存"""
+        stats = pstats.Stats(self._profile)
+        functions = []
+        for (file_name, line, func_name), (cc, ncalls, tottime, cumtime, _) in stats.stats.items():
+            functions.append({
+                'function': func_name,
+                'file': _short_path(file_name),
+                'line': line,
+                'ncalls': ncalls,
+                'primitive_calls': cc,
+                'tottime': round(tottime, 6),
+                'cumtime': round(cumtime, 6),
+            })
+        functions.sort(key=lambda f: f['tottime'], reverse=True)
+
+        # この実行中にこのスレッドで記録された処理ステージの内訳（数値のみ）
+        stages = [
+            {'stage': e.stage, 'duration': round(e.duration, 6),
+             'chars_in': e.chars_in, 'chars_out': e.chars_out}
+            for e in metrics.events() if e.seq > self._first_seq and e.thread_id == self._thread_id
+        ]
+
+        data = {
+            'name': self.name,
+            'started_at': self._started_at.isoformat(timespec='seconds'),
+            'elapsed': round(self.elapsed, 6),
+            'threshold_sec': self.threshold_sec,
+            'failed': failed,
+            'stages': stages,
+            'functions': functions[:self.MAX_FUNCTIONS],
+        }
+
+        self.profile_dir.mkdir(parents=True, exist_ok=True)
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+        path = self.profile_dir / f"{timestamp}_{self.name}.json"
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+
+        self._rotate()
+        return path
+
+    def _rotate(self):
+        """古いプロファイルを削除"""
+        profiles = list_profiles(self.profile_dir)
+        for old in profiles[self.MAX_PROFILES:]:
+            try:
+                old.unlink()
+            except OSError:
+                pass
+
+
+def profiled(name: str) -> Callable:
+    """
+    関数呼び出しをRunProfilerで囲むデコレーター
+    プロファイリングが無効の場合や、外側で計測中の場合は何もしません
+
+    Args:
+        name: 実行の名前
+    """
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with RunProfiler(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def _short_path(file_name: str) -> str:
+    """ソースファイルのパスを末尾2階層に短縮（ユーザー名などを含めないため）"""
+    if file_name.startswith('<') or file_name == '~':
+        return file_name
+    parts = Path(file_name).parts
+    return "/".join(parts[-2:])
+
+
+def get_profile_dir() -> Path:
+    """プロファイルの保存先ディレクトリを取得"""
+    from src.config import config
+    return config.get_config_manager().config_dir / 'profiles'
+
+
+def list_profiles(profile_dir: Optional[Path] = None) -> List[Path]:
+    """
+    保存済みプロファイルを新しい順に取得
+
+    Args:
+        profile_dir: 保存先ディレクトリ
+
+    Returns:
+        List[Path]: プロファイルのパスのリスト
+    """
+    profile_dir = Path(profile_dir) if profile_dir else get_profile_dir()
+    if not profile_dir.exists():
+        return []
+    return sorted(profile_dir.glob('*.json'), reverse=True)
+
+
+def load_profile(path: Path) -> Dict[str, Any]:
+    """プロファイルを読み込む"""
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def format_profile(data: Dict[str, Any], top: int = 15, sort_key: str = 'tottime') -> str:
+    """
+    プロファイルの要約を生成
+
+    Args:
+        data: load_profileで読み込んだデータ
+        top: 表示する関数の数
+        sort_key: 並べ替えの基準（tottime または cumtime）
+
+    Returns:
+        str: 要約テキスト
+    """
+    lines = [
+        f"=== {data['name']} ({data['started_at']}) ===",
+        f"所要時間: {data['elapsed']:.2f}秒 (閾値 {data['threshold_sec']}秒)"
+        + (" ※エラー終了" if data.get('failed') else ""),
+    ]
+
+    # 処理ステージの内訳（同じステージは合算）
+    stage_totals: Dict[str, float] = {}
+    for stage in data.get('stages', []):
+        stage_totals[stage['stage']] = stage_totals.get(stage['stage'], 0.0) + stage['duration']
+    if stage_totals:
+        lines.append("\n--- 処理ステージ ---")
+        for stage, duration in sorted(stage_totals.items(), key=lambda item: -item[1]):
+            lines.append(f"  {duration:8.3f}秒  {stage}")
+
+    functions = sorted(data.get('functions', []), key=lambda f: f[sort_key], reverse=True)
+    lines.append(f"\n--- 時間のかかった関数（{sort_key}順） ---")
+    lines.append(f"  {'tottime':>9} {'cumtime':>9} {'ncalls':>8}  関数")
+    for func in functions[:top]:
+        lines.append(
+            f"  {func['tottime']:9.3f} {func['cumtime']:9.3f} {func['ncalls']:8d}  "
+            f"{func['function']} ({func['file']}:{func['line']})"
+        )
+
+    return "\n".join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """プロファイルの一覧・要約を表示するコマンド"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="保存したプロファイルを表示します")
+    parser.add_argument('profile', nargs='?', help="表示するプロファイル（省略時は最新）")
+    parser.add_argument('--list', action='store_true', help="保存済みプロファイルの一覧を表示")
+    parser.add_argument('--top', type=int, default=15, help="表示する関数の数")
+    parser.add_argument('--sort', choices=['tottime', 'cumtime'], default='tottime',
+                        help="並べ替えの基準")
+    args = parser.parse_args(argv)
+
+    profiles = list_profiles()
+
+    if args.list:
+        if not profiles:
+            print("保存されたプロファイルはありません。")
+        for path in profiles:
+            data = load_profile(path)
+            print(f"{path.name}  {data['elapsed']:8.2f}秒  {data['name']}")
+        return 0
+
+    if args.profile:
+        path = Path(args.profile)
+        if not path.exists():
+            path = get_profile_dir() / args.profile
+    elif profiles:
+        path = profiles[0]
+    else:
+        print(f"保存されたプロファイルはありません。（保存先: {get_profile_dir()}）")
+        return 1
+
+    print(format_profile(load_profile(path), top=args.top, sort_key=args.sort))
+    return 0
+
+
+if __name__ == "__main__":
+    import sys
+    sys.exit(main())
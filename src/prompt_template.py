@@ -0,0 +1,176 @@
+"""
+プロンプトテンプレートモジュール
+プリセットのプロンプトを一度だけ解析し、{text} の前後の固定部分を保持したテンプレートにします
+カスタムプロンプトに含まれる波括弧（JSONの例など）はそのまま文字として扱います
+"""
+
+import re
+from datetime import date
+from functools import lru_cache
+from typing import Dict, Iterator, List, Optional, Union
+
+
+# 文書を埋め込むプレースホルダー名
+TEXT_FIELD = 'text'
+
+# 使用できるプレースホルダー（text 以外は値を指定しない場合そのまま残す）
+KNOWN_FIELDS = (TEXT_FIELD, 'target_chars', 'date')
+
+# {{ と }} はエスケープ、{名前} はプレースホルダー
+_TOKEN_PATTERN = re.compile(r'\{\{|\}\}|\{([A-Za-z_][A-Za-z0-9_]*)\}')
+
+
+class _Field:
+    """テンプレート中のプレースホルダー"""
+    __slots__ = ('name',)
+
+    def __init__(self, name: str):
+        self.name = name
+
+
+class CompiledTemplate:
+    """解析済みのプロンプトテンプレートクラス"""
+
+    def __init__(self, template: str):
+        """
+        初期化（テンプレートを解析）
+
+        {text} を含まないテンプレートの場合は、末尾に空行を挟んで文書を追加します
+
+        Args:
+            template: プロンプトテンプレート
+        """
+        self.template = template
+        parts: List[Union[str, _Field]] = []
+        buffer: List[str] = []
+        last = 0
+
+        for match in _TOKEN_PATTERN.finditer(template):
+            buffer.append(template[last:match.start()])
+            token = match.group(0)
+            name = match.group(1)
+            if token == '{{':
+                buffer.append('{')
+            elif token == '}}':
+                buffer.append('}')
+            elif name in KNOWN_FIELDS:
+                parts.append(''.join(buffer))
+                buffer = []
+                parts.append(_Field(name))
+            else:
+                # 未知の名前は文字としてそのまま残す
+                buffer.append(token)
+            last = match.end()
+        buffer.append(template[last:])
+        parts.append(''.join(buffer))
+
+        if not any(isinstance(p, _Field) and p.name == TEXT_FIELD for p in parts):
+            parts[-1] += '\n\n'
+            parts.extend([_Field(TEXT_FIELD), ''])
+
+        self._parts = parts
+        self.fields = tuple(dict.fromkeys(p.name for p in parts if isinstance(p, _Field)))
+
+    @property
+    def prefix(self) -> str:
+        """最初の {text} より前の部分（他のプレースホルダーは未展開）"""
+        return self._join(self._parts[:self._text_indexes()[0]])
+
+    @property
+    def suffix(self) -> str:
+        """最後の {text} より後の部分（他のプレースホルダーは未展開）"""
+        return self._join(self._parts[self._text_indexes()[-1] + 1:])
+
+    def _text_indexes(self) -> List[int]:
+        return [i for i, p in enumerate(self._parts) if isinstance(p, _Field) and p.name == TEXT_FIELD]
+
+    @staticmethod
+    def _join(parts: List[Union[str, _Field]]) -> str:
+        return ''.join(p if isinstance(p, str) else '{' + p.name + '}' for p in parts)
+
+    def _resolve(self, values: Dict[str, Optional[str]]) -> Dict[str, str]:
+        """text 以外のプレースホルダーの値を決定"""
+        resolved = {}
+        for name in self.fields:
+            if name == TEXT_FIELD:
+                continue
+            value = values.get(name)
+            if value is None and name == 'date':
+                value = date.today().strftime('%Y年%m月%d日')
+            # 値がない場合はプレースホルダーをそのまま残す
+            resolved[name] = '{' + name + '}' if value is None else str(value)
+        return resolved
+
+    def iter_render(self, text: str, **values: Optional[str]) -> Iterator[str]:
+        """
+        プロンプトを断片ごとに返す（文書はコピーせずそのまま返す）
+
+        Args:
+            text: 医療文書
+            **values: text 以外のプレースホルダーの値（target_chars, date）
+
+        Yields:
+            str: プロンプトの断片
+        """
+        resolved = self._resolve(values)
+        for part in self._parts:
+            if isinstance(part, str):
+                if part:
+                    yield part
+            elif part.name == TEXT_FIELD:
+                yield text
+            else:
+                yield resolved[part.name]
+
+    def render(self, text: str, **values: Optional[str]) -> str:
+        """
+        プロンプトを作成
+
+        Args:
+            text: 医療文書
+            **values: text 以外のプレースホルダーの値（target_chars, date）
+
+        Returns:
+            str: 完成したプロンプト
+        """
+        return ''.join(self.iter_render(text, **values))
+
+
+@lru_cache(maxsize=64)
+def compile_template(template: str) -> CompiledTemplate:
+    """
+    テンプレートを解析（同じテンプレートは解析結果を再利用）
+
+    Args:
+        template: プロンプトテンプレート
+
+    Returns:
+        CompiledTemplate: 解析済みのテンプレート
+    """
+    return CompiledTemplate(template)
+
+
+if __name__ == "__main__":
+    # テスト用
+    import timeit
+
+    template = (
+        "以下の文書を{target_chars}で要約してください（作成日: {date}）。\n"
+        "出力形式の例: {\"病名\": \"...\"}\n"
+        "{{text}} は置換されません。\n\n"
+        "【文書】\n{text}\n"
+    )
+    compiled = compile_template(template)
+    print(compiled.render("統合失調症。2020年4月頃より幻聴が出現...", target_chars="200~300文字"))
+    print(f"プレースホルダー: {compiled.fields}")
+    print(f"{{text}}なし: {compile_template('要約してください').render('本文')!r}")
+
+    with open("tests/sample_medical_record.txt", encoding="utf-8") as f:
+        document = f.read() * 2000
+    plain = "以下の文書を要約してください。\n\n{text}\n"
+    for name, func in [
+        ("str.format", lambda: plain.format(text=document)),
+        ("compile_template", lambda: compile_template(plain).render(document)),
+    ]:
+        elapsed = min(timeit.repeat(func, number=20, repeat=5)) / 20
+        print(f"{name}: {len(document)}文字 {elapsed * 1000:.2f}ミリ秒")
@@ -4,7 +4,10 @@
 """
 
 from dataclasses import dataclass
-from typing import Dict, List
+from typing import Dict, List, Optional
+
+from .metrics import metrics
+from .prompt_template import compile_template
 
 
 @dataclass
@@ -289,18 +292,25 @@ class PromptManager:
         return template
 
     @classmethod
-    def format_prompt(cls, prompt_template: str, text: str) -> str:
+    def format_prompt(cls, prompt_template: str, text: str, **values: Optional[str]) -> str:
         """
         プロンプトに医療文書を埋め込む
 
+        テンプレートは解析済みのものを再利用します
+        {{ }} 以外の波括弧（{text} などの既知のプレースホルダーを除く）は文字としてそのまま残ります
+
         Args:
             prompt_template: プロンプトテンプレート
             text: 医療文書
+            **values: その他のプレースホルダーの値（target_chars: 目標文字数, date: 作成日）
 
         Returns:
             str: 完成したプロンプト
         """
-        return prompt_template.format(text=text)
+        with metrics.timer('format_prompt', chars_in=len(text)) as event:
+            prompt = compile_template(prompt_template).render(text, **values)
+            event.set(chars_out=len(prompt))
+        return prompt
 
 
 # 初期化
@@ -0,0 +1,275 @@
+"""
+仮名化モジュール
+個人情報を種別ごとの番号付きの記号（[氏名1]、[氏名2] など）に置き換え、
+記号と元の値の対応を暗号化したファイル（保管庫）に保存します
+
+AIが生成した要約に含まれる記号は、保管庫の対応表から元の値に戻します
+（文書全体を再検索せず、要約中の記号だけを置き換えます）
+"""
+
+import json
+import os
+import re
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+try:
+    from cryptography.fernet import Fernet, InvalidToken
+    CRYPTOGRAPHY_AVAILABLE = True
+except ImportError:
+    CRYPTOGRAPHY_AVAILABLE = False
+
+
+# 仮名化した記号（[氏名1]、[患者番号12] など）
+TOKEN_PATTERN = re.compile(r'\[([^\[\]\s\d]+)(\d+)\]')
+
+# 要約のプロンプトに追加する指示（記号を書き換えられると元に戻せないため）
+PROMPT_NOTE = "文中の[氏名1]・[住所1]のような記号は個人情報を置き換えたものです。書き換えずにそのまま使用してください。"
+
+_WHITESPACE_PATTERN = re.compile(r'\s+')
+
+_key_lock = threading.Lock()
+
+
+def get_key_path() -> Path:
+    """保管庫の暗号化キーのパスを取得"""
+    from src.config import config
+    return config.get_config_manager().config_dir / 'vault.key'
+
+
+def _load_key(key_path: Optional[Union[str, Path]] = None) -> bytes:
+    """暗号化キーを読み込む（ない場合は作成し、所有者のみ読み書き可能にする）"""
+    key_path = Path(key_path) if key_path else get_key_path()
+    with _key_lock:
+        if key_path.exists():
+            return key_path.read_bytes().strip()
+        key_path.parent.mkdir(parents=True, exist_ok=True)
+        key = Fernet.generate_key()
+        fd = os.open(key_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        with os.fdopen(fd, 'wb') as f:
+            f.write(key)
+        return key
+
+
+class PseudonymVault:
+    """仮名化の対応表（保管庫）"""
+
+    def __init__(self):
+        # (種別, 正規化した値) → 記号、記号 → 元の値（どちらも辞書のため1回の参照で済む）
+        self._tokens: Dict[Tuple[str, str], str] = {}
+        self._values: Dict[str, str] = {}
+        self._counters: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def __getstate__(self):
+        # 並列処理のプロセスには渡さない想定だが、複製できるようにロックを除く
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _normalize(value: str) -> str:
+        """同じ個人情報とみなすための正規化（空白の違いを無視）"""
+        return _WHITESPACE_PATTERN.sub('', value)
+
+    def token_for(self, category: str, value: str) -> str:
+        """
+        個人情報の記号を取得（初めての値には種別ごとの次の番号を割り当て）
+
+        Args:
+            category: 種別（氏名、住所など）
+            value: 元の値
+
+        Returns:
+            str: 記号（例: [氏名1]）
+        """
+        key = (category, self._normalize(value))
+        token = self._tokens.get(key)
+        if token is not None:
+            return token
+        with self._lock:
+            token = self._tokens.get(key)
+            if token is None:
+                number = self._counters.get(category, 0) + 1
+                self._counters[category] = number
+                token = f"[{category}{number}]"
+                self._tokens[key] = token
+                self._values[token] = value
+        return token
+
+    def pseudonymize(self, spans: Iterable) -> None:
+        """
+        検出結果の置換後の文字列を番号付きの記号にする（文書での出現順に番号を割り当て）
+
+        「生年月日：[生年月日]」のようにラベルを残す置換では、ラベルを除いた値を記号にします
+
+        Args:
+            spans: 検出結果（PIISpan、まとめて置換されたものは対象外）
+        """
+        for span in sorted((s for s in spans if not s.absorbed), key=lambda s: s.start):
+            placeholder = f"[{span.category}]"
+            index = span.replacement.find(placeholder)
+            if index == -1:
+                continue
+            value = span.value
+            label = span.replacement[:index].rstrip('：: ')
+            if label and value.startswith(label):
+                value = value[len(label):].lstrip('：: \t　')
+            token = self.token_for(span.category, value)
+            span.replacement = span.replacement[:index] + token + span.replacement[index + len(placeholder):]
+
+    def restore(self, text: str) -> str:
+        """
+        記号を元の値に戻す（対応表にない記号はそのまま）
+
+        Args:
+            text: 記号を含むテキスト（AIが生成した要約など）
+
+        Returns:
+            str: 元の値に戻したテキスト
+        """
+        if not self._values or '[' not in text:
+            return text
+        return TOKEN_PATTERN.sub(lambda match: self._values.get(match.group(0), match.group(0)), text)
+
+    def entries(self) -> List[Tuple[str, str]]:
+        """(記号, 元の値) の一覧（割り当て順）"""
+        return list(self._values.items())
+
+    # ========== 保存・読み込み ==========
+
+    def to_bytes(self, key_path: Optional[Union[str, Path]] = None) -> bytes:
+        """
+        対応表を暗号化
+
+        Args:
+            key_path: 暗号化キーのパス（Noneの場合は設定ディレクトリ内）
+
+        Returns:
+            bytes: 暗号化した対応表
+
+        Raises:
+            Exception: cryptography がインストールされていない場合
+        """
+        if not CRYPTOGRAPHY_AVAILABLE:
+            raise Exception("保管庫の暗号化には cryptography が必要です（pip install cryptography）")
+        with self._lock:
+            data = {
+                'entries': [[category, key, token] for (category, key), token in self._tokens.items()],
+                'values': self._values,
+                'counters': self._counters,
+            }
+        return Fernet(_load_key(key_path)).encrypt(json.dumps(data, ensure_ascii=False).encode('utf-8'))
+
+    @classmethod
+    def from_bytes(cls, data: bytes, key_path: Optional[Union[str, Path]] = None) -> 'PseudonymVault':
+        """
+        暗号化した対応表を復元
+
+        Args:
+            data: 暗号化した対応表
+            key_path: 暗号化キーのパス（Noneの場合は設定ディレクトリ内）
+
+        Returns:
+            PseudonymVault: 保管庫
+
+        Raises:
+            Exception: 復号エラー（キーが異なる・cryptography がない場合など）
+        """
+        if not CRYPTOGRAPHY_AVAILABLE:
+            raise Exception("保管庫の復号には cryptography が必要です（pip install cryptography）")
+        try:
+            decoded = json.loads(Fernet(_load_key(key_path)).decrypt(data).decode('utf-8'))
+        except (InvalidToken, ValueError) as e:
+            raise Exception(f"保管庫の復号エラー: {str(e) or 'キーが一致しません'}")
+
+        vault = cls()
+        vault._tokens = {(category, key): token for category, key, token in decoded['entries']}
+        vault._values = dict(decoded['values'])
+        vault._counters = dict(decoded['counters'])
+        return vault
+
+    def save(self, path: Union[str, Path], key_path: Optional[Union[str, Path]] = None):
+        """
+        暗号化してファイルに保存（所有者のみ読み書き可能）
+
+        Args:
+            path: 保存先
+            key_path: 暗号化キーのパス
+
+        Raises:
+            Exception: 保存エラー
+        """
+        path = Path(path)
+        data = self.to_bytes(key_path)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_suffix(path.suffix + '.tmp')
+            fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            raise Exception(f"保管庫の保存エラー: {str(e)}")
+
+    @classmethod
+    def load(cls, path: Union[str, Path], key_path: Optional[Union[str, Path]] = None) -> 'PseudonymVault':
+        """
+        ファイルから読み込む
+
+        Args:
+            path: 保管庫のファイル
+            key_path: 暗号化キーのパス
+
+        Returns:
+            PseudonymVault: 保管庫
+
+        Raises:
+            Exception: 読み込みエラー
+        """
+        try:
+            data = Path(path).read_bytes()
+        except OSError as e:
+            raise Exception(f"保管庫の読み込みエラー: {str(e)}")
+        return cls.from_bytes(data, key_path)
+
+
+if __name__ == "__main__":
+    # テスト用
+    import tempfile
+
+    from src.pii_remover import PIIRemover
+
+    sample_text = """患者氏名：山本 百花
+生年月日：1975年3月9日
+電話番号：03-1234-5678
+本日、山本　百花さんが母の佐藤恵子と来院。
+緊急連絡先：03-9876-5432（佐藤恵子）"""
+
+    vault = PseudonymVault()
+    remover = PIIRemover(vault=vault)
+    pseudonymized, _ = remover.clean_text(sample_text)
+    print("=== 仮名化したテキスト ===")
+    print(pseudonymized)
+
+    summary = "[氏名1]は[生年月日1]生まれ。[氏名2]（母）同伴で受診。連絡先は[電話番号2]。"
+    print("\n=== 要約（記号を元に戻したもの） ===")
+    print(vault.restore(summary))
+
+    if CRYPTOGRAPHY_AVAILABLE:
+        with tempfile.TemporaryDirectory() as tmp:
+            vault_path = Path(tmp) / 'job.vault'
+            key_path = Path(tmp) / 'vault.key'
+            vault.save(vault_path, key_path)
+            print(f"\n保存した保管庫に元の値が含まれない: {'山本'.encode('utf-8') not in vault_path.read_bytes()}")
+            print(f"読み込んだ保管庫で同じ結果: {PseudonymVault.load(vault_path, key_path).restore(summary) == vault.restore(summary)}")
+    else:
+        print("\ncryptography がないため、保管庫の保存は確認しません")
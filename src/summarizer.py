@@ -3,13 +3,26 @@
 AI API（Claude/OpenAI）を使って医療文書の要約を生成します
 """
 
-from typing import Dict, Optional
-from dataclasses import dataclass
+import json
+import time
+from typing import Any, Callable, Dict, Optional
+from dataclasses import asdict, dataclass
+from datetime import datetime
+import anthropic
+import openai
 from anthropic import Anthropic
 from openai import OpenAI
 
 from .config import config
+from .leak_scanner import LeakScanner
+from .metrics import metrics
 from .prompts import PromptManager
+from .pseudonym_vault import PROMPT_NOTE, TOKEN_PATTERN
+
+
+# 再試行までの待ち時間（秒、再試行ごとに倍にする）
+RETRY_BASE_WAIT = 1.0
+RETRY_MAX_WAIT = 8.0
 
 
 @dataclass
@@ -20,6 +33,39 @@ class SummaryResult:
     char_count: int = 0  # 文字数
     error: Optional[str] = None  # エラーメッセージ
 
+    # 生成の記録（処理速度・費用の集計用、save_results で要約と同じ名前のJSONに保存）
+    preset_key: str = ""  # 使用したプリセットのキー
+    provider: str = ""  # AIプロバイダー（APIを呼び出さなかった場合は空）
+    model: str = ""  # 使用したモデル
+    input_tokens: int = 0  # 入力トークン数（APIの集計）
+    output_tokens: int = 0  # 出力トークン数（APIの集計）
+    cache_read_tokens: int = 0  # プロンプトキャッシュから読み込んだ入力トークン数
+    cache_write_tokens: int = 0  # プロンプトキャッシュに書き込んだ入力トークン数
+    cache_status: str = ""  # プロンプトキャッシュ（hit / write / miss、APIを呼び出さなかった場合は空）
+    ttft_seconds: Optional[float] = None  # 最初のトークンが届くまでの時間（秒、最後の試行）
+    latency_seconds: float = 0.0  # API呼び出しの所要時間（秒、再試行を含む）
+    retries: int = 0  # 再試行の回数
+    created_at: str = ""  # 生成日時（ISO 8601）
+
+    @property
+    def output_tokens_per_second(self) -> Optional[float]:
+        """出力の速度（トークン/秒）"""
+        if not self.output_tokens or not self.latency_seconds:
+            return None
+        return self.output_tokens / self.latency_seconds
+
+    def get_metadata(self) -> Dict[str, Any]:
+        """
+        生成の記録（要約本文を除く）
+
+        Returns:
+            Dict[str, Any]: 記録（JSONに変換可能）
+        """
+        metadata = asdict(self)
+        del metadata['content']
+        metadata['output_tokens_per_second'] = self.output_tokens_per_second
+        return metadata
+
     # 後方互換性のためのプロパティ
     @property
     def history(self) -> Optional[str]:
@@ -48,14 +94,23 @@ class MedicalSummarizer:
         self.provider = provider or config.AI_PROVIDER
         self.model = model or config.AI_MODEL
 
-        # APIクライアントの初期化
+        # APIクライアントの初期化（再試行の回数を記録するため、SDKでは再試行しない）
         if self.provider == "anthropic":
-            self.client = Anthropic(api_key=config.ANTHROPIC_API_KEY)
+            self.client = Anthropic(api_key=config.ANTHROPIC_API_KEY, max_retries=0)
         elif self.provider == "openai":
-            self.client = OpenAI(api_key=config.OPENAI_API_KEY)
+            self.client = OpenAI(api_key=config.OPENAI_API_KEY, max_retries=0)
         else:
             raise ValueError(f"サポートされていないプロバイダー: {self.provider}")
 
+        # 直近のAPI呼び出しで返されたトークン使用量と、所要時間・再試行の回数
+        self.last_usage: Dict[str, int] = {}
+        self.last_call: Dict[str, Any] = {}
+        self._last_ttft: Optional[float] = None
+        self._last_retries = 0
+
+        # 送信前チェック（確認画面の編集などで残った個人情報を送らない）
+        self.leak_scanner = LeakScanner(config.LEAK_SCAN_MODE)
+
     def _call_anthropic_api(self, prompt: str, max_tokens: int = 1024) -> str:
         """
         Anthropic Claude APIを呼び出す
@@ -67,17 +122,34 @@ class MedicalSummarizer:
         Returns:
             str: 生成されたテキスト
         """
-        try:
-            response = self.client.messages.create(
+        def request() -> str:
+            start = time.perf_counter()
+            with self.client.messages.stream(
                 model=self.model,
                 max_tokens=max_tokens,
                 messages=[{
                     "role": "user",
                     "content": prompt
                 }]
-            )
+            ) as stream:
+                for _ in stream.text_stream:
+                    if self._last_ttft is None:
+                        self._last_ttft = time.perf_counter() - start
+                response = stream.get_final_message()
+
+            usage = getattr(response, 'usage', None)
+            if usage is not None:
+                self.last_usage = {
+                    'input_tokens': getattr(usage, 'input_tokens', 0) or 0,
+                    'output_tokens': getattr(usage, 'output_tokens', 0) or 0,
+                    'cache_read_tokens': getattr(usage, 'cache_read_input_tokens', 0) or 0,
+                    'cache_write_tokens': getattr(usage, 'cache_creation_input_tokens', 0) or 0,
+                }
             return response.content[0].text
 
+        try:
+            return self._with_retries(request)
+
         except Exception as e:
             raise Exception(f"Claude API エラー: {str(e)}")
 
@@ -92,20 +164,76 @@ class MedicalSummarizer:
         Returns:
             str: 生成されたテキスト
         """
-        try:
-            response = self.client.chat.completions.create(
+        def request() -> str:
+            start = time.perf_counter()
+            stream = self.client.chat.completions.create(
                 model=self.model,
                 max_tokens=max_tokens,
                 messages=[{
                     "role": "user",
                     "content": prompt
-                }]
+                }],
+                stream=True,
+                stream_options={"include_usage": True}
             )
-            return response.choices[0].message.content
+            parts = []
+            usage = None
+            for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    if self._last_ttft is None:
+                        self._last_ttft = time.perf_counter() - start
+                    parts.append(chunk.choices[0].delta.content)
+                # 使用量は最後のチャンクで返される
+                if getattr(chunk, 'usage', None) is not None:
+                    usage = chunk.usage
+
+            if usage is not None:
+                details = getattr(usage, 'prompt_tokens_details', None)
+                self.last_usage = {
+                    'input_tokens': getattr(usage, 'prompt_tokens', 0) or 0,
+                    'output_tokens': getattr(usage, 'completion_tokens', 0) or 0,
+                    'cache_read_tokens': getattr(details, 'cached_tokens', 0) or 0,
+                    'cache_write_tokens': 0,
+                }
+            return "".join(parts)
+
+        try:
+            return self._with_retries(request)
 
         except Exception as e:
             raise Exception(f"OpenAI API エラー: {str(e)}")
 
+    @staticmethod
+    def _is_retryable(error: Exception) -> bool:
+        """再試行するエラー（接続エラー・タイムアウト・レート制限・サーバーエラー）"""
+        if isinstance(error, (anthropic.APIConnectionError, openai.APIConnectionError)):
+            return True
+        if isinstance(error, (anthropic.APIStatusError, openai.APIStatusError)):
+            return error.status_code in (408, 409, 429) or error.status_code >= 500
+        return False
+
+    def _with_retries(self, request: Callable[[], str]) -> str:
+        """
+        APIを呼び出し、一時的なエラーの場合は待ってから再試行（最大 config.API_MAX_RETRIES 回）
+
+        Args:
+            request: API呼び出し（1回分）
+
+        Returns:
+            str: 生成されたテキスト
+        """
+        while True:
+            self._last_ttft = None
+            try:
+                return request()
+            except Exception as e:
+                if not self._is_retryable(e) or self._last_retries >= config.API_MAX_RETRIES:
+                    raise
+                self._last_retries += 1
+                metrics.increment('api_retries', stage='call_api')
+                print(f"⚠️  API呼び出しを再試行します（{self._last_retries}/{config.API_MAX_RETRIES}）: {type(e).__name__}")
+                time.sleep(min(RETRY_MAX_WAIT, RETRY_BASE_WAIT * 2 ** (self._last_retries - 1)))
+
     def _call_api(self, prompt: str, max_tokens: int = 1024) -> str:
         """
         設定されたAPIを呼び出す
@@ -117,12 +245,41 @@ class MedicalSummarizer:
         Returns:
             str: 生成されたテキスト
         """
-        if self.provider == "anthropic":
-            return self._call_anthropic_api(prompt, max_tokens)
-        elif self.provider == "openai":
-            return self._call_openai_api(prompt, max_tokens)
-        else:
-            raise ValueError(f"サポートされていないプロバイダー: {self.provider}")
+        self.last_usage = {}
+        self.last_call = {}
+        self._last_ttft = None
+        self._last_retries = 0
+
+        with metrics.timer(
+            'call_api', chars_in=len(prompt), provider=self.provider, model=self.model
+        ) as event:
+            if self.provider == "anthropic":
+                content = self._call_anthropic_api(prompt, max_tokens)
+            elif self.provider == "openai":
+                content = self._call_openai_api(prompt, max_tokens)
+            else:
+                raise ValueError(f"サポートされていないプロバイダー: {self.provider}")
+
+            event.set(
+                chars_out=len(content or ''), ttft_seconds=self._last_ttft, retries=self._last_retries,
+                **self.last_usage
+            )
+
+        cache_status = 'miss'
+        if self.last_usage.get('cache_read_tokens'):
+            cache_status = 'hit'
+        elif self.last_usage.get('cache_write_tokens'):
+            cache_status = 'write'
+        self.last_call = {
+            'provider': self.provider,
+            'model': self.model,
+            **self.last_usage,
+            'cache_status': cache_status,
+            'ttft_seconds': self._last_ttft,
+            'latency_seconds': event.duration,
+            'retries': self._last_retries,
+        }
+        return content
 
     def generate_summary(
         self,
@@ -147,7 +304,7 @@ class MedicalSummarizer:
         Returns:
             SummaryResult: 要約結果
         """
-        result = SummaryResult()
+        result = SummaryResult(preset_key=preset_key, created_at=datetime.now().isoformat(timespec='seconds'))
 
         try:
             # プリセットを取得
@@ -166,8 +323,20 @@ class MedicalSummarizer:
 
             # AI要約を生成
             print(f"{preset.name}を生成中...")
-            prompt = PresetManager.format_prompt(preset.prompt, text)
+            # 短い出力のプリセットでは関連する段落のみを送る
+            if preset.context_tokens:
+                from .context_selector import ContextSelector
+                text = ContextSelector().select(text, preset.prompt, preset.context_tokens).text
+            # 送信前チェック（確認画面の編集などで残った個人情報をマスク、block モードでは送信しない）
+            # プロンプトの指示文（仮名化の記号の説明など）は検査しない
+            text = self.leak_scanner.check(text)
+            prompt = PresetManager.format_prompt(preset.prompt, text, target_chars=preset.target_chars)
+            if TOKEN_PATTERN.search(text):
+                # 仮名化した文書では、記号を書き換えないよう指示（要約の保存時に元の値に戻すため）
+                prompt = f"{PROMPT_NOTE}\n\n{prompt}"
             result.content = self._call_api(prompt, max_tokens=preset.max_tokens)
+            for key, value in self.last_call.items():
+                setattr(result, key, value)
             result.char_count = len(result.content)
             print(f"✓ 生成完了 ({result.char_count}文字)")
 
@@ -181,15 +350,16 @@ class MedicalSummarizer:
         """
         要約結果をファイルに保存
 
+        要約と同じ名前のJSONファイルに、生成の記録（トークン数・所要時間・モデルなど、要約本文は含まない）を保存します
+
         Args:
             result: 要約結果
             output_dir: 出力ディレクトリ
 
         Returns:
-            Dict[str, str]: 保存したファイルのパス
+            Dict[str, str]: 保存したファイルのパス（summary: 要約、metadata: 生成の記録）
         """
         from pathlib import Path
-        from datetime import datetime
 
         if output_dir is None:
             output_dir = config.OUTPUT_DIR
@@ -207,10 +377,27 @@ class MedicalSummarizer:
             # プリセット名をファイル名に使用（安全な文字列に変換）
             safe_preset_name = result.preset_name.replace('/', '_').replace('\\', '_')
             file_path = output_dir / f"{safe_preset_name}_{timestamp}.txt"
-            with open(file_path, 'w', encoding='utf-8') as f:
+            # 同じ秒に保存された別の患者の結果を上書きしない
+            # （別のスレッドと同時に保存する場合もあるため、存在しない場合のみ作成するモードで開く）
+            suffix = 2
+            while True:
+                try:
+                    f = open(file_path, 'x', encoding='utf-8')
+                    break
+                except FileExistsError:
+                    file_path = output_dir / f"{safe_preset_name}_{timestamp}_{suffix}.txt"
+                    suffix += 1
+            with f:
                 f.write(result.content)
             saved_files['summary'] = str(file_path)
 
+            # 生成の記録
+            metadata_path = file_path.with_suffix('.json')
+            metadata = {'summary_file': file_path.name, **result.get_metadata()}
+            with open(metadata_path, 'w', encoding='utf-8') as f:
+                json.dump(metadata, f, ensure_ascii=False, indent=2)
+            saved_files['metadata'] = str(metadata_path)
+
         return saved_files
 
 
@@ -291,3 +478,10 @@ if __name__ == "__main__":
         print("\n✓ 保存完了:")
         for key, path in saved_files.items():
             print(f"  - {path}")
+
+        ttft = f"{result.ttft_seconds:.2f}秒" if result.ttft_seconds is not None else "-"
+        print(
+            f"\n{result.model}: 入力{result.input_tokens}トークン / 出力{result.output_tokens}トークン、"
+            f"最初のトークンまで{ttft}、合計{result.latency_seconds:.2f}秒（再試行{result.retries}回、"
+            f"キャッシュ: {result.cache_status}）"
+        )
@@ -0,0 +1,193 @@
+"""
+テキスト整形モジュール
+「整形のみ」プリセットの改行整理（段落内の改行を削除し、箇条書き・見出しは保持）を行います
+入力を一定の長さのチャンクごとに処理するため、数MBの紹介状でも行数に比例した時間で整形できます
+"""
+
+from typing import Iterable, Iterator, List
+
+
+# 箇条書き・見出しとみなす行頭の文字
+_BULLET_CHARS = frozenset('・○●※■□【-*')
+
+# 番号付きの箇条書きとみなす行頭の2文字
+_NUMBERED_PREFIXES = frozenset(('1.', '2.', '3.'))
+
+# 項目名とみなす行末の文字
+_LABEL_SUFFIXES = frozenset('：:')
+
+# これより短い行は段落に結合しない
+_SHORT_LINE_CHARS = 30
+
+# 1回に処理するチャンクの文字数
+CHUNK_CHARS = 1 << 20
+
+
+def reflow(chunks: Iterable[str]) -> Iterator[str]:
+    """
+    テキストを整形し、チャンクごとに出力する
+
+    チャンクの区切りは行の途中でも構いません
+    連続する空行は1つにまとめます（空白のみの行はまとめずに空行として残します）
+    出力を '\n' で連結すると整形後のテキストになります
+
+    Args:
+        chunks: 入力テキストのチャンク
+
+    Yields:
+        str: 整形後の1行以上のテキスト（末尾の改行を含まない）
+    """
+    paragraph: List[str] = []  # 結合中の段落
+    carry: List[str] = []      # チャンクをまたぐ行の断片
+    index = 0                  # 入力の行番号
+    prev_empty = False         # 直前の行が完全な空行か
+    bullet_chars = _BULLET_CHARS
+    numbered_prefixes = _NUMBERED_PREFIXES
+    label_suffixes = _LABEL_SUFFIXES
+    short_line_chars = _SHORT_LINE_CHARS
+
+    def process(lines: List[str], out: List[str]):
+        nonlocal index, prev_empty
+        for raw in lines:
+            if raw:
+                prev_empty = False
+            elif prev_empty and index >= 2:
+                # 連続する空行は1つにする（先頭・末尾の空行は残す）
+                index += 1
+                continue
+            else:
+                prev_empty = True
+            index += 1
+
+            line = raw.strip()
+            if not line:
+                # 空行で段落を区切る
+                if paragraph:
+                    out.append(''.join(paragraph))
+                    paragraph.clear()
+                out.append('')
+            elif (len(line) < short_line_chars
+                  or line[0] in bullet_chars
+                  or line[:2] in numbered_prefixes
+                  or line[-1] in label_suffixes):
+                # 箇条書きや見出しっぽい行（短い行、記号で始まる行など）
+                if paragraph:
+                    out.append(''.join(paragraph))
+                    paragraph.clear()
+                out.append(line)
+            else:
+                # 通常の文章行は結合
+                paragraph.append(line)
+
+    for chunk in chunks:
+        if '\n' not in chunk:
+            carry.append(chunk)
+            continue
+
+        lines = chunk.split('\n')
+        if carry:
+            carry.append(lines[0])
+            lines[0] = ''.join(carry)
+        # 最後の行は次のチャンクに続く可能性があるため持ち越す
+        carry = [lines.pop()]
+
+        out: List[str] = []
+        process(lines, out)
+        if out:
+            yield '\n'.join(out)
+
+    # 最後の行（末尾の空行は連続していてもまとめない）と最後の段落
+    out = []
+    prev_empty = False
+    process([''.join(carry)], out)
+    if paragraph:
+        out.append(''.join(paragraph))
+    yield '\n'.join(out)
+
+
+def iter_chunks(text: str, chunk_chars: int = CHUNK_CHARS) -> Iterator[str]:
+    """
+    テキストを一定の文字数のチャンクに分割
+
+    Args:
+        text: テキスト
+        chunk_chars: チャンクの文字数
+
+    Yields:
+        str: チャンク
+    """
+    for start in range(0, len(text), chunk_chars):
+        yield text[start:start + chunk_chars]
+
+
+def format_text(text: str) -> str:
+    """
+    テキストの整形のみ（不要な改行を削除）
+
+    Args:
+        text: 元のテキスト
+
+    Returns:
+        str: 整形されたテキスト
+    """
+    return '\n'.join(reflow(iter_chunks(text)))
+
+
+if __name__ == "__main__":
+    # テスト用（従来の実装との出力一致と処理時間を比較）
+    import random
+    import re
+    import timeit
+    import tracemalloc
+
+    def legacy_format_text(text: str) -> str:
+        """従来の実装（正規表現で空行をまとめてから行ごとに処理）"""
+        text = re.sub(r'\n\n+', '\n\n', text)
+        lines = text.split('\n')
+        formatted_lines = []
+        current_paragraph = []
+        for line in lines:
+            line = line.strip()
+            if not line:
+                if current_paragraph:
+                    formatted_lines.append(''.join(current_paragraph))
+                    current_paragraph = []
+                formatted_lines.append('')
+                continue
+            if (len(line) < 30 or
+                line.startswith(('・', '○', '●', '※', '■', '□', '【', '1.', '2.', '3.', '-', '*')) or
+                line.endswith(('：', ':'))):
+                if current_paragraph:
+                    formatted_lines.append(''.join(current_paragraph))
+                    current_paragraph = []
+                formatted_lines.append(line)
+                continue
+            current_paragraph.append(line)
+        if current_paragraph:
+            formatted_lines.append(''.join(current_paragraph))
+        return '\n'.join(formatted_lines)
+
+    with open("tests/sample_medical_record.txt", encoding="utf-8") as f:
+        sample = f.read()
+
+    # 出力の一致を確認（テストデータ + ランダムな改行・空白・記号の組み合わせ）
+    cases = [sample, "", "\n", "\n\n\n", "a\n\n\n", "\n\n\na", " \n　\n\n"]
+    rng = random.Random(0)
+    alphabet = ["\n", "\n", " ", "　", "\r", "・", "1.", "：", "あ" * 35, "文章", "-"]
+    for _ in range(20000):
+        cases.append("".join(rng.choice(alphabet) for _ in range(rng.randint(0, 12))))
+    for case in cases:
+        for chunk_chars in (1, 3, CHUNK_CHARS):
+            result = '\n'.join(reflow(iter_chunks(case, chunk_chars)))
+            assert result == legacy_format_text(case), repr(case)
+    print(f"出力一致: {len(cases)}件")
+
+    # 処理時間の比較（テストデータを繰り返して数MBにする）
+    document = "\n\n".join([sample] * 5000)
+    for name, func in [("従来", legacy_format_text), ("新方式", format_text)]:
+        elapsed = min(timeit.repeat(lambda: func(document), number=1, repeat=5))
+        tracemalloc.start()
+        func(document)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        print(f"{name}: {len(document)}文字 {elapsed:.3f}秒 (最大使用メモリ {peak / 1024 / 1024:.1f}MB)")
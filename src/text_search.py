@@ -0,0 +1,272 @@
+"""
+テキスト検索モジュール
+確認画面のマスク済みテキストを対象に、文字バイグラムの索引で検索・一括削除を行います
+"""
+
+import re
+from array import array
+from typing import Dict, List, Optional, Sequence, Tuple
+
+
+# 検索結果の範囲 (開始位置, 終了位置)
+Span = Tuple[int, int]
+
+# 複数ワード検索の区切り文字
+TERM_SEPARATOR_PATTERN = re.compile(r'[,，、]')
+
+
+class TextSearchIndex:
+    """文字バイグラム索引クラス"""
+
+    def __init__(self, text: str):
+        """
+        初期化（索引を作成）
+
+        Args:
+            text: 検索対象のテキスト
+        """
+        self.text = text
+        postings: Dict[str, List[int]] = {}
+        for pos in range(len(text) - 1):
+            bigram = text[pos:pos + 2]
+            positions = postings.get(bigram)
+            if positions is None:
+                postings[bigram] = [pos]
+            else:
+                positions.append(pos)
+        # 出現位置は省メモリの配列で保持
+        self._postings: Dict[str, array] = {
+            bigram: array('i', positions) for bigram, positions in postings.items()
+        }
+
+    def find(self, term: str) -> List[int]:
+        """
+        単語の出現位置をすべて取得（重なりを含む）
+
+        Args:
+            term: 検索する単語
+
+        Returns:
+            List[int]: 出現位置のリスト（昇順）
+        """
+        if not term:
+            return []
+
+        text = self.text
+        if len(term) == 1:
+            positions = []
+            pos = text.find(term)
+            while pos != -1:
+                positions.append(pos)
+                pos = text.find(term, pos + 1)
+            return positions
+
+        # 出現回数の最も少ないバイグラムを起点に候補を絞り込む
+        best_offset, best_postings = 0, None
+        for offset in range(len(term) - 1):
+            candidates = self._postings.get(term[offset:offset + 2])
+            if candidates is None:
+                return []
+            if best_postings is None or len(candidates) < len(best_postings):
+                best_offset, best_postings = offset, candidates
+
+        return [
+            start for start in (pos - best_offset for pos in best_postings)
+            if start >= 0 and text.startswith(term, start)
+        ]
+
+    def find_terms(self, terms: Sequence[str]) -> List[Span]:
+        """
+        複数の単語を検索
+
+        Args:
+            terms: 検索する単語のリスト
+
+        Returns:
+            List[Span]: 出現範囲のリスト（開始位置順）
+        """
+        spans = set()
+        for term in terms:
+            spans.update((pos, pos + len(term)) for pos in self.find(term))
+        return sorted(spans)
+
+    def find_regex(self, pattern: str) -> List[Span]:
+        """
+        正規表現で検索
+
+        Args:
+            pattern: 正規表現
+
+        Returns:
+            List[Span]: 出現範囲のリスト（開始位置順、空文字列のマッチは除く）
+
+        Raises:
+            re.error: 正規表現が不正
+        """
+        return [m.span() for m in re.finditer(pattern, self.text) if m.end() > m.start()]
+
+    def search(self, query: str, regex: bool = False) -> List[Span]:
+        """
+        検索ワードで検索（カンマ・読点区切りで複数ワード）
+
+        Args:
+            query: 検索ワード
+            regex: 正規表現として扱うか
+
+        Returns:
+            List[Span]: 出現範囲のリスト（開始位置順）
+        """
+        if regex:
+            return self.find_regex(query)
+        terms = [t for t in (t.strip() for t in TERM_SEPARATOR_PATTERN.split(query)) if t]
+        return self.find_terms(terms)
+
+
+def remove_spans(text: str, spans: Sequence[Span]) -> str:
+    """
+    指定範囲をまとめて削除（1回の走査で新しい文字列を作成）
+
+    Args:
+        text: 元のテキスト
+        spans: 削除する範囲のリスト（重なっていても可）
+
+    Returns:
+        str: 削除後のテキスト
+    """
+    pieces = []
+    last = 0
+    for start, end in sorted(spans):
+        if end <= last:
+            continue
+        if start > last:
+            pieces.append(text[last:start])
+        last = max(last, end)
+    pieces.append(text[last:])
+    return "".join(pieces)
+
+
+class SearchResults:
+    """
+    検索結果の管理クラス
+    1件削除するごとに後続の位置をずらす代わりに、削除した長さをFenwick木で保持します
+    """
+
+    def __init__(self, spans: List[Span]):
+        """
+        初期化
+
+        Args:
+            spans: 検索時点のテキストでの出現範囲（開始位置順）
+        """
+        self._spans = spans
+        self._alive: List[int] = list(range(len(spans)))  # 未削除の結果の番号
+        self._tree = [0] * (len(spans) + 1)  # 削除した文字数（Fenwick木）
+
+    def __len__(self) -> int:
+        return len(self._alive)
+
+    def _add(self, index: int, value: int):
+        i = index + 1
+        while i < len(self._tree):
+            self._tree[i] += value
+            i += i & -i
+
+    def _removed_before(self, index: int) -> int:
+        """index番目より前に削除された文字数"""
+        total = 0
+        i = index
+        while i > 0:
+            total += self._tree[i]
+            i -= i & -i
+        return total
+
+    def span(self, position: int) -> Span:
+        """
+        現在のテキストでの出現範囲を取得
+
+        Args:
+            position: 未削除の結果の中での順番
+
+        Returns:
+            Span: 出現範囲
+        """
+        index = self._alive[position]
+        start, end = self._spans[index]
+        shift = self._removed_before(index)
+        return start - shift, end - shift
+
+    def original_span(self, position: int) -> Span:
+        """
+        検索時点のテキストでの出現範囲を取得
+
+        Args:
+            position: 未削除の結果の中での順番
+
+        Returns:
+            Span: 出現範囲
+        """
+        return self._spans[self._alive[position]]
+
+    def spans(self) -> List[Span]:
+        """未削除の結果すべての現在の出現範囲"""
+        return [self.span(i) for i in range(len(self._alive))]
+
+    def delete(self, position: int) -> Optional[Span]:
+        """
+        結果を削除済みにする（重なっている前後の結果も削除済みにする）
+
+        Args:
+            position: 未削除の結果の中での順番
+
+        Returns:
+            Optional[Span]: テキストから削除すべき範囲
+        """
+        if not 0 <= position < len(self._alive):
+            return None
+
+        current = self.span(position)
+        index = self._alive.pop(position)
+        start, end = self._spans[index]
+        removed = end - start
+
+        # 削除範囲と重なる前後の結果は無効になる
+        while position < len(self._alive) and self._spans[self._alive[position]][0] < end:
+            self._alive.pop(position)
+        while position > 0 and self._spans[self._alive[position - 1]][1] > start:
+            position -= 1
+            self._alive.pop(position)
+
+        # 削除した文字数を後続の結果に反映
+        self._add(index, removed)
+
+        return current
+
+
+if __name__ == "__main__":
+    # テスト用
+    import time
+
+    with open("tests/sample_medical_record.txt", encoding="utf-8") as f:
+        sample = f.read()
+    document = sample * 500
+
+    start = time.perf_counter()
+    index = TextSearchIndex(document)
+    print(f"索引作成: {len(document)}文字 {time.perf_counter() - start:.3f}秒")
+
+    for query, regex in [("リスペリドン", False), ("幻聴,妄想", False), (r"\d+mg", True)]:
+        start = time.perf_counter()
+        spans = index.search(query, regex=regex)
+        print(f"検索「{query}」: {len(spans)}件 {time.perf_counter() - start:.4f}秒")
+
+    spans = index.search("リスペリドン")
+    start = time.perf_counter()
+    removed = remove_spans(document, spans)
+    print(f"一括削除: {time.perf_counter() - start:.4f}秒 残り{removed.count('リスペリドン')}件")
+
+    results = SearchResults(index.search("幻聴"))
+    text = document
+    s, e = results.delete(0)
+    text = text[:s] + text[e:]
+    s, e = results.span(0)
+    print(f"1件削除後の次の結果: {text[s:e]}")
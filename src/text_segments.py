@@ -0,0 +1,88 @@
+"""
+テキスト分割モジュール
+結合済みの文書を段落・ページ・ファイル単位のセグメントに分割します
+分割したセグメントをそのまま連結すると元のテキストに戻ります
+"""
+
+import hashlib
+import re
+from typing import List
+
+
+# セグメントの区切り
+# - 空行（2つ以上の連続した改行）の直後
+# - ページ区切り（--- Page N ---）やファイル区切り（====）の行の直前
+_BOUNDARY_PATTERN = re.compile(r'\n{2,}|\n(?=--- Page \d+ ---\n|={20,}\n)')
+
+# 1セグメントの最大文字数（超える場合は改行位置で分割）
+MAX_SEGMENT_CHARS = 20000
+
+
+def split_segments(text: str, max_chars: int = MAX_SEGMENT_CHARS) -> List[str]:
+    """
+    テキストをセグメントに分割
+
+    各セグメントは直後の改行を含むため、''.join(segments) == text となります
+
+    Args:
+        text: 分割するテキスト
+        max_chars: 1セグメントの最大文字数
+
+    Returns:
+        List[str]: セグメントのリスト
+    """
+    segments = []
+    start = 0
+    for match in _BOUNDARY_PATTERN.finditer(text):
+        end = match.end()
+        segments.extend(_split_long(text[start:end], max_chars))
+        start = end
+    if start < len(text):
+        segments.extend(_split_long(text[start:], max_chars))
+    return segments
+
+
+def _split_long(segment: str, max_chars: int) -> List[str]:
+    """長すぎるセグメントを改行位置で分割"""
+    if len(segment) <= max_chars:
+        return [segment]
+
+    parts = []
+    start = 0
+    while len(segment) - start > max_chars:
+        cut = segment.rfind('\n', start, start + max_chars)
+        if cut == -1:
+            # 改行がない場合は文字数で分割
+            cut = start + max_chars
+        else:
+            cut += 1
+        parts.append(segment[start:cut])
+        start = cut
+    parts.append(segment[start:])
+    return parts
+
+
+def segment_hash(segment: str) -> str:
+    """
+    セグメントの内容ハッシュを計算
+
+    Args:
+        segment: セグメント
+
+    Returns:
+        str: ハッシュ値（16進数）
+    """
+    return hashlib.blake2b(segment.encode('utf-8'), digest_size=16).hexdigest()
+
+
+if __name__ == "__main__":
+    # テスト用
+    sample = (
+        "診断名：統合失調症\n\n"
+        "【経過】\n2020年4月頃より幻聴が出現。\n\n\n"
+        "--- Page 2 ---\n治療経過：\nリスペリドン2mg/日で治療開始\n"
+    )
+    segments = split_segments(sample)
+    for i, segment in enumerate(segments, 1):
+        print(f"[{i}] {segment!r}")
+    print(f"\n連結結果が一致: {''.join(segments) == sample}")
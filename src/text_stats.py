@@ -0,0 +1,45 @@
+"""
+テキスト統計モジュール
+API呼び出し前にトークン数を見積もるための簡易的な計算を行います
+"""
+
+import re
+
+
+# 半角英数字・記号の連続（英単語・数値など）
+_ASCII_RUN_PATTERN = re.compile(r'[\x21-\x7e]+')
+
+# 半角文字の何文字を1トークンとみなすか
+ASCII_CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    トークン数を見積もる
+
+    日本語（全角文字）は1文字を約1トークン、半角英数字は約4文字を1トークンとして計算します
+    実際のトークン数はモデルによって異なるため、削減量の目安として使用してください
+
+    Args:
+        text: テキスト
+
+    Returns:
+        int: 見積もりトークン数
+    """
+    if not text:
+        return 0
+    ascii_chars = 0
+    ascii_tokens = 0
+    for match in _ASCII_RUN_PATTERN.finditer(text):
+        length = match.end() - match.start()
+        ascii_chars += length
+        ascii_tokens += -(-length // ASCII_CHARS_PER_TOKEN)
+    # 空白・改行はトークンに含めない
+    other_chars = len(text) - ascii_chars - sum(text.count(c) for c in (' ', '\n', '\t', '\r'))
+    return ascii_tokens + max(other_chars, 0)
+
+
+if __name__ == "__main__":
+    # テスト用
+    for sample in ["統合失調症の診断", "Risperidone 2mg/day", "HbA1c 7.2%、血圧 130/80"]:
+        print(f"{sample}: 約{estimate_tokens(sample)}トークン")